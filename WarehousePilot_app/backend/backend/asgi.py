@@ -3,6 +3,9 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The backend is served by uvicorn with this application (see Dockerfile.backend), so that the
+live event streams (backend.live_events, /events/) wait on Redis without holding a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -14,3 +17,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.DEBUG:
+    # uvicorn does not serve the static files (admin) like runserver did
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    application = ASGIStaticFilesHandler(application)
@@ -0,0 +1,99 @@
+# This file defines the base of the async read endpoints, which the ASGI application (backend/asgi.py) serves without a thread per request.
+
+# authenticate: Returns the user of the JWT access token of a request like simplejwt's JWTAuthentication, with the async ORM.
+# api_response: DRF Response rendered as JSON, usable outside of an APIView.
+# AsyncAPIView: Class-based view with async handlers, for authenticated users only (the APIView + IsAuthenticated equivalent).
+# async_api_view: The same for an async function view answering GET (the @api_view(['GET']) equivalent).
+
+# DRF views are synchronous, so the hot read endpoints are plain Django async views. They keep the authentication,
+# the error bodies and the JSON rendering of DRF, and the clients (and the tests) see the same responses.
+
+from functools import wraps
+from django.contrib.auth import get_user_model
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+_jwt = JWTAuthentication()
+
+
+async def authenticate(request):
+    """
+    Return the user authenticated by the Authorization header of `request`, None without credentials.
+    Raises AuthenticationFailed (or InvalidToken) when the token is invalid or its user is unknown or inactive.
+    """
+    # the DRF test clients authenticate with force_authenticate(), honoured like the APIViews do
+    forced = getattr(request, "_force_auth_user", None)
+    if forced is not None:
+        return forced
+
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    token = _jwt.get_validated_token(raw_token)
+
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+    try:
+        user = await get_user_model().objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+    except get_user_model().DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    return user
+
+
+def api_response(data, status=200, headers=None):
+    response = Response(data, status=status, headers=headers)
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = "application/json"
+    response.renderer_context = {}
+    return response
+
+
+async def _refuse(request, allowed_methods):
+    # the response refusing the request (405, 401), None when the view can handle it; sets request.user
+    if request.method.lower() not in allowed_methods:
+        return api_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    unauthorized = {"WWW-Authenticate": _jwt.authenticate_header(request)}
+    try:
+        user = await authenticate(request)
+    except AuthenticationFailed as e:
+        return api_response(e.detail, status=401, headers=unauthorized)
+    if user is None:
+        return api_response({"detail": "Authentication credentials were not provided."}, status=401, headers=unauthorized)
+    request.user = user
+    return None
+
+
+class AsyncAPIView(View):
+    """
+    Base of the async class-based views: the handlers (async def get, ...) are called with an authenticated request.user.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        allowed = [method for method in self.http_method_names if hasattr(self, method)]
+        refused = await _refuse(request, allowed)
+        if refused is not None:
+            return refused
+        return await getattr(self, request.method.lower())(request, *args, **kwargs)
+
+
+def async_api_view(view):
+    """
+    Decorator of an async function view answering GET, called with an authenticated request.user.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        refused = await _refuse(request, ["get"])
+        if refused is not None:
+            return refused
+        return await view(request, *args, **kwargs)
+    return wrapper
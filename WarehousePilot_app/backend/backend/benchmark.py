@@ -0,0 +1,91 @@
+# This file defines the benchmark of the async read endpoints, comparing the ASGI server to the WSGI one under concurrent requests.
+
+# run_endpoint: Sends `requests` GET requests to a URL from `concurrency` clients and measures the throughput and latencies.
+# main: Benchmarks every endpoint of READ_ENDPOINTS against each server and prints one line per (endpoint, server).
+
+# Usage (the two servers of the "benchmark" compose profile, see the README):
+#   docker compose --profile benchmark up -d backend-asgi backend-wsgi
+#   python -m backend.benchmark --server asgi=http://localhost:8002 --server wsgi=http://localhost:8001 \
+#       --token <access token of a staff user> --order-id 1 --picklist-item-id 1 --concurrency 50 --requests 2000
+# Only the standard library is used, the script can run from any machine reaching the servers.
+
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# endpoint name -> path, {order_id} and {picklist_item_id} are filled from the arguments
+READ_ENDPOINTS = {
+    "assigned_inventory_picklist": "/inventory/assigned_inventory_picklist/",
+    "inventory_picklist_items": "/orders/inventory_picklist_items/{order_id}/",
+    "staff_manufacturing_tasks": "/staff_dashboard/staff_manufacturing_tasks/",
+    "qa_tasks": "/qa_dashboard/qa_tasks/",
+    "label": "/label_maker/{picklist_item_id}/",
+    "order_labels": "/label_maker/order/{order_id}/",
+}
+
+
+def _get(url, token, timeout):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = None
+    return status, time.perf_counter() - started
+
+
+def run_endpoint(url, token, concurrency, requests, timeout=30):
+    """
+    Return {"rps", "p50_ms", "p95_ms", "errors", "statuses"} for `requests` GET of `url` sent by `concurrency` clients.
+    """
+    # warm up the connections and the workers
+    for _ in range(min(concurrency, 10)):
+        _get(url, token, timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: _get(url, token, timeout), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(duration for _, duration in results)
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        "errors": sum(count for status, count in statuses.items() if status != 200),
+        "statuses": statuses,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the throughput of the read endpoints served by ASGI and WSGI.")
+    parser.add_argument("--server", action="append", required=True, help="name=base URL, e.g. asgi=http://localhost:8002 (repeatable)")
+    parser.add_argument("--token", required=True, help="JWT access token (staff user for the staff endpoints, qa for qa_tasks)")
+    parser.add_argument("--order-id", type=int, default=1)
+    parser.add_argument("--picklist-item-id", type=int, default=1)
+    parser.add_argument("--endpoint", action="append", choices=list(READ_ENDPOINTS), help="endpoints to run (default: all)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    servers = dict(server.split("=", 1) for server in args.server)
+    print(f"{'endpoint':<28} {'server':<8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    for name in args.endpoint or READ_ENDPOINTS:
+        path = READ_ENDPOINTS[name].format(order_id=args.order_id, picklist_item_id=args.picklist_item_id)
+        for server, base_url in servers.items():
+            result = run_endpoint(base_url.rstrip("/") + path, args.token, args.concurrency, args.requests)
+            print(f"{name:<28} {server:<8} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
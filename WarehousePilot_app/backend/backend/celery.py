@@ -3,6 +3,9 @@ import os
 
 from celery import Celery
 from django.conf import settings
+from task_monitor.locks import single_flight
+# connects the receivers measuring every task
+import task_monitor.instrumentation
 
 import logging
 
@@ -28,60 +31,24 @@ def task_test(self):
     logger.info('testing out celery beat tasks')
  
 @app.task(bind=True)
-def one_off_manu_task_generate(self):
-    from django.db.models import Q
-    from django.db.models import Sum
-    from orders.models import Orders
-    from manufacturingLists.models import ManufacturingLists, ManufacturingListItem, ManufacturingTask
-    from parts.models import Part
+@single_flight()
+def one_off_manu_task_generate(self, full=False):
+    from manufacturingLists.task_generation import run_task_generation
     from datetime import date
     from dateutil.relativedelta import relativedelta
     logger.info('inside one_off_manu_task_generate')
     today = date.today()
     logger.info(f'today\'s date: '+str(today))
     
-    #retrieve the orders that are overdue or have a null due date
-    overdueOrders = list(Orders.objects.filter(Q(due_date__lte=today) | Q(due_date=None)).values_list('order_id', flat=True))
-    for o in overdueOrders:
-        logger.info(o.__dict__)
-    #retrieve the manufacturing lists associated with any overdue or null due date orders
-    overdueManuLists = list(ManufacturingLists.objects.filter(order_id__in=overdueOrders))
-    for l in overdueManuLists:
-        logger.info(l.__dict__)
-    #retrieve the manufacturing lists associated with any overdue or null due date orders
-    overdueManuListItems = ManufacturingListItem.objects.filter(manufacturing_list_id__in = overdueManuLists)
-    #logger.info(str(overdueManuListItems))
-    skuColorsUnique = list(set(overdueManuListItems.values_list('sku_color', flat=True)))
-    #manuTasks = []
-    for s in skuColorsUnique:
-        logger.info(str(s))
-        matchingManuItems = overdueManuListItems.filter(sku_color=Part.objects.get(sku_color=s))
-        for m in matchingManuItems:
-            logger.info(m.__dict__)
-        totalQty = matchingManuItems.aggregate(totalQTY = Sum('amount'))['totalQTY']
-        dueDate = today + relativedelta(months=1)
-        logger.info(str(dueDate))
-        manuTask = ManufacturingTask.objects.create(sku_color = Part.objects.get(sku_color=s), qty = totalQty, due_date = dueDate, status = 'nesting')
-        logger.info(f'manuTask: '+ manuTask.__dict__)
-        #manuTask = ManufacturingTask(sku_color = Part.objects.get(sku_color=s), qty = totalQty, due_date = dueDate, status = 'nesting')
-        #manuTasks.append(manuTask)
-        #manuTask.save()
-        for m in matchingManuItems:
-            m.manufacturing_task = manuTask
-        ManufacturingListItem.objects.bulk_update(matchingManuItems, ['manufacturing_task'])
-    '''
-    for i in manuTasks:
-        logger.info(i.__dict__) 
-    ManufacturingTask.objects.bulk_create(manuTasks)
-    '''
+    #one task per sku_color for the manufacturing list items of the orders that are overdue or have a null due date,
+    #not assigned to a task yet, among the items added since the last run (all of them with full)
+    manuTasks = run_task_generation('one_off_manu_task_generate', None, today, today + relativedelta(months=1), full=full)
+    return len(manuTasks)
 
 @app.task(bind=True)
-def create_manuTasks(self):
-    from django.db.models import Q
-    from django.db.models import Sum
-    from orders.models import Orders
-    from manufacturingLists.models import ManufacturingLists, ManufacturingListItem, ManufacturingTask
-    from parts.models import Part
+@single_flight()
+def create_manuTasks(self, full=False):
+    from manufacturingLists.task_generation import run_task_generation
     from datetime import date
     from dateutil.relativedelta import relativedelta
     import datetime
@@ -96,33 +63,11 @@ def create_manuTasks(self):
     logger.info(f'beginning of Month '+str(beginningOfMonth))
     # The day 28 exists in every month. 4 days later, it's always next month
     next_month = threeMonths.replace(day=28) + datetime.timedelta(days=4)
-    #logger.info(f'nextmonth '+str(beginningOfMonth))
     # subtracting the number of the current day brings us back one month
     endOfMonth = next_month - datetime.timedelta(days=next_month.day)
     logger.info(f'end of Month '+str(endOfMonth))
     
-    #retrieve the orders that are upcoming (in three months) or have a null due date
-    upcomingOrders = list(Orders.objects.filter((Q(due_date__gte=beginningOfMonth) & Q(due_date__lte=endOfMonth)) | Q(due_date=None)).values_list('order_id', flat=True))
-    
-    #retrieve the manufacturing lists associated with any upcoming e or null due date orders
-    upcomingManuLists = list(ManufacturingLists.objects.filter(order_id__in=upcomingOrders))
-    
-    #retrieve the manufacturing lists associated with any upcoming or null due date orders
-    upcomingManuListItems = ManufacturingListItem.objects.filter(manufacturing_list_id__in = upcomingManuLists)
-    
-    skuColorsUnique = list(set(upcomingManuListItems.values_list('sku_color', flat=True)))
-    manuTasks = []
-    for s in skuColorsUnique:
-        duedate = today + relativedelta(months=1)
-        matchingManuItems = upcomingManuListItems.filter(sku_color=Part.objects.get(sku_color=s))
-        totalQty = upcomingManuListItems.filter(sku_color=Part.objects.get(sku_color=s)).aggregate(totalQTY = Sum('amount'))['totalQTY']
-        #manuTasks.append(ManufacturingTask(sku_color = Part.objects.get(sku_color=s), qty = totalQty, due_date = (today + relativedelta(months=1)), status = 'nesting'))
-        manuTask = ManufacturingTask.objects.create(sku_color = Part.objects.get(sku_color=s), qty = totalQty, due_date = duedate, status = 'nesting')
-        for m in matchingManuItems:
-            m.manufacturing_task = manuTask
-        ManufacturingListItem.objects.bulk_update(matchingManuItems, ['manufacturing_task'])
-    '''
-    for i in manuTasks:
-        logger.info(i.__dict__) 
-    ManufacturingTask.objects.bulk_create(manuTasks)
-   ''' 
\ No newline at end of file
+    #one task per sku_color for the manufacturing list items of the orders that are upcoming (in three months) or have
+    #a null due date, not assigned to a task yet, among the items added since the last run (all of them with full)
+    manuTasks = run_task_generation('create_manuTasks', beginningOfMonth, endOfMonth, today + relativedelta(months=1), full=full)
+    return len(manuTasks)
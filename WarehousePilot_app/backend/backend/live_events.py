@@ -0,0 +1,126 @@
+# This file defines the live events pushed to the dashboards with Server-Sent Events, instead of polling the endpoints.
+
+# publish_event: Publishes a small event (what changed and its ids) on the Redis channel once the transaction commits.
+# event_stream: Async generator turning the messages of a Redis subscription into SSE frames, with heartbeats.
+# live_events: Async view streaming the events (GET /events/?token=<access token>&types=item_picked,...).
+
+# Events: item_picked, item_repicked, order_started, order_completed, task_stage_changed, qa_error_raised.
+# Every worker publishes on one Redis pub/sub channel and every open stream subscribes to it, so an event reaches
+# the browsers as soon as it is published. The stream checks the JWT signature without loading the user, an idle
+# dashboard only holds a Redis subscription and puts no load on the database.
+# The stream is an async view served by the ASGI application (backend/asgi.py, uvicorn). Under WSGI (runserver,
+# gunicorn) Django reads the whole stream before sending it, which never ends, so the view answers 501 there.
+
+import json
+import logging
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger('WarehousePilot_app')
+
+EVENT_TYPES = ["item_picked", "item_repicked", "order_started", "order_completed", "task_stage_changed", "qa_error_raised"]
+# seconds between two heartbeats of an idle stream, keeps the proxies from closing it
+HEARTBEAT_INTERVAL = 15
+# milliseconds the browser waits before reconnecting a closed stream
+RECONNECT_DELAY = 1000
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.LIVE_EVENTS_URL)
+    return _client
+
+
+def _publish(message):
+    try:
+        _redis().publish(settings.LIVE_EVENTS_CHANNEL, message)
+    except Exception:
+        # the dashboards miss this event but the write itself succeeded
+        logger.exception("Failed to publish a live event")
+
+
+def publish_event(event_type, **data):
+    """
+    Publish `event_type` with `data` (JSON serializable ids and statuses) when the current transaction commits,
+    so that no stream announces a change that is rolled back. Does nothing when LIVE_EVENTS_URL is not set.
+    """
+    if not settings.LIVE_EVENTS_URL:
+        return
+    message = json.dumps({"type": event_type, **data}, default=str)
+    transaction.on_commit(lambda: _publish(message))
+
+
+def sse_frame(event_type, data):
+    return f"event: {event_type}\ndata: {data}\n\n"
+
+
+async def event_stream(pubsub, types=None, heartbeat=HEARTBEAT_INTERVAL):
+    """
+    Yield the SSE frames of the events received by `pubsub` (subscribed to the channel) of the given `types`
+    (all of them when None), and a comment line when no event came for `heartbeat` seconds.
+    """
+    yield f"retry: {RECONNECT_DELAY}\n\n"
+    while True:
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+        if message is None:
+            yield ": keepalive\n\n"
+            continue
+        data = message["data"].decode() if isinstance(message["data"], bytes) else message["data"]
+        try:
+            event_type = json.loads(data)["type"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignored a malformed live event: %s", data)
+            continue
+        if types is None or event_type in types:
+            yield sse_frame(event_type, data)
+
+
+async def _subscribed_stream(types):
+    client = redis.asyncio.Redis.from_url(settings.LIVE_EVENTS_URL)
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(settings.LIVE_EVENTS_CHANNEL)
+        async for frame in event_stream(pubsub, types):
+            yield frame
+    finally:
+        # the client went away: the ASGI handler cancels the generator
+        await pubsub.aclose()
+        await client.aclose()
+
+
+@require_GET
+async def live_events(request):
+    # EventSource cannot send an Authorization header, the access token is also accepted as ?token=
+    header = request.headers.get("Authorization", "")
+    token = header[len("Bearer "):] if header.startswith("Bearer ") else request.GET.get("token")
+    if not token:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+    try:
+        AccessToken(token)
+    except TokenError as e:
+        return JsonResponse({"error": str(e)}, status=401)
+
+    types = request.GET.get("types")
+    types = set(types.split(",")) if types else None
+    if types is not None and not types <= set(EVENT_TYPES):
+        return JsonResponse({"error": f"types must be among {', '.join(EVENT_TYPES)}"}, status=400)
+    if not settings.LIVE_EVENTS_URL:
+        return JsonResponse({"error": "Live events are disabled"}, status=503)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Live events need the ASGI server (uvicorn backend.asgi:application)"}, status=501)
+
+    response = StreamingHttpResponse(_subscribed_stream(types), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx would otherwise buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
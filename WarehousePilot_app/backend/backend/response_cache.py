@@ -0,0 +1,164 @@
+# This file defines the response cache of the dashboard endpoints (KPI, cycle time and delayed orders).
+
+# cached_response: Decorator caching the 200 responses of a GET view, keyed by the view and its query parameters.
+# invalidate_responses: Drops the cached responses of some views, or of every view (connected to the writes of the models the dashboards read).
+# cache_stats: Hit/miss counters of every cached view, exposed by kpi_dashboard.views.ResponseCacheStatsView.
+
+# The responses are stored in the default cache (Redis, shared by every worker). Instead of deleting keys, the
+# invalidation increments a generation number that is part of the keys, the old entries then expire with their TTL.
+# Every view has its own generation, next to the one of the whole cache, so a write only drops the responses of the
+# views reading the table it changed.
+# When several requests miss the same key at once, only the first computes the response (it holds a short lock),
+# the others wait for its result so that a dashboard opened by several managers is computed once.
+
+import hashlib
+import logging
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+logger = logging.getLogger('WarehousePilot_app')
+
+# default lifetime of a cached response, in seconds
+RESPONSE_CACHE_TIMEOUT = 300
+# how long a request waits for another request computing the same response before computing it itself
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+
+GENERATION_KEY = "response_cache:generation"
+VIEW_GENERATION_KEY = "response_cache:generation:{name}"
+STATS_KEY = "response_cache:stats:{name}:{counter}"
+# names of the cached views, to list their counters
+_cached_views = []
+
+
+def _enabled():
+    # the tests run with the dummy cache backend, the views are then called directly
+    return settings.CACHES["default"]["BACKEND"] != "django.core.cache.backends.dummy.DummyCache"
+
+
+def _generations(name):
+    # the generation of the whole cache and the one of the view, in one round trip
+    keys = [GENERATION_KEY, VIEW_GENERATION_KEY.format(name=name)]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, 0, None)
+            generations[key] = cache.get(key, 0)
+    return [generations[key] for key in keys]
+
+
+def _count(name, counter):
+    key = STATS_KEY.format(name=name, counter=counter)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # first increment of the counter
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_key(name, request):
+    params = urlencode(sorted(request.GET.lists()), doseq=True)
+    generation, view_generation = _generations(name)
+    return f"response_cache:{generation}.{view_generation}:{name}:{hashlib.md5(params.encode()).hexdigest()}"
+
+
+def invalidate_responses(*names, **kwargs):
+    """
+    Drop the cached responses of the views `names` (the names given to cached_response), or of every view when
+    no name is given. Also usable as a signal receiver.
+    """
+    for key in [VIEW_GENERATION_KEY.format(name=name) for name in names] or [GENERATION_KEY]:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+        except Exception:
+            logger.exception("Failed to invalidate the response cache")
+
+
+def cache_stats():
+    """
+    Return {view name: {"hits", "misses", "hit_rate"}} for every cached view.
+    """
+    counters = cache.get_many([STATS_KEY.format(name=name, counter=counter) for name in _cached_views for counter in ("hits", "misses")])
+    stats = {}
+    for name in _cached_views:
+        hits = counters.get(STATS_KEY.format(name=name, counter="hits"), 0)
+        misses = counters.get(STATS_KEY.format(name=name, counter="misses"), 0)
+        stats[name] = {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None}
+    return stats
+
+
+def _store(response):
+    # DRF responses are cached as data and rendered again on a hit, plain Django responses as bytes
+    if isinstance(response, Response):
+        return {"data": response.data}
+    return {"content": response.content, "content_type": response["Content-Type"]}
+
+
+def _restore(entry):
+    if "data" in entry:
+        response = Response(entry["data"], status=200)
+    else:
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+    response["X-Cache"] = "HIT"
+    return response
+
+
+def cached_response(name, timeout=RESPONSE_CACHE_TIMEOUT):
+    """
+    Cache the 200 responses of a GET view function or APIView method for `timeout` seconds.
+    On an APIView, decorate the get method so that the authentication and permissions still run on every request.
+    If the cache cannot be reached (or is the dummy backend) the view is computed as if nothing was cached.
+    """
+    _cached_views.append(name)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # the request is the first argument of a function view, the second of a method
+            request = args[0] if isinstance(args[0], (HttpRequest, Request)) else args[1]
+            if request.method != "GET" or not _enabled():
+                return view(*args, **kwargs)
+
+            locked = False
+            try:
+                key = cache_key(name, request)
+                entry = cache.get(key)
+                if entry is None:
+                    locked = cache.add(f"{key}:lock", 1, LOCK_WAIT)
+                if entry is None and not locked:
+                    # another request is computing this response, wait for it
+                    deadline = time.monotonic() + LOCK_WAIT
+                    while entry is None and time.monotonic() < deadline and cache.get(f"{key}:lock") is not None:
+                        time.sleep(LOCK_POLL_INTERVAL)
+                        entry = cache.get(key)
+                _count(name, "misses" if entry is None else "hits")
+            except Exception:
+                logger.exception("Response cache unavailable (%s)", name)
+                return view(*args, **kwargs)
+
+            if entry is not None:
+                return _restore(entry)
+
+            response = view(*args, **kwargs)
+            try:
+                if response.status_code == 200 and not getattr(response, "streaming", False):
+                    cache.set(key, _store(response), timeout)
+                    response["X-Cache"] = "MISS"
+                if locked:
+                    cache.delete(f"{key}:lock")
+            except Exception:
+                logger.exception("Failed to cache the response (%s)", name)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -63,6 +63,7 @@ INSTALLED_APPS = [
     "label_maker.apps.LabelMakerConfig",
     "oa_input.apps.OaInputConfig",
     'log_actions.apps.LogActionsConfig',
+    "task_monitor.apps.TaskMonitorConfig",
 ]
 
 MIDDLEWARE = [
@@ -268,14 +269,43 @@ CELERY_RESULT_BACKEND = 'redis://redis:6379'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
 # REDIS CACHE
-'''
-CACHES = {
-    "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": f"redis://127.0.0.1:6379/1",
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+# shared by every django worker, holds the cached dashboard responses (backend.response_cache) and, in
+# "table_versions", the change-versions of the tables behind the conditional GETs (orders.versioning)
+
+# the tests run without cache so that no response leaks between them, the cache tests enable a local memory cache;
+# the table versions only ever grow, they are kept in a local memory cache
+if 'test' in sys.argv:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        },
+        "table_versions": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "table_versions",
         },
     }
-}
-'''
\ No newline at end of file
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('CACHE_URL', 'redis://redis:6379/1'),
+        },
+        "table_versions": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('CACHE_URL', 'redis://redis:6379/1'),
+            "KEY_PREFIX": "table_versions",
+        },
+    }
+
+# LIVE EVENTS
+# Redis pub/sub channel of the events streamed to the dashboards (backend.live_events), disabled in the tests
+
+LIVE_EVENTS_URL = None if 'test' in sys.argv else os.getenv('LIVE_EVENTS_URL', 'redis://redis:6379/2')
+LIVE_EVENTS_CHANNEL = 'live_events'
+
+# CELERY TASK METRICS
+# histograms of the duration, queries and queue wait of the celery tasks (task_monitor.instrumentation), kept in Redis
+# and disabled in the tests; TASK_METRICS_TABLE=true also writes every run to the TaskMetric table
+
+TASK_METRICS_URL = None if 'test' in sys.argv else os.getenv('TASK_METRICS_URL', 'redis://redis:6379/3')
+TASK_METRICS_TABLE = os.getenv('TASK_METRICS_TABLE', 'false').lower() == 'true'
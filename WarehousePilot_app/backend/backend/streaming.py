@@ -0,0 +1,92 @@
+# This file defines the streaming JSON responses used by the list endpoints that can return whole tables.
+
+# wants_stream: True when the client asked for the streaming mode (?stream=true).
+# stream_json_array: Serializes rows read from a server-side cursor as JSON array chunks.
+# stream_json_object: Serializes a JSON object whose values are streamed arrays.
+# streaming_json_response: Wraps the JSON chunks in a StreamingHttpResponse.
+
+# In streaming mode the rows are read with .iterator(chunk_size=STREAM_CHUNK_SIZE) and written as they
+# come, so the memory used by a worker does not depend on the size of the table and the first bytes are
+# sent as soon as the first chunk is fetched. Under ASGI (uvicorn), Django reads a sync iterator into a list
+# before sending it, so the chunks are then pulled one at a time through sync_to_async by an async iterator.
+
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger('WarehousePilot_app')
+
+# number of rows fetched from the server-side cursor and written per chunk
+STREAM_CHUNK_SIZE = 2000
+
+
+def wants_stream(request):
+    return request.GET.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def stream_json_array(rows, serialize=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield `rows` as a JSON array, `chunk_size` rows at a time.
+
+    Args:
+        rows: iterable of rows, usually queryset.iterator(chunk_size=chunk_size)
+        serialize: optional function turning a row into a JSON serializable object, rows for which it returns None are skipped
+        chunk_size: number of rows written per chunk
+    """
+    encode = JSONEncoder().encode
+    buffer = []
+    separator = "["
+    for row in rows:
+        if serialize is not None:
+            row = serialize(row)
+            if row is None:
+                continue
+        buffer.append(separator + encode(row))
+        separator = ","
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+    buffer.append("[]" if separator == "[" else "]")
+    yield "".join(buffer)
+
+
+async def _pull(chunks):
+    # the chunks are read in the thread of the sync view (thread_sensitive), which holds the database connection
+    # of its server-side cursor
+    read = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while (chunk := await read(chunks, done)) is not done:
+        yield chunk
+
+
+def streaming_json_response(request, chunks, view_name):
+    """
+    Return a StreamingHttpResponse writing `chunks`, served by an async iterator when `request` came through
+    the ASGI handler. The status code is sent before the rows are read, so an error in the middle of the
+    stream is logged and ends the response early (invalid JSON).
+    """
+    def guarded():
+        try:
+            yield from chunks
+        except Exception:
+            logger.exception("Failed to stream the response (%s)", view_name)
+
+    # a DRF Request wraps the Django request
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return StreamingHttpResponse(_pull(guarded()), content_type="application/json")
+    return StreamingHttpResponse(guarded(), content_type="application/json")
+
+
+def stream_json_object(parts):
+    """
+    Yield a JSON object whose values are chunk iterables, `parts` being a list of (key, chunks).
+    """
+    separator = "{"
+    for key, chunks in parts:
+        yield f"{separator}{json.dumps(key)}:"
+        yield from chunks
+        separator = ","
+    yield "{}" if separator == "{" else "}"
@@ -0,0 +1,530 @@
+"""
+Query-count budget tests for every URL of backend/urls.py, and tests of the live events (backend/live_events.py).
+
+This file includes:
+- Tests that seed the database at two scales, call every URL with GET and check that the number of queries
+  of each endpoint is the same at both scales and stays within its declared budget (`QueryBudgetTests`).
+- Tests that the writes publish their live event once committed and that the stream frames them (`LiveEventsTests`).
+- Tests that the hot read endpoints are async views authenticating like the DRF views (`AsyncViewsTests`).
+- Tests that the streaming endpoints are streamed chunk by chunk by the ASGI handler (`AsgiStreamingTests`).
+
+When an endpoint issues more queries at the large scale (N+1), the test fails and prints the SQL templates
+whose count grew. Every URL must declare its budget in QUERY_BUDGETS, a new URL without budget fails the test.
+"""
+
+import asyncio
+import json
+import re
+import warnings
+from unittest.mock import patch
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from collections import Counter
+from datetime import timedelta
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, resolve, URLPattern, URLResolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.live_events import event_stream, publish_event
+from auth_app.models import users
+from parts.models import Part
+from orders.models import Orders, OrderPart, ListGenerationJob
+from orders.milestones import refresh_order_milestones
+from inventory.models import Inventory, InventoryPicklist, InventoryPicklistItem
+from manufacturingLists.models import ManufacturingLists, ManufacturingListItem, ManufacturingTask, QAErrorReport
+
+# number of orders (and of every related row) seeded for the two measures
+SMALL_SCALE = 10
+LARGE_SCALE = 100
+
+# route -> (role of the user calling it, maximum number of queries of a GET)
+# POST only endpoints answer 405 without querying the database and have a budget of 0.
+QUERY_BUDGETS = {
+    "auth/login/": ("admin", 0),
+    "auth/change_password/": ("admin", 0),
+    "auth/profile/": ("admin", 0),
+    "auth/retrieve_users/": ("admin", 1),
+    "auth/theme/": ("admin", 0),
+    "auth/password-reset-request/": ("admin", 0),
+    "auth/password-reset/": ("admin", 0),
+    "admin_dashboard/manage_users/": ("admin", 1),
+    "admin_dashboard/add_user/": ("admin", 0),
+    "admin_dashboard/edit_user/<int:user_id>/": ("admin", 1),
+    "admin_dashboard/delete_user/<int:user_id>/": ("admin", 0),
+    "manager_dashboard/": ("manager", 0),
+    "orders/generateLists/": ("admin", 0),
+    "orders/generateLists/batch/": ("admin", 0),
+    "orders/generateLists/jobs/<uuid:job_id>/": ("admin", 1),
+    "orders/available_to_promise/": ("admin", 5),
+    "orders/ordersview/": ("admin", 2),
+    "orders/start_order/<int:order_id>/": ("admin", 0),
+    "orders/inventory_picklist/": ("admin", 2),
+    "orders/inventory_picklist_items/<int:order_id>/": ("admin", 3),
+    "orders/cycle_time_per_order/": ("admin", 1),
+    "orders/delayed_orders/": ("admin", 1),
+    "orders/ctpo_preview/": ("admin", 0),
+    "parts/": ("admin", 0),
+    "manufacturingLists/manufacturing_list/": ("admin", 1),
+    "manufacturingLists/manufacturing_list_item/<int:order_id>/": ("admin", 3),
+    "manufacturingLists/manufacturing_tasks/": ("admin", 1),
+    "inventory/": ("admin", 2),
+    "inventory/delete": ("admin", 0),
+    "inventory/csrf-token": ("admin", 0),
+    "inventory/add": ("admin", 0),
+    "inventory/inventorypreview/": ("admin", 1),
+    "inventory/auth/staff": ("admin", 0),
+    "inventory/assign_order/<int:order_id>": ("admin", 0),
+    "inventory/assigned_inventory_picklist/": ("staff", 1),
+    "inventory/inventory_picklist_items/<int:picklist_item_id>/pick/": ("staff", 0),
+    "inventory/update_inventory_item": ("admin", 0),
+    "inventory/inventory_picklist_items/<int:picklist_item_id>/repick/": ("staff", 0),
+    "reports/": ("admin", 0),
+    "staff_dashboard/": ("staff", 0),
+    "staff_dashboard/staff_manufacturing_tasks/": ("staff", 2),
+    "staff_dashboard/complete_task/<int:task_id>/": ("staff", 0),
+    "logging/log/": ("admin", 0),
+    "qa_dashboard/": ("qa", 0),
+    "qa_dashboard/qa_tasks/": ("qa", 1),
+    "qa_dashboard/qa_tasks/update/": ("qa", 0),
+    "qa_dashboard/qa_tasks/report_error/": ("qa", 0),
+    "qa_dashboard/qa_tasks/update_status/": ("qa", 0),
+    "qa_dashboard/qa_tasks/error_reports/": ("qa", 1),
+    "qa_dashboard/qa_tasks/error_reports/resolve/": ("manager", 0),
+    "qa_dashboard/send_to_pick_and_pack/": ("qa", 0),
+    "kpi_dashboard/order-picking-accuracy/": ("admin", 1),
+    "kpi_dashboard/order-picking-daily-stats/": ("admin", 1),
+    "kpi_dashboard/order-picking-daily-details/": ("admin", 1),
+    "kpi_dashboard/order-fulfillment-rate/": ("admin", 2),
+    "kpi_dashboard/active-orders/": ("admin", 1),
+    "kpi_dashboard/completed-orders/": ("admin", 1),
+    "kpi_dashboard/active-orders-details/": ("admin", 2),
+    "kpi_dashboard/throughput-threshold/": ("admin", 1),
+    "kpi_dashboard/bundle/": ("admin", 7),
+    "kpi_dashboard/response-cache-stats/": ("admin", 0),
+    "label_maker/<int:picklist_item_id>/": ("staff", 1),
+    "label_maker/order/<int:order_id>/": ("staff", 2),
+    "oa_input/oa_in/": ("admin", 0),
+    "picking_logs/": ("admin", 1),
+    "events/": ("admin", 0),
+    "task_monitor/metrics/": ("admin", 0),
+}
+
+# URL namespaces that are not part of the API
+SKIPPED_PREFIXES = ("admin/",)
+
+
+def sql_template(sql):
+    # replace the literals of a query so that the same query with different parameters has the same template
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(\.\d+)?\b", "?", sql)
+    sql = re.sub(r"\((?:\?, )+\?\)", "(...)", sql)
+    return sql
+
+
+def collect_routes(patterns=None, prefix=""):
+    """
+    Return (route, pattern) for every URL pattern of the project, recursively through the includes.
+    """
+    routes = []
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            routes += collect_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            routes.append((route, pattern))
+    return [(route, pattern) for route, pattern in routes if not route.startswith(SKIPPED_PREFIXES)]
+
+
+class QueryBudgetTests(TestCase):
+    # setUp(): creates one user per role, the scales are seeded by the test itself
+    def setUp(self):
+        self.users = {}
+        for role in ["admin", "manager", "staff", "qa"]:
+            self.users[role] = users.objects.create_user(
+                username=f"budget_{role}",
+                password="password",
+                email=f"budget_{role}@example.com",
+                first_name="Budget",
+                last_name=role.capitalize(),
+                role=role,
+                department="Testing",
+                date_of_hire="2020-01-01",
+            )
+        self.job = ListGenerationJob.objects.create(order_ids=[1], total_orders=1, status="completed")
+        self.nb_seeded = 0
+
+    # seed(): adds orders, with their parts, inventory, picklists, manufacturing lists, tasks and QA reports, up to `count` orders
+    def seed(self, count):
+        now = timezone.now()
+        today = now.date()
+        ids = range(self.nb_seeded + 1, count + 1)
+        statuses = ["In Progress", "Completed", "Not Started"]
+        processes = ["nesting", "bending", "cutting", "welding", "painting", "completed"]
+        staff, qa = self.users["staff"], self.users["qa"]
+
+        parts = Part.objects.bulk_create([Part(sku_color=f"BUDGET-{i}", sku=f"B{i}", description="budget part") for i in ids])
+        orders = Orders.objects.bulk_create([
+            Orders(
+                order_id=i,
+                estimated_duration=i % 7,
+                status=statuses[i % 3],
+                due_date=today + timedelta(days=i % 11 - 5),
+                start_timestamp=now - timedelta(days=i % 20 + 1),
+                end_timestamp=now - timedelta(days=i % 5) if i % 3 == 1 else None,
+                ship_date=today - timedelta(days=i % 9) if i % 3 == 1 else None,
+                customer_name=f"Customer {i % 4}",
+                project_type=["SDR", "WW", "WR"][i % 3],
+            ) for i in ids
+        ])
+        OrderPart.objects.bulk_create([
+            OrderPart(order_id=order, sku_color=part, qty=5, location="LOC", packed_timestamp=now - timedelta(days=i % 10) if i % 2 else None)
+            for i, order, part in zip(ids, orders, parts)
+        ])
+        inventory = Inventory.objects.bulk_create([
+            Inventory(location=f"LOC-{i}", sku_color=part, qty=i * 10 % 150, warehouse_number="499", amount_needed=0)
+            for i, part in zip(ids, parts)
+        ])
+        picklists = InventoryPicklist.objects.bulk_create([
+            InventoryPicklist(
+                order_id=order,
+                status=order.status == "Completed",
+                assigned_employee_id=staff if i % 2 else self.users["admin"],
+                warehouse_nb="499",
+                picklist_complete_timestamp=now - timedelta(days=i % 10) if order.status == "Completed" else None,
+            ) for i, order in zip(ids, orders)
+        ])
+        InventoryPicklistItem.objects.bulk_create([
+            InventoryPicklistItem(
+                picklist_id=picklist,
+                location=location,
+                sku_color=part,
+                amount=2,
+                status=picked,
+                picked_at=now - timedelta(days=i % 15) if picked else None,
+                item_picked_timestamp=now - timedelta(days=i % 15) if picked else None,
+                manually_picked=i % 4 == 0,
+                repick=i % 5 == 0,
+            )
+            for i, picklist, location, part in zip(ids, picklists, inventory, parts)
+            for picked in [True, i % 2 == 0]
+        ])
+        tasks = ManufacturingTask.objects.bulk_create([
+            ManufacturingTask(
+                sku_color=part,
+                qty=3,
+                due_date=today + timedelta(days=i % 10),
+                status=processes[i % len(processes)],
+                nesting_employee=staff, bending_employee=staff, cutting_employee=staff, welding_employee=staff, paint_employee=staff,
+                prod_qa_employee=qa, paint_qa_employee=qa,
+                nesting_start_time=now - timedelta(days=3), nesting_end_time=now - timedelta(days=2),
+            ) for i, part in zip(ids, parts)
+        ])
+        manufacturing_lists = ManufacturingLists.objects.bulk_create([
+            ManufacturingLists(order_id=order, status="In Progress") for order in orders
+        ])
+        ManufacturingListItem.objects.bulk_create([
+            ManufacturingListItem(manufacturing_list_id=m_list, sku_color=part, amount=3, manufacturing_process="nesting",
+                                  process_progress="In Progress", manufacturing_task=task)
+            for m_list, part, task in zip(manufacturing_lists, parts, tasks)
+        ])
+        QAErrorReport.objects.bulk_create([
+            QAErrorReport(manufacturing_task=task, subject="budget", comment="budget", reported_by=qa) for task in tasks
+        ])
+        # bulk_create does not send the signals maintaining the materialized tables, build them like the backfill commands
+        refresh_order_milestones(ids)
+        self.nb_seeded = count
+
+    # url_for(): builds the URL of a route, filling its parameters with rows that exist at both scales
+    def url_for(self, route):
+        values = {
+            "order_id": 1,
+            "picklist_item_id": InventoryPicklistItem.objects.order_by("picklist_item_id").first().picklist_item_id,
+            "task_id": ManufacturingTask.objects.order_by("manufacturing_task_id").first().manufacturing_task_id,
+            "user_id": self.users["staff"].user_id,
+            "job_id": self.job.job_id,
+        }
+        return "/" + re.sub(r"<(?:\w+:)?(\w+)>", lambda m: str(values[m.group(1)]), route)
+
+    # measure(): calls every route with GET and returns route -> captured queries
+    def measure(self, routes):
+        measures = {}
+        for route, _ in routes:
+            role = QUERY_BUDGETS.get(route, ("admin", 0))[0]
+            client = APIClient()
+            # a view crashing on GET (e.g. POST only function views) is measured like the others
+            client.raise_request_exception = False
+            client.force_authenticate(user=self.users[role])
+            url = self.url_for(route)
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+                if getattr(response, "streaming", False):
+                    b"".join(response.streaming_content)
+            measures[route] = (response.status_code, [q["sql"] for q in queries])
+        return measures
+
+    # test_query_counts_do_not_scale(): Test that no endpoint issues more queries when the tables grow
+    def test_query_counts_do_not_scale(self):
+        routes = collect_routes()
+
+        # Arrange & Act: measure every endpoint at both scales
+        self.seed(SMALL_SCALE)
+        small = self.measure(routes)
+        self.seed(LARGE_SCALE)
+        large = self.measure(routes)
+
+        # Assert: collect the endpoints without budget, over budget or whose query count grew
+        failures = []
+        for route, _ in routes:
+            small_count, large_count = len(small[route][1]), len(large[route][1])
+            if route not in QUERY_BUDGETS:
+                failures.append(f"{route}: no query budget declared ({small_count} queries at {SMALL_SCALE} orders, {large_count} at {LARGE_SCALE})")
+                continue
+            budget = QUERY_BUDGETS[route][1]
+            scales = large_count > small_count
+            if scales:
+                grown = Counter(map(sql_template, large[route][1])) - Counter(map(sql_template, small[route][1]))
+                templates = "\n".join(f"    +{n} x {sql}" for sql, n in grown.most_common(5))
+                failures.append(f"{route}: {small_count} queries at {SMALL_SCALE} orders, {large_count} at {LARGE_SCALE}\n{templates}")
+            elif large_count > budget:
+                failures.append(f"{route}: {large_count} queries, over its budget of {budget}")
+
+        if failures:
+            self.fail("\n" + "\n".join(failures))
+
+
+class FakePubSub:
+    # stands for a subscribed redis.asyncio PubSub, get_message returns the queued messages then None (timeout)
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        return self.messages.pop(0) if self.messages else None
+
+
+@override_settings(LIVE_EVENTS_URL="redis://redis:6379/2")
+class LiveEventsTests(TestCase):
+    # setUp(): creates a staff user with a picklist item to pick
+    def setUp(self):
+        self.user = users.objects.create_user(
+            username="live_staff",
+            password="password",
+            email="live_staff@example.com",
+            first_name="Live",
+            last_name="Staff",
+            role="staff",
+            department="Testing",
+            date_of_hire="2020-01-01",
+        )
+        part = Part.objects.create(sku_color="LIVE-1", sku="L1", description="live part")
+        order = Orders.objects.create(order_id=1, status="In Progress")
+        picklist = InventoryPicklist.objects.create(order_id=order, assigned_employee_id=self.user, status=False)
+        self.item = InventoryPicklistItem.objects.create(picklist_id=picklist, sku_color=part, amount=1, status=False)
+        self.token = str(AccessToken.for_user(self.user))
+
+    # frames(): collects the first `count` frames of the stream of `messages`
+    def frames(self, messages, count, types=None):
+        async def collect():
+            stream = event_stream(FakePubSub(messages), types, heartbeat=0)
+            return [await stream.__anext__() for _ in range(count)]
+        return async_to_sync(collect)()
+
+    # test_pick_publishes_after_commit(): Test that picking an item publishes item_picked once the transaction commits
+    def test_pick_publishes_after_commit(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        # Act: pick the item, publishing nothing before the commit
+        with patch("backend.live_events._publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                client.patch(f"/inventory/inventory_picklist_items/{self.item.picklist_item_id}/pick/", {"picked_quantity": 1}, format="json")
+                self.assertFalse(publish.called)
+
+        # Assert
+        event = json.loads(publish.call_args.args[0])
+        self.assertEqual(event, {"type": "item_picked", "picklist_item_id": self.item.picklist_item_id, "picklist_id": self.item.picklist_id_id, "order_id": 1})
+
+    # test_rolled_back_write_publishes_nothing(): Test that an event published in a rolled back transaction is dropped
+    def test_rolled_back_write_publishes_nothing(self):
+        with patch("backend.live_events._publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        publish_event("order_started", order_id=1)
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+        self.assertFalse(publish.called)
+
+    # test_stream_frames_the_events(): Test that the stream frames the events of the requested types and sends heartbeats
+    def test_stream_frames_the_events(self):
+        messages = [
+            {"type": "message", "data": b'{"type": "item_picked", "picklist_item_id": 3}'},
+            {"type": "message", "data": b'not json'},
+            {"type": "message", "data": b'{"type": "qa_error_raised", "task_id": 4}'},
+        ]
+
+        with self.assertLogs("WarehousePilot_app", level="WARNING"):
+            frames = self.frames(messages, 3, types={"qa_error_raised"})
+
+        self.assertTrue(frames[0].startswith("retry: "))
+        self.assertEqual(frames[1], 'event: qa_error_raised\ndata: {"type": "qa_error_raised", "task_id": 4}\n\n')
+        self.assertEqual(frames[2], ": keepalive\n\n")
+
+    # test_stream_authentication(): Test that the stream needs a valid access token and does not query the database
+    def test_stream_authentication(self):
+        client = Client()
+        self.assertEqual(client.get("/events/").status_code, 401)
+        self.assertEqual(client.get("/events/", {"token": "invalid"}).status_code, 401)
+        self.assertEqual(client.get("/events/", {"token": self.token, "types": "item_picked,unknown"}).status_code, 400)
+
+        with override_settings(LIVE_EVENTS_URL=None), CaptureQueriesContext(connection) as queries:
+            response = client.get("/events/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(queries), 0)
+
+    # test_stream_needs_asgi(): Test that the stream is refused under WSGI, which would read it forever before answering
+    def test_stream_needs_asgi(self):
+        with patch("backend.live_events.redis.asyncio.Redis.from_url") as connect:
+            response = Client().get("/events/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        self.assertEqual(response.status_code, 501)
+        self.assertIn("ASGI", response.json()["error"])
+        self.assertFalse(connect.called)
+
+
+class AsyncViewsTests(TestCase):
+    # setUp(): creates a staff user with an in progress order, its picklist and one item
+    def setUp(self):
+        self.user = users.objects.create_user(
+            username="async_staff",
+            password="password",
+            email="async_staff@example.com",
+            first_name="Async",
+            last_name="Staff",
+            role="staff",
+            department="Testing",
+            date_of_hire="2020-01-01",
+        )
+        part = Part.objects.create(sku_color="ASYNC-1", sku="A1", description="async part")
+        order = Orders.objects.create(order_id=1, status="In Progress", due_date=timezone.now().date())
+        picklist = InventoryPicklist.objects.create(order_id=order, assigned_employee_id=self.user, status=False)
+        self.item = InventoryPicklistItem.objects.create(picklist_id=picklist, sku_color=part, amount=3, status=False)
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.urls = [
+            "/inventory/assigned_inventory_picklist/",
+            "/orders/inventory_picklist_items/1/",
+            "/staff_dashboard/staff_manufacturing_tasks/",
+            "/qa_dashboard/qa_tasks/",
+            f"/label_maker/{self.item.picklist_item_id}/",
+            "/label_maker/order/1/",
+        ]
+
+    # test_hot_read_endpoints_are_async(): Test that the ASGI handler runs the hot read endpoints without a thread
+    def test_hot_read_endpoints_are_async(self):
+        for url in self.urls:
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+
+    # test_async_client_with_access_token(): Test the endpoints through the ASGI request handler with a JWT access token
+    async def test_async_client_with_access_token(self):
+        # Act
+        picklists = await self.async_client.get("/inventory/assigned_inventory_picklist/", headers=self.headers)
+        items = await self.async_client.get("/orders/inventory_picklist_items/1/", headers=self.headers)
+        labels = await self.async_client.get("/label_maker/order/1/", headers=self.headers)
+
+        # Assert
+        self.assertEqual(picklists.status_code, 200)
+        self.assertEqual([x["order_id"] for x in picklists.json()], [1])
+        self.assertEqual([x["picklist_item_id"] for x in items.json()], [self.item.picklist_item_id])
+        self.assertEqual(labels.json()["labels"][0]["SEQUENCE"], "1 of 1")
+
+    # test_authentication_errors(): Test that the async views refuse the requests like the DRF views
+    def test_authentication_errors(self):
+        client = Client()
+        for url in self.urls:
+            self.assertEqual(client.get(url).status_code, 401, url)
+
+        response = client.get(self.urls[0], headers={"Authorization": "Bearer invalid"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+        self.assertEqual(client.post(self.urls[0], headers=self.headers).status_code, 405)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get(self.urls[0], headers=self.headers).status_code, 401)
+
+
+class AsgiStreamingTests(TransactionTestCase):
+    # setUp(): creates an admin with two inventory rows, an order with its manufacturing list and a picked item
+    # (the ASGI handler runs the views in its own thread, with its own database connection)
+    def setUp(self):
+        self.user = users.objects.create_user(
+            username="stream_admin",
+            password="password",
+            email="stream_admin@example.com",
+            first_name="Stream",
+            last_name="Admin",
+            role="admin",
+            department="Testing",
+            date_of_hire="2020-01-01",
+        )
+        part = Part.objects.create(sku_color="STREAM-1", sku="S1", description="streamed part")
+        location = Inventory.objects.create(location="LOC 1", sku_color=part, qty=10, warehouse_number="499", amount_needed=0)
+        Inventory.objects.create(location="LOC 2", sku_color=part, qty=80, warehouse_number="499", amount_needed=0)
+        order = Orders.objects.create(order_id=1, status="In Progress", due_date=timezone.now().date())
+        ManufacturingLists.objects.create(order_id=order, status="Pending")
+        picklist = InventoryPicklist.objects.create(order_id=order, assigned_employee_id=self.user, status=False)
+        InventoryPicklistItem.objects.create(
+            picklist_id=picklist, sku_color=part, location=location, amount=3, status=True, picked_at=timezone.now()
+        )
+
+    def asgi_get(self, path):
+        """
+        GET `path` with ?stream=true through the ASGI handler, return the body messages sent and the warnings raised.
+        """
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "query_string": b"stream=true", "root_path": "",
+            "headers": [(b"authorization", f"Bearer {AccessToken.for_user(self.user)}".encode())],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+        messages = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # the client stays connected until the handler is done
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            async_to_sync(ASGIHandler())(scope, receive, send)
+        self.assertEqual(messages[0]["status"], 200, path)
+        return [x for x in messages if x["type"] == "http.response.body"], [str(x.message) for x in caught]
+
+    # test_streaming_endpoints_under_asgi(): Test that the chunks of the streaming endpoints are sent as they are read
+    def test_streaming_endpoints_under_asgi(self):
+        for path, check in [
+            ("/inventory/", lambda data: self.assertEqual([x["status"] for x in data["low_stock_items"]], ["Low"])),
+            ("/inventory/inventorypreview/", lambda data: self.assertEqual(len(data), 2)),
+            ("/orders/ordersview/", lambda data: self.assertEqual([x["order_id"] for x in data], [1])),
+            ("/manufacturingLists/manufacturing_list/", lambda data: self.assertEqual(data[0]["order_id"], 1)),
+            ("/picking_logs/", lambda data: self.assertEqual(data[0]["qty_out"], 3)),
+        ]:
+            # Act
+            bodies, caught = self.asgi_get(path)
+
+            # Assert
+            self.assertFalse([x for x in caught if "StreamingHttpResponse must consume" in x], path)
+            self.assertEqual([x.get("more_body", False) for x in bodies], [True] * (len(bodies) - 1) + [False], path)
+            check(json.loads(b"".join(x.get("body", b"") for x in bodies)))
+
+        # the inventory object is sent in several chunks (its keys and both arrays)
+        bodies, caught = self.asgi_get("/inventory/")
+        self.assertGreater(len([x for x in bodies if x.get("body")]), 2)
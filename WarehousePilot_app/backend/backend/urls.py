@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from .live_events import live_events
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -34,4 +35,6 @@ urlpatterns = [
     path('label_maker/', include('label_maker.urls')),
     path('oa_input/', include('oa_input.urls')),
     path('picking_logs/', include('log_actions.urls')),
+    path('task_monitor/', include('task_monitor.urls')),
+    path('events/', live_events, name='live_events'),
 ]
\ No newline at end of file
@@ -0,0 +1,108 @@
+# This file defines the running pick counters (PickCounter, DailyPickCounter) read by the pick accuracy KPI.
+
+# item_state: Snapshot of what a picklist item contributes to the counters.
+# record_item_change: Applies the difference between two snapshots of an item to the counters, atomically.
+# add_to_counters: Adds deltas to the global counters with a single upsert.
+# reconcile_pick_counters: Rebuilds every counter from the picklist items.
+
+# The counters are changed with INSERT ... ON CONFLICT DO UPDATE SET value = value + delta, in the transaction
+# that writes the item, so concurrent picks never lose an increment. Picklist items deleted (in cascade of their
+# order) or changed in bulk outside of the picking views are not counted, run reconcile_pick_counters after them.
+
+from collections import Counter, defaultdict
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import InventoryPicklistItem, PickCounter, DailyPickCounter
+
+# item field -> counter
+COUNTED_FIELDS = {"status": "picked", "repick": "repicked", "manually_picked": "manually_picked"}
+PICK_COUNTERS = ["total"] + list(COUNTED_FIELDS.values())
+
+
+def item_state(item):
+    """
+    Return what `item` contributes to the counters: its counted flags, picking day and picker.
+    The picklist of the item should be loaded with it (select_related("picklist_id")).
+    """
+    state = {field: bool(getattr(item, field)) for field in COUNTED_FIELDS}
+    state["day"] = timezone.localdate(item.picked_at) if item.picked_at else None
+    state["employee"] = item.picklist_id.assigned_employee_id_id
+    return state
+
+
+def add_to_counters(deltas):
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    table = PickCounter._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (name, value) VALUES {', '.join(['(%s, %s)'] * len(deltas))} "
+            f"ON CONFLICT (name) DO UPDATE SET value = {table}.value + EXCLUDED.value",
+            [x for item in deltas.items() for x in item],
+        )
+
+
+def _add_to_daily_counters(deltas):
+    rows = [(day, employee, x["picked"], x["repicked"], x["manually_picked"]) for (day, employee), x in deltas.items() if any(x.values())]
+    if not rows:
+        return
+    table = DailyPickCounter._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (day, employee_id, picked, repicked, manually_picked) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))} "
+            f"ON CONFLICT (day, employee_id) DO UPDATE SET picked = {table}.picked + EXCLUDED.picked, "
+            f"repicked = {table}.repicked + EXCLUDED.repicked, manually_picked = {table}.manually_picked + EXCLUDED.manually_picked",
+            [x for row in rows for x in row],
+        )
+
+
+def record_item_change(before, after):
+    """
+    Update the counters with the change of a picklist item from the `before` to the `after` item_state.
+    Call it in the transaction saving the item.
+    """
+    totals = Counter()
+    daily = defaultdict(lambda: {counter: 0 for counter in COUNTED_FIELDS.values()})
+    for state, sign in ((before, -1), (after, 1)):
+        for field, counter in COUNTED_FIELDS.items():
+            if state[field]:
+                totals[counter] += sign
+                if state["day"] is not None:
+                    daily[(state["day"], state["employee"])][counter] += sign
+    add_to_counters(totals)
+    _add_to_daily_counters(daily)
+
+
+def reconcile_pick_counters():
+    """
+    Rebuild the global and daily counters from the picklist items, returns the global counters.
+    The counter tables are locked first, so the picks made meanwhile wait and are added on top of the rebuilt values.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {PickCounter._meta.db_table}, {DailyPickCounter._meta.db_table} IN EXCLUSIVE MODE")
+
+        # the annotations are prefixed, manually_picked being also a field of the items
+        counts = {f"n_{counter}": Count("picklist_item_id", filter=Q(**{field: True})) for field, counter in COUNTED_FIELDS.items()}
+        totals = InventoryPicklistItem.objects.aggregate(n_total=Count("picklist_item_id"), **counts)
+        totals = {name: totals[f"n_{name}"] for name in PICK_COUNTERS}
+        daily = (
+            InventoryPicklistItem.objects
+            .filter(picked_at__isnull=False)
+            .annotate(day=TruncDate("picked_at"), employee=F("picklist_id__assigned_employee_id"))
+            .values("day", "employee")
+            .annotate(**counts)
+        )
+
+        PickCounter.objects.all().delete()
+        PickCounter.objects.bulk_create([PickCounter(name=name, value=value) for name, value in totals.items()])
+        DailyPickCounter.objects.all().delete()
+        DailyPickCounter.objects.bulk_create([
+            DailyPickCounter(day=x["day"], employee_id=x["employee"], **{counter: x[f"n_{counter}"] for counter in COUNTED_FIELDS.values()})
+            for x in daily
+        ])
+    return totals
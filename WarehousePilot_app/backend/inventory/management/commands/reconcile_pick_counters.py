@@ -0,0 +1,13 @@
+# Rebuilds the pick counters (PickCounter, DailyPickCounter) from the picklist items.
+# Usage: python manage.py reconcile_pick_counters
+
+from django.core.management.base import BaseCommand
+from inventory.counters import reconcile_pick_counters
+
+
+class Command(BaseCommand):
+    help = "Recounts the total, picked, repicked and manually picked items, globally and per day and employee."
+
+    def handle(self, *args, **options):
+        totals = reconcile_pick_counters()
+        self.stdout.write(self.style.SUCCESS("Reconciled the pick counters: " + ", ".join(f"{name}={value}" for name, value in totals.items())))
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-17 18:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_inventorypicklistitem_actual_picked_quantity'),
+        ('orders', '0011_listgenerationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryReservation',
+            fields=[
+                ('reservation_id', models.AutoField(primary_key=True, serialize=False)),
+                ('amount', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventory.inventory')),
+                ('order_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='orders.orders')),
+                ('picklist_item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.inventorypicklistitem')),
+            ],
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+
+# picklist item field -> counter
+COUNTED_FIELDS = {"status": "picked", "repick": "repicked", "manually_picked": "manually_picked"}
+
+
+def backfill_counters(apps, schema_editor):
+    # same computation as inventory.counters.reconcile_pick_counters, on the historical models
+    InventoryPicklistItem = apps.get_model("inventory", "InventoryPicklistItem")
+    PickCounter = apps.get_model("inventory", "PickCounter")
+    DailyPickCounter = apps.get_model("inventory", "DailyPickCounter")
+
+    counts = {f"n_{counter}": Count("picklist_item_id", filter=Q(**{field: True})) for field, counter in COUNTED_FIELDS.items()}
+    totals = InventoryPicklistItem.objects.aggregate(n_total=Count("picklist_item_id"), **counts)
+    PickCounter.objects.bulk_create([PickCounter(name=name[2:], value=value) for name, value in totals.items()])
+    DailyPickCounter.objects.bulk_create([
+        DailyPickCounter(day=x["day"], employee_id=x["employee"], **{counter: x[f"n_{counter}"] for counter in COUNTED_FIELDS.values()})
+        for x in InventoryPicklistItem.objects.filter(picked_at__isnull=False)
+        .annotate(day=TruncDate("picked_at"), employee=F("picklist_id__assigned_employee_id"))
+        .values("day", "employee")
+        .annotate(**counts)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_inventoryreservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPickCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('picked', models.IntegerField(default=0)),
+                ('repicked', models.IntegerField(default=0)),
+                ('manually_picked', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'employee'), name='daily_pick_counter_day_employee', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
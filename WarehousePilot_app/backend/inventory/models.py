@@ -47,5 +47,45 @@ class InventoryPicklistItem(models.Model):
       repick_reason = models.TextField(null=True, blank=True)
       actual_picked_quantity = models.IntegerField(default=0)  # New field to store the actual picked amount
 
+class InventoryReservation(models.Model):
+      """
+      Ledger of the quantities reserved on an inventory location by list generation.
+      Each allocation appends a row here and atomically adds the same amount to Inventory.amount_needed.
+      amount_needed is also set by hand (add_inventory_item, update_inventory_item) and nothing is released
+      when the items are picked, so it is not the sum of the reservations: the ledger records what list
+      generation reserved, when and for which order.
+      """
+      reservation_id = models.AutoField(primary_key=True)
+      inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name='reservations')
+      order_id = models.ForeignKey(Orders, on_delete=models.CASCADE)
+      picklist_item = models.ForeignKey(InventoryPicklistItem, null=True, on_delete=models.SET_NULL)
+      amount = models.IntegerField()
+      created_at = models.DateTimeField(auto_now_add=True)
+
+class PickCounter(models.Model):
+      """
+      Running counters of the picklist items: total, picked (status), repicked and manually_picked.
+      They are kept up to date atomically by the picking views and list generation (inventory.counters),
+      so order_picking_accuracy reads them instead of counting the whole InventoryPicklistItem table.
+      The reconcile_pick_counters management command rebuilds them from the picklist items.
+      """
+      name = models.CharField(max_length=50, primary_key=True)
+      value = models.BigIntegerField(default=0)
+
+class DailyPickCounter(models.Model):
+      """
+      Picked, repicked and manually picked items per picking day (picked_at) and picker (employee assigned to the picklist).
+      """
+      day = models.DateField()
+      employee = models.ForeignKey(users, null=True, on_delete=models.SET_NULL)
+      picked = models.IntegerField(default=0)
+      repicked = models.IntegerField(default=0)
+      manually_picked = models.IntegerField(default=0)
+      class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'employee'], name='daily_pick_counter_day_employee', nulls_distinct=False)
+        ]
+
+
 def __str__(self):
         return f"Picklist Item {self.picklist_item_id} - Status: {self.status}"
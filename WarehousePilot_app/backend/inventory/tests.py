@@ -1,13 +1,22 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
 from django.urls import reverse
-from .models import Inventory
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from .models import Inventory, InventoryReservation
 from parts.models import Part
 import json
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth import get_user_model
-from .models import InventoryPicklist, InventoryPicklistItem
-from orders.models import Orders
+from .models import InventoryPicklist, InventoryPicklistItem, PickCounter, DailyPickCounter
+from .counters import reconcile_pick_counters
+from django.core.management import call_command
+from io import StringIO
+from orders.models import Orders, OrderPart
+from orders.allocation import generate_lists_for_orders
+from manufacturingLists.models import ManufacturingListItem
+import threading
 from django.utils import timezone
 from rest_framework import status
 
@@ -40,6 +49,50 @@ class InventoryTests(TestCase):
         self.assertEqual(inventory_data[0]['warehouse_number'], self.inventory_item.warehouse_number)
         self.assertEqual(inventory_data[0]['amount_needed'], self.inventory_item.amount_needed)
 
+    def test_get_inventory_not_modified(self):
+        etag = self.client.get(reverse('get_inventory'))['ETag']
+
+        response = self.client.get(reverse('get_inventory'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            Inventory.objects.bulk_create([Inventory(location="NEW", sku_color=self.part, qty=5, warehouse_number="499 B", amount_needed=0)])
+        response = self.client.get(reverse('get_inventory'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['inventory']), 2)
+
+    def test_get_inventory_stream_matches_list(self):
+        Inventory.objects.create(location="LOW", sku_color=self.part, qty=10, warehouse_number="499 B", amount_needed=0)
+        Inventory.objects.create(location="EMPTY", sku_color=self.part, qty=0, warehouse_number="499 B", amount_needed=0)
+        expected = self.client.get(reverse('get_inventory')).json()
+
+        response = self.client.get(reverse('get_inventory'), {'stream': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        key = lambda x: x['inventory_id']
+        self.assertEqual(sorted(streamed['inventory'], key=key), sorted(expected['inventory'], key=key))
+        self.assertEqual(streamed['low_stock_items'], expected['low_stock_items'])
+        self.assertEqual([x['location'] for x in streamed['low_stock_items']], ["LOW"])
+
+    def test_inventory_preview_stream(self):
+        user = User.objects.create_user(username="stream", password="pw", email="stream@example.com", role="staff",
+                                        date_of_hire="2024-01-01", first_name="S", last_name="T", department="Testing")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        Inventory.objects.bulk_create([
+            Inventory(location=f"L{i}", sku_color=self.part, qty=i, warehouse_number="499 B", amount_needed=0) for i in range(2500)
+        ])
+
+        response = client.get(reverse('inventorypreview'), {'stream': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        streamed = json.loads(b''.join(chunks))
+        self.assertEqual(len(streamed), 2501)
+        self.assertEqual(set(streamed[0]), {"inventory_id", "sku_color_id", "qty", "warehouse_number"})
+
     def test_add_inventory_item(self):
         data = {
             "location": "Test ADD",
@@ -71,6 +124,78 @@ class InventoryTests(TestCase):
             Inventory.objects.get(inventory_id=self.inventory_item.inventory_id)
 
 
+    def test_update_inventory_item_only_writes_sent_fields(self):
+        # A reservation made after the item was loaded by the client must not be overwritten
+        Inventory.objects.filter(pk=self.inventory_item.pk).update(amount_needed=70)
+        data = {"inventory_id": self.inventory_item.inventory_id, "qty": 150}
+        response = self.client.post(reverse('update_inventory_item'), json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+
+        self.inventory_item.refresh_from_db()
+        self.assertEqual(self.inventory_item.qty, 150)
+        self.assertEqual(self.inventory_item.amount_needed, 70)
+
+    def test_update_inventory_item_not_found(self):
+        data = {"inventory_id": 9999, "qty": 150}
+        response = self.client.post(reverse('update_inventory_item'), json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+
+class InventoryReservationTests(TransactionTestCase):
+    """
+    Stress test of the reservation ledger: many list generations run at the same time on
+    the same inventory locations and none of the locations may be over-allocated.
+    """
+    NB_ORDERS = 50
+
+    def setUp(self):
+        self.parts = [Part.objects.create(sku_color=f'STRESS {i}', sku='STRESS') for i in range(3)]
+        self.inventory = [
+            Inventory.objects.create(location=f"LOC {i}-{j}", sku_color=part, qty=40, warehouse_number="499", amount_needed=0)
+            for i, part in enumerate(self.parts) for j in range(2)
+        ]
+        self.orders = []
+        for order_id in range(1, self.NB_ORDERS + 1):
+            order = Orders.objects.create(order_id=order_id)
+            for part in self.parts:
+                OrderPart.objects.create(order_id=order, sku_color=part, qty=3, location="LOC 0-0")
+            self.orders.append(order)
+
+    def test_concurrent_generations_never_over_allocate(self):
+        barrier = threading.Barrier(self.NB_ORDERS)
+        errors = []
+
+        def generate(order):
+            try:
+                barrier.wait()
+                generate_lists_for_orders([order])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=generate, args=(order,)) for order in self.orders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for row in Inventory.objects.all():
+            reserved = InventoryReservation.objects.filter(inventory=row).aggregate(total=Sum('amount'))['total'] or 0
+            picked = InventoryPicklistItem.objects.filter(location=row).aggregate(total=Sum('amount'))['total'] or 0
+            self.assertLessEqual(row.amount_needed, row.qty)
+            self.assertEqual(row.amount_needed, reserved)
+            self.assertEqual(row.amount_needed, picked)
+
+        # 80 units per sku are in stock for 150 ordered: everything is either picked or manufactured
+        for part in self.parts:
+            picked = InventoryPicklistItem.objects.filter(sku_color=part).aggregate(total=Sum('amount'))['total']
+            manufactured = ManufacturingListItem.objects.filter(sku_color=part).aggregate(total=Sum('amount'))['total']
+            self.assertEqual(picked, 80)
+            self.assertEqual(manufactured, 3 * self.NB_ORDERS - 80)
+
+
 class AssignedPicklistViewTest(TestCase):
     def setUp(self):
         # Create a test user
@@ -124,6 +249,31 @@ class AssignedPicklistViewTest(TestCase):
         self.assertEqual(response.data[0]["already_filled"], False)
         self.assertEqual(response.data[0]["assigned_to"], "Test User")
 
+    def test_get_assigned_picklists_constant_queries(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        for order_id in range(200, 220):
+            order = Orders.objects.create(order_id=order_id, due_date=timezone.now(), status="In Progress")
+            picklist = InventoryPicklist.objects.create(order_id=order, assigned_employee_id=self.user, status=False)
+            InventoryPicklistItem.objects.create(picklist_id=picklist, status=True, sku_color=self.part, amount=1)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data), 21)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(sum(x["already_filled"] for x in response.data), 20)
+
+    def test_get_assigned_picklists_pagination(self):
+        for order_id in range(200, 204):
+            order = Orders.objects.create(order_id=order_id, due_date=self.order.due_date, status="In Progress")
+            InventoryPicklist.objects.create(order_id=order, assigned_employee_id=self.user, status=False)
+
+        response = self.client.get(self.url, {"limit": 3})
+        self.assertEqual([x["order_id"] for x in response.data["results"]], [123, 200, 201])
+        response = self.client.get(self.url, {"limit": 3, "cursor": response.data["next_cursor"]})
+        self.assertEqual([x["order_id"] for x in response.data["results"]], [202, 203])
+        self.assertIsNone(response.data["next_cursor"])
+
     def test_get_assigned_picklists_no_picklists(self):
         # Unassign the picklist from the user
         self.picklist.assigned_employee_id = None
@@ -145,3 +295,145 @@ class AssignedPicklistViewTest(TestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         
+
+
+class PickCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="picker",
+            email="picker@test.com",
+            password="testpassword",
+            first_name="Pick",
+            last_name="Er",
+            role="staff",
+            department="Test Department",
+            date_of_hire=timezone.now(),
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.part = Part.objects.create(sku_color='ALOE 01', sku='ALOE', description='Aloe Part Description')
+        self.order = Orders.objects.create(order_id=1, status="In Progress")
+        self.picklist = InventoryPicklist.objects.create(order_id=self.order, assigned_employee_id=self.user, status=False)
+        self.items = [
+            InventoryPicklistItem.objects.create(picklist_id=self.picklist, status=False, sku_color=self.part, amount=2)
+            for _ in range(3)
+        ]
+        reconcile_pick_counters()
+
+    def counters(self):
+        return dict(PickCounter.objects.values_list("name", "value"))
+
+    def pick(self, item, **data):
+        return self.client.patch(reverse('pick_picklist_item', args=[item.picklist_item_id]), data, format='json')
+
+    def repick(self, item):
+        return self.client.patch(reverse('repick-picklist-item', args=[item.picklist_item_id]), {"reason": "damaged", "quantity": 1}, format='json')
+
+    def test_pick_and_repick_update_the_counters(self):
+        self.pick(self.items[0], picked_quantity=2)
+        self.pick(self.items[1], picked_quantity=2, manually_picked=True)
+        self.repick(self.items[0])
+
+        today = DailyPickCounter.objects.get(day=timezone.localdate(), employee=self.user)
+        self.assertEqual(self.counters(), {"total": 3, "picked": 2, "repicked": 1, "manually_picked": 1})
+        self.assertEqual((today.picked, today.repicked, today.manually_picked), (2, 1, 1))
+
+    def test_picking_twice_counts_once(self):
+        self.pick(self.items[0], picked_quantity=1, manually_picked=True)
+        self.pick(self.items[0], picked_quantity=1)
+
+        self.assertEqual(self.counters()["picked"], 1)
+        self.assertEqual(self.counters()["manually_picked"], 0)
+        self.assertEqual(DailyPickCounter.objects.get().picked, 1)
+
+    def test_list_generation_counts_the_new_items(self):
+        order = Orders.objects.create(order_id=2)
+        OrderPart.objects.create(order_id=order, sku_color=self.part, qty=4, location="LOC")
+        Inventory.objects.create(location="LOC", sku_color=self.part, qty=10, warehouse_number="499", amount_needed=0)
+
+        generate_lists_for_orders([order])
+
+        self.assertEqual(self.counters()["total"], 4)
+
+    def test_reconcile_matches_the_running_counters(self):
+        self.pick(self.items[0], picked_quantity=2, manually_picked=True)
+        self.repick(self.items[0])
+        self.pick(self.items[2], picked_quantity=2)
+        running = (self.counters(), list(DailyPickCounter.objects.values_list("day", "employee", "picked", "repicked", "manually_picked")))
+
+        out = StringIO()
+        call_command("reconcile_pick_counters", stdout=out)
+        reconciled = (self.counters(), list(DailyPickCounter.objects.values_list("day", "employee", "picked", "repicked", "manually_picked")))
+
+        self.assertEqual(running, reconciled)
+        self.assertIn("total=3, picked=2, repicked=1, manually_picked=1", out.getvalue())
+
+    def test_reconcile_fixes_bulk_changes(self):
+        InventoryPicklistItem.objects.filter(picklist_item_id=self.items[2].picklist_item_id).delete()
+        InventoryPicklistItem.objects.update(status=True, picked_at=timezone.now())
+
+        reconcile_pick_counters()
+
+        self.assertEqual(self.counters(), {"total": 2, "picked": 2, "repicked": 0, "manually_picked": 0})
+
+
+class ConcurrentPickTests(TransactionTestCase):
+    """
+    The same pick sent twice at the same time (a double tap, a retried request) is counted once.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="picker",
+            email="picker@test.com",
+            password="testpassword",
+            first_name="Pick",
+            last_name="Er",
+            role="staff",
+            department="Test Department",
+            date_of_hire=timezone.now(),
+        )
+        self.part = Part.objects.create(sku_color='ALOE 01', sku='ALOE', description='Aloe Part Description')
+        order = Orders.objects.create(order_id=1, status="In Progress")
+        picklist = InventoryPicklist.objects.create(order_id=order, assigned_employee_id=self.user, status=False)
+        self.item = InventoryPicklistItem.objects.create(picklist_id=picklist, status=False, sku_color=self.part, amount=2)
+        reconcile_pick_counters()
+
+    def send_twice(self, url, data):
+        barrier = threading.Barrier(2)
+        responses = []
+
+        def send():
+            try:
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+                barrier.wait()
+                responses.append(client.patch(url, data, format='json').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    # test_same_pick_twice_counts_once(): Test that two concurrent picks of an item move the picked counters once
+    def test_same_pick_twice_counts_once(self):
+        # Act
+        responses = self.send_twice(reverse('pick_picklist_item', args=[self.item.picklist_item_id]), {"picked_quantity": 1})
+
+        # Assert
+        self.assertEqual(responses, [200, 200])
+        self.assertEqual(PickCounter.objects.get(name="picked").value, 1)
+        self.assertEqual(DailyPickCounter.objects.get().picked, 1)
+        self.assertEqual(InventoryPicklistItem.objects.get().actual_picked_quantity, 2)
+
+    # test_same_repick_twice_counts_once(): Test that two concurrent repicks of an item move the repicked counter once
+    def test_same_repick_twice_counts_once(self):
+        # Act
+        responses = self.send_twice(reverse('repick-picklist-item', args=[self.item.picklist_item_id]), {"reason": "damaged", "quantity": 1})
+
+        # Assert
+        self.assertEqual(responses, [200, 200])
+        self.assertEqual(PickCounter.objects.get(name="repicked").value, 1)
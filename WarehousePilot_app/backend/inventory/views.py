@@ -1,13 +1,15 @@
 # This file defines views for inventory and order management.
 
-# get_inventory: Fetches inventory data and categorizes items by stock levels.
+# get_inventory: Fetches inventory data and categorizes items by stock levels (streamed with ?stream=true, 304 when unchanged).
 # delete_inventory_items: Deletes inventory items based on provided item IDs.
 # add_inventory_item: Adds a new item to the inventory.
 # get_csrf_token: Returns a CSRF token for frontend use.
-# InventoryView: Retrieves inventory data via a raw SQL query.
+# InventoryView: Retrieves inventory data via a raw SQL query, or streams it from a server-side cursor with ?stream=true.
 # AssignOrderView: Assigns an order to a staff member by user_id.
-# AssignedPicklistView: Fetches picklists assigned to the current user that are in progress.
+# AssignedPicklistView: Fetches picklists assigned to the current user that are in progress (async, one query, keyset paginated with limit/cursor).
 # PickPicklistItemView: Updates the status of a picklist item to 'picked' by a staff member.
+# RepickPicklistItemView: Marks a picklist item for repick with a reason and the quantity picked again.
+# (Both keep the pick counters of inventory.counters up to date.)
 
 import logging
 from django.http import JsonResponse
@@ -18,9 +20,18 @@ import json
 from rest_framework import status
 from django.middleware.csrf import get_token
 from .models import InventoryPicklist, InventoryPicklistItem, Inventory
+from .counters import item_state, record_item_change
+from backend.live_events import publish_event
 from .serializers import OrderSerializer
 from auth_app.models import users
 from django.utils import timezone
+from django.db import transaction
+from orders.versioning import conditional_on_tables
+from orders.pagination import akeyset_paginate, parse_page_size, InvalidCursor
+from backend.async_views import AsyncAPIView, api_response
+from django.db.models import F, Exists, OuterRef, Value
+from django.db.models.functions import Concat
+from backend.streaming import STREAM_CHUNK_SIZE, wants_stream, stream_json_array, stream_json_object, streaming_json_response
 
 
 # def send_alert(item):
@@ -42,25 +53,41 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 # Django logger for backend
 logger = logging.getLogger('WarehousePilot_app')
 
+# stock level label of an inventory quantity, shared by the list and streaming modes of get_inventory
+def stock_status(qty):
+    if qty == 0:
+        return 'Out of Stock'
+    elif qty < 50:
+        return 'Low'
+    elif 50 <= qty <= 100:
+        return 'Moderate'
+    return 'High'
+
+@conditional_on_tables("inventory_inventory")
 def get_inventory(request):
     try:
+        if wants_stream(request):
+            # Stream both arrays from server-side cursors, the low stock items are read by a second query
+            def with_status(item):
+                item['status'] = stock_status(item['qty'])
+                return item
+
+            inventory_rows = Inventory.objects.values().iterator(chunk_size=STREAM_CHUNK_SIZE)
+            low_stock_rows = Inventory.objects.filter(qty__lt=50).exclude(qty=0).values().iterator(chunk_size=STREAM_CHUNK_SIZE)
+            return streaming_json_response(request, stream_json_object([
+                ("inventory", stream_json_array(inventory_rows, with_status)),
+                ("low_stock_items", stream_json_array(low_stock_rows, with_status)),
+            ]), "get_inventory")
+
         inventory_data = Inventory.objects.all().values()
         inventory_list = list(inventory_data)
         low_stock_items = []
         for item in inventory_list:
-            qty = item['qty']
-            if qty == 0:
-                item['status'] = 'Out of Stock'
-                #logger.info(f"get_inventory - Item {item['sku_color_id']} is out of stock")
-            elif qty < 50:
-                item['status'] = 'Low'
+            item['status'] = stock_status(item['qty'])
+            if item['status'] == 'Low':
                 low_stock_items.append(item)
                 #logger.info(f"get_inventory - Item {item['sku_color_id']} is in low stock")
                 # send_alert(item)
-            elif 50 <= qty <= 100:
-                item['status'] = 'Moderate'
-            else:
-                item['status'] = 'High'
         #logger.info("Items from inventory retrieved from database")
         return JsonResponse({"inventory": inventory_list, "low_stock_items": low_stock_items}, safe=False)
     except Exception as e:
@@ -107,13 +134,15 @@ def update_inventory_item(request):
         if not item_id:
             return JsonResponse({"error": "Inventory ID is required"}, status=400)
 
-        item = Inventory.objects.get(inventory_id=item_id)
-        item.warehouse_number = data.get("warehouse_number", item.warehouse_number)
-        item.sku_color_id = data.get("sku_color_id", item.sku_color_id)
-        item.location = data.get("location", item.location)
-        item.qty = data.get("qty", item.qty)
-        item.amount_needed = data.get("amount_needed", item.amount_needed)
-        item.save()
+        # Lock the row and only write the fields that were sent, so a concurrent reservation
+        # made by list generation on amount_needed is never overwritten with a stale value
+        fields = [x for x in ("warehouse_number", "sku_color_id", "location", "qty", "amount_needed") if x in data]
+        with transaction.atomic():
+            item = Inventory.objects.select_for_update().get(inventory_id=item_id)
+            for field in fields:
+                setattr(item, field, data[field])
+            if fields:
+                item.save(update_fields=fields)
 
         return JsonResponse({"message": "Item updated successfully"}, status=200)
     except Inventory.DoesNotExist:
@@ -130,6 +159,11 @@ class InventoryView(APIView):
 
     def get(self, request):
         try:
+            if wants_stream(request):
+                rows = Inventory.objects.values("inventory_id", "sku_color_id", "qty", "warehouse_number").iterator(chunk_size=STREAM_CHUNK_SIZE)
+                logger.info("Streaming all items from the inventory")
+                return streaming_json_response(request, stream_json_array(rows), "InventoryView")
+
             # Query to fetch inventory data with inventory_id
             with connection.cursor() as cursor:
                 cursor.execute("""
@@ -186,38 +220,43 @@ class AssignOrderView(APIView):
         logger.info("Employee %s was successfully assigned to order %s", order.assigned_employee_id, order_id)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-class AssignedPicklistView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
+class AssignedPicklistView(AsyncAPIView):
+    # async (picker's hot path), served by the ASGI application
+    async def get(self, request):
+        paginate = "limit" in request.GET or "cursor" in request.GET
+        try:
+            limit = parse_page_size(request.GET.get("limit"))
+        except ValueError as e:
+            return api_response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    def get(self, request):
         try:
             current_user = request.user
-            # Find picklists assigned to this user
+            # Find picklists assigned to this user, joined with their order and employee, with the filled state in the same query
+            unpicked_items = InventoryPicklistItem.objects.filter(picklist_id=OuterRef('picklist_id'), status=False)
             assigned_picklists = InventoryPicklist.objects.filter(
-                assigned_employee_id=current_user,               
-                order_id__status='In Progress'                  
-            )
+                assigned_employee_id=current_user,
+                order_id__status='In Progress'
+            ).annotate(
+                due_date=F('order_id__due_date'),
+                already_filled=~Exists(unpicked_items),
+                assigned_to=Concat('assigned_employee_id__first_name', Value(' '), 'assigned_employee_id__last_name'),
+            ).values('order_id', 'due_date', 'already_filled', 'assigned_to')
+
+            if paginate:
+                response_data, next_cursor = await akeyset_paginate(assigned_picklists, ["due_date", "order_id"], cursor=request.GET.get("cursor"), limit=limit)
+            else:
+                response_data, next_cursor = await akeyset_paginate(assigned_picklists, ["due_date", "order_id"], limit=None)
 
-            response_data = []
-            for picklist in assigned_picklists:
-                order = picklist.order_id  
-                response_data.append({
-                    "order_id": order.order_id,
-                    "due_date": order.due_date,
-                    "already_filled": not InventoryPicklistItem.objects.filter(
-                        picklist_id=picklist.picklist_id,
-                        status=False
-                    ).exists(),
-                    "assigned_to": picklist.assigned_employee_id.first_name + " " + picklist.assigned_employee_id.last_name if picklist.assigned_employee_id else None
-                })
-
-            logger.info("Employee %s was assigned to picklists %s", current_user, ', '.join([str(x.order_id.order_id) for x in assigned_picklists]))
-            return Response(response_data, status=status.HTTP_200_OK)
+            logger.info("Employee %s was assigned to picklists %s", current_user, ', '.join([str(x["order_id"]) for x in response_data]))
+            if paginate:
+                return api_response({"results": response_data, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+            return api_response(response_data, status=status.HTTP_200_OK)
 
+        except InvalidCursor as e:
+            return api_response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error("Failed to fetch assigned picklist(s) to an employee (AssignedPicklistView)")
-            return Response(
+            return api_response(
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -227,26 +266,31 @@ class PickPicklistItemView(APIView):
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, picklist_item_id):
-        try:
-            item = InventoryPicklistItem.objects.get(picklist_item_id=picklist_item_id)
-        except InventoryPicklistItem.DoesNotExist:
+        with transaction.atomic():
+            try:
+                # the item stays locked until the counters are updated, a concurrent pick of it reads the picked item
+                item = InventoryPicklistItem.objects.select_for_update(of=("self",)).select_related("picklist_id").get(pk=picklist_item_id)
+            except InventoryPicklistItem.DoesNotExist:
 #logger.error("Item %s was not found", picklist_item_id)
-            return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
+                return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
 
 # If your role check remains the same:
-        if request.user.role == 'qa':
+            if request.user.role == 'qa':
 #logger.error("Unauthorized user - only staff users can access picklist picking")
-            return Response({"error": "Not allowed. You need login as a staff "}, status=403)
-
-        manually_picked = request.data.get("manually_picked", False)
-        picked_quantity = request.data.get("picked_quantity", 0)
-
-       
-        item.actual_picked_quantity += int(picked_quantity)
-        item.status = True
-        item.picked_at = timezone.now()
-        item.manually_picked = manually_picked
-        item.save()
+                return Response({"error": "Not allowed. You need login as a staff "}, status=403)
+
+            manually_picked = request.data.get("manually_picked", False)
+            picked_quantity = request.data.get("picked_quantity", 0)
+
+            before = item_state(item)
+            item.actual_picked_quantity += int(picked_quantity)
+            item.status = True
+            item.picked_at = timezone.now()
+            item.manually_picked = manually_picked
+            item.save()
+            # update the pick accuracy counters with the item
+            record_item_change(before, item_state(item))
+            publish_event("item_picked", picklist_item_id=item.picklist_item_id, picklist_id=item.picklist_id_id, order_id=item.picklist_id.order_id_id)
 #logger.info("Item %s has been successfully picked", picklist_item_id)
 
         return Response({"message": "Item picked successfully"}, status=status.HTTP_200_OK)
@@ -256,22 +300,28 @@ class RepickPicklistItemView(APIView):
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, picklist_item_id):
-        try:
-            item = InventoryPicklistItem.objects.get(picklist_item_id=picklist_item_id)
-        except InventoryPicklistItem.DoesNotExist:
-            return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        if request.user.role == 'qa':
-            return Response({"error": "Not allowed. You need to log in as staff."}, status=status.HTTP_403_FORBIDDEN)
-
-        reason = request.data.get("reason")
-        quantity = request.data.get("quantity")
-        if not reason or not quantity:
-            return Response({"error": "Reason and quantity are required."}, status=status.HTTP_400_BAD_REQUEST)
-
-        item.repick = True
-        item.repick_reason = reason
-        item.actual_picked_quantity += int(quantity)  
-        item.save()
+        with transaction.atomic():
+            try:
+                # the item stays locked until the counters are updated, a concurrent repick of it reads the repicked item
+                item = InventoryPicklistItem.objects.select_for_update(of=("self",)).select_related("picklist_id").get(pk=picklist_item_id)
+            except InventoryPicklistItem.DoesNotExist:
+                return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            if request.user.role == 'qa':
+                return Response({"error": "Not allowed. You need to log in as staff."}, status=status.HTTP_403_FORBIDDEN)
+
+            reason = request.data.get("reason")
+            quantity = request.data.get("quantity")
+            if not reason or not quantity:
+                return Response({"error": "Reason and quantity are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+            before = item_state(item)
+            item.repick = True
+            item.repick_reason = reason
+            item.actual_picked_quantity += int(quantity)
+            item.save()
+            # update the pick accuracy counters with the item
+            record_item_change(before, item_state(item))
+            publish_event("item_repicked", picklist_item_id=item.picklist_item_id, picklist_id=item.picklist_id_id, order_id=item.picklist_id.order_id_id)
 
         return Response({"message": f"Item marked for repick due to {reason} with quantity {quantity}."}, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -1,4 +1,8 @@
 from django.apps import AppConfig
 class KpiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'kpi_dashboard'
\ No newline at end of file
+    name = 'kpi_dashboard'
+
+    def ready(self):
+        # connect the receivers invalidating the cached dashboard responses
+        from . import signals
@@ -0,0 +1,16 @@
+# Brings the daily KPI rollups (DailyKpi, DailyOrderPicks) up to date.
+# Usage: python manage.py refresh_kpi_rollups [--full]
+
+from django.core.management.base import BaseCommand
+from kpi_dashboard.rollups import update_kpi_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily KPI rollups changed since the last refresh (or all of them with --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="rebuild every day from the first recorded event")
+
+    def handle(self, *args, full, **options):
+        first_day, last_day = update_kpi_rollups(full=full)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed the KPI rollups from {first_day} to {last_day}"))
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orders', '0013_ordermilestones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyKpi',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('picked_items', models.IntegerField(default=0)),
+                ('packed_parts', models.IntegerField(default=0)),
+                ('shipped_qty', models.FloatField(default=0)),
+                ('orders_started', models.IntegerField(default=0)),
+                ('active_orders', models.IntegerField(default=0)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('watermark', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyOrderPicks',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('picks', models.IntegerField(default=0)),
+                ('order_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='orders.orders')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'order_id'), name='daily_order_picks_day_order')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:22
+
+from django.db import migrations
+
+TASK_NAME = "Refresh KPI rollups"
+TASK = "kpi_dashboard.tasks.refresh_kpi_rollups_task"
+# the dashboards show the rollups as of the last refresh
+REFRESH_EVERY_MINUTES = 5
+
+
+def schedule_refresh(apps, schema_editor):
+    IntervalSchedule = apps.get_model("django_celery_beat", "IntervalSchedule")
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    schedule, _ = IntervalSchedule.objects.get_or_create(every=REFRESH_EVERY_MINUTES, period="minutes")
+    PeriodicTask.objects.update_or_create(name=TASK_NAME, defaults={"task": TASK, "interval": schedule, "enabled": True})
+
+
+def unschedule_refresh(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(name=TASK_NAME).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kpi_dashboard', '0001_initial'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_refresh, unschedule_refresh),
+    ]
@@ -1,12 +1,42 @@
 from django.db import models
+from orders.models import Orders
 
-class InventoryPicklistItem(models.Model):
-    # Define the fields for your model
-    status = models.BooleanField(default=False)  # True for accurate picks, False for inaccurate picks
-    # Add other fields as needed, for example:
-    # item_name = models.CharField(max_length=255)
-    # picker_name = models.CharField(max_length=255)
-    # timestamp = models.DateTimeField(auto_now_add=True)
 
-    def __str__(self):
-        return f"Pick List Item {self.id} - {'Accurate' if self.status else 'Inaccurate'}"
\ No newline at end of file
+class DailyKpi(models.Model):
+    '''
+    Daily rollup of the warehouse activity read by the KPI dashboard (ThroughputView, ActiveOrdersView, CompletedOrdersView).
+    The rows are rebuilt incrementally by kpi_dashboard.tasks.refresh_kpi_rollups_task (celery beat)
+    or with the refresh_kpi_rollups management command, see kpi_dashboard.rollups.
+    '''
+    day = models.DateField(primary_key=True)
+    picked_items = models.IntegerField(default=0) # picklist items picked that day
+    packed_parts = models.IntegerField(default=0) # order parts packed that day
+    shipped_qty = models.FloatField(default=0) # quantity of the order parts of the orders shipped that day
+    orders_started = models.IntegerField(default=0)
+    active_orders = models.IntegerField(default=0) # picklists still to pick of the in progress orders started that day
+    completed_orders = models.IntegerField(default=0) # picklists of completed orders fully picked that day
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class DailyOrderPicks(models.Model):
+    '''
+    Number of picklist items picked per day and order, read by daily_picks_data and daily_picks_details.
+    Only the days on which an order had picks have a row.
+    '''
+    day = models.DateField()
+    order_id = models.ForeignKey(Orders, on_delete=models.CASCADE)
+    picks = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "order_id"], name="daily_order_picks_day_order"),
+        ]
+
+
+class RollupWatermark(models.Model):
+    '''
+    Start time of the last successful refresh of a rollup, the next refresh only recomputes the days from there.
+    '''
+    name = models.CharField(max_length=100, primary_key=True)
+    watermark = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,183 @@
+# This file defines how the daily KPI rollups (DailyKpi, DailyOrderPicks) are computed from the orders and picklists.
+
+# rebuild_days: Recomputes the rollup rows of a range of days with one grouped query per metric.
+# refresh_order_counts: Updates the active and completed order counts of a range of days that changed.
+# update_kpi_rollups: Recomputes the days from the watermark (or everything) and moves the watermark.
+
+# A refresh rebuilds the days from the day of the previous refresh to today, so a refresh right after another
+# one only rebuilds today. The active and completed order counts depend on the current status of the orders, not
+# only on the day of an event, so the counts of the earlier days of the window of the dashboards
+# (ROLLUP_LOOKBACK_DAYS) are computed again and only the rows whose counts changed are written. Events dated
+# before the day of the previous refresh need a full rebuild (refresh_kpi_rollups --full).
+
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from inventory.models import InventoryPicklist, InventoryPicklistItem
+from orders.models import Orders, OrderPart
+from backend.response_cache import invalidate_responses
+from .models import DailyKpi, DailyOrderPicks, RollupWatermark
+
+import logging
+
+logger = logging.getLogger('WarehousePilot_app')
+
+ROLLUP_NAME = "kpi_daily"
+ROLLUP_LOOKBACK_DAYS = 31
+# cached views reading the rollups, their responses are dropped after every refresh (the bundle holds such widgets)
+ROLLUP_VIEWS = ["daily_picks_data", "daily_picks_details", "active_orders", "completed_orders", "throughput", "kpi_bundle"]
+
+
+def _per_day(queryset, value):
+    return {x["day"]: x["value"] for x in queryset.values("day").annotate(value=value)}
+
+
+def _first_event_day():
+    days = [
+        InventoryPicklistItem.objects.aggregate(x=Min("picked_at"))["x"],
+        OrderPart.objects.aggregate(x=Min("packed_timestamp"))["x"],
+        Orders.objects.aggregate(x=Min("start_timestamp"))["x"],
+        InventoryPicklist.objects.aggregate(x=Min("picklist_complete_timestamp"))["x"],
+    ]
+    days = [timezone.localdate(x) for x in days if x is not None]
+    first_shipped = Orders.objects.aggregate(x=Min("ship_date"))["x"]
+    if first_shipped is not None:
+        days.append(first_shipped)
+    return min(days, default=None)
+
+
+def _bounds(first_day, last_day):
+    # the datetimes [start, end) of the days [first_day, last_day]
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    return start, end
+
+
+def _order_counts(start, end):
+    # {day: active orders}, {day: completed orders} of the days [start, end), from the current status of the orders
+    active = _per_day(
+        InventoryPicklist.objects.filter(
+            status=False, order_id__status="In Progress", order_id__start_timestamp__gte=start, order_id__start_timestamp__lt=end
+        ).annotate(day=TruncDate("order_id__start_timestamp")),
+        Count("picklist_id", distinct=True),
+    )
+    completed = _per_day(
+        InventoryPicklist.objects.filter(
+            status=True, order_id__status="Completed", picklist_complete_timestamp__gte=start, picklist_complete_timestamp__lt=end
+        ).annotate(day=TruncDate("picklist_complete_timestamp")),
+        Count("picklist_id", distinct=True),
+    )
+    return active, completed
+
+
+def rebuild_days(first_day, last_day, everything=False):
+    """
+    Replace the rollup rows of the days [first_day, last_day], or all the rows when `everything` is True.
+    Each metric is computed for the whole range by one query grouped by day, the rows are then written with two bulk inserts.
+    Returns the number of DailyKpi rows written.
+    """
+    start, end = _bounds(first_day, last_day)
+
+    picked = _per_day(
+        InventoryPicklistItem.objects.filter(picked_at__gte=start, picked_at__lt=end).annotate(day=TruncDate("picked_at")),
+        Count("picklist_item_id"),
+    )
+    packed = _per_day(
+        OrderPart.objects.filter(packed_timestamp__gte=start, packed_timestamp__lt=end).annotate(day=TruncDate("packed_timestamp")),
+        Count("order_part_id"),
+    )
+    shipped = _per_day(
+        OrderPart.objects.filter(order_id__ship_date__gte=first_day, order_id__ship_date__lte=last_day).annotate(day=F("order_id__ship_date")),
+        Sum("qty"),
+    )
+    started = _per_day(
+        Orders.objects.filter(start_timestamp__gte=start, start_timestamp__lt=end).annotate(day=TruncDate("start_timestamp")),
+        Count("order_id"),
+    )
+    active, completed = _order_counts(start, end)
+    picks = (
+        InventoryPicklistItem.objects
+        .filter(status=True, picked_at__gte=start, picked_at__lt=end)
+        .annotate(day=TruncDate("picked_at"))
+        .values("day", "picklist_id__order_id")
+        .annotate(picks=Count("picklist_item_id"))
+    )
+
+    days = [first_day + timedelta(days=x) for x in range((last_day - first_day).days + 1)]
+    rollups = [
+        DailyKpi(
+            day=day,
+            picked_items=picked.get(day, 0),
+            packed_parts=packed.get(day, 0),
+            shipped_qty=shipped.get(day) or 0,
+            orders_started=started.get(day, 0),
+            active_orders=active.get(day, 0),
+            completed_orders=completed.get(day, 0),
+        )
+        for day in days
+    ]
+    order_picks = [DailyOrderPicks(day=x["day"], order_id_id=x["picklist_id__order_id"], picks=x["picks"]) for x in picks]
+
+    with transaction.atomic():
+        if everything:
+            DailyKpi.objects.all().delete()
+            DailyOrderPicks.objects.all().delete()
+        else:
+            DailyKpi.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+            DailyOrderPicks.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+        DailyKpi.objects.bulk_create(rollups)
+        DailyOrderPicks.objects.bulk_create(order_picks)
+    return len(rollups)
+
+
+def refresh_order_counts(first_day, last_day):
+    """
+    Update the active and completed order counts of the existing rollup rows of the days [first_day, last_day]
+    with two grouped queries, writing only the rows whose counts changed. Returns the number of rows written.
+    """
+    if first_day > last_day:
+        return 0
+    active, completed = _order_counts(*_bounds(first_day, last_day))
+    now = timezone.now()
+    changed = []
+    for row in DailyKpi.objects.filter(day__gte=first_day, day__lte=last_day).only("day", "active_orders", "completed_orders"):
+        counts = (active.get(row.day, 0), completed.get(row.day, 0))
+        if (row.active_orders, row.completed_orders) != counts:
+            row.active_orders, row.completed_orders = counts
+            row.updated_at = now
+            changed.append(row)
+    DailyKpi.objects.bulk_update(changed, ["active_orders", "completed_orders", "updated_at"])
+    return len(changed)
+
+
+def update_kpi_rollups(full=False):
+    """
+    Bring the rollups up to date and return the (first_day, last_day) range that was rebuilt.
+
+    The days from the watermark (at most ROLLUP_LOOKBACK_DAYS ago) to today are rebuilt, so the cost of a
+    refresh does not grow with the history, and the order counts of the earlier days of the lookback window
+    follow the status of their orders. Without a watermark, or when `full` is True, every day from the first
+    recorded event is rebuilt.
+    """
+    started_at = timezone.now()
+    today = timezone.localdate(started_at)
+    state = RollupWatermark.objects.filter(name=ROLLUP_NAME).first()
+
+    everything = full or state is None
+    if everything:
+        first_day = min(_first_event_day() or today, today)
+    else:
+        first_day = max(timezone.localdate(state.watermark), today - timedelta(days=ROLLUP_LOOKBACK_DAYS))
+
+    with transaction.atomic():
+        written = rebuild_days(first_day, today, everything=everything)
+        if not everything:
+            refresh_order_counts(today - timedelta(days=ROLLUP_LOOKBACK_DAYS), first_day - timedelta(days=1))
+        RollupWatermark.objects.update_or_create(name=ROLLUP_NAME, defaults={"watermark": started_at})
+    # the dashboards reading the rollups are cached
+    invalidate_responses(*ROLLUP_VIEWS)
+
+    logger.info("Refreshed %s days of KPI rollups (%s to %s)", written, first_day, today)
+    return first_day, today
@@ -0,0 +1,42 @@
+# This file defines the signal receivers invalidating the cached dashboard responses (backend.response_cache).
+
+# data_changed: Drops the cached responses of the views reading the live table of an order, order part, picklist,
+# picklist item or manufacturing task that is written.
+
+# Only the views reading these tables (or the pick counters and order milestones kept with them) are dropped:
+# the views reading the daily rollups are dropped by the rollup refresh (kpi_dashboard.rollups), their data does
+# not change before. The cache is invalidated right away and again once the transaction commits, so that a
+# response computed by another request before the commit is not kept. Bulk operations (queryset update(),
+# bulk_create) do not send these signals, their changes show up when the cached responses expire
+# (RESPONSE_CACHE_TIMEOUT).
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from backend.response_cache import invalidate_responses
+from inventory.models import InventoryPicklist, InventoryPicklistItem
+from manufacturingLists.models import ManufacturingTask
+from orders.models import Orders, OrderPart
+
+# model -> cached views reading it, or the pick counters (picked items) and order milestones (orders, picklists,
+# picked items) updated with it; the bundle holds the live widgets
+LIVE_VIEWS = {
+    Orders: ["order_fulfillment_rate", "active_orders_details", "cycle_time_per_order", "delayed_orders", "kpi_bundle"],
+    OrderPart: ["order_fulfillment_rate", "kpi_bundle"],
+    InventoryPicklist: ["active_orders_details", "cycle_time_per_order", "kpi_bundle"],
+    InventoryPicklistItem: ["order_picking_accuracy", "active_orders_details", "cycle_time_per_order", "kpi_bundle"],
+    ManufacturingTask: ["order_fulfillment_rate", "kpi_bundle"],
+}
+
+
+def data_changed(sender, raw=False, **kwargs):
+    if raw:
+        return
+    views = LIVE_VIEWS[sender]
+    invalidate_responses(*views)
+    transaction.on_commit(lambda: invalidate_responses(*views))
+
+
+for model in LIVE_VIEWS:
+    receiver(post_save, sender=model, dispatch_uid=f"response_cache_{model.__name__}_saved")(data_changed)
+    receiver(post_delete, sender=model, dispatch_uid=f"response_cache_{model.__name__}_deleted")(data_changed)
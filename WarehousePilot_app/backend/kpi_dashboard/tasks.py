@@ -0,0 +1,14 @@
+# This file defines the celery tasks of the kpi_dashboard app.
+
+# refresh_kpi_rollups_task: Brings the daily KPI rollups up to date, scheduled on celery beat (migration 0002_kpi_rollup_schedule), one run at a time.
+
+from backend.celery import app
+from task_monitor.locks import single_flight
+from .rollups import update_kpi_rollups
+
+
+@app.task(bind=True)
+@single_flight()
+def refresh_kpi_rollups_task(self, full=False):
+    first_day, last_day = update_kpi_rollups(full=full)
+    return {"first_day": first_day.isoformat(), "last_day": last_day.isoformat()}
@@ -1,11 +1,20 @@
 import warnings
 warnings.filterwarnings("ignore", category=RuntimeWarning, module="django.db.models.fields")
 
-from django.test import TestCase, Client, RequestFactory
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from backend.response_cache import cache_key, cache_stats
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from io import StringIO
 from inventory.models import Inventory, InventoryPicklist, InventoryPicklistItem
+from inventory.counters import reconcile_pick_counters
 from parts.models import Part
 from orders.models import Orders, OrderPart
+from manufacturingLists.models import ManufacturingTask
 from auth_app.models import users
 from django.utils import timezone
 from datetime import date, timedelta
@@ -13,6 +22,8 @@ from dateutil.relativedelta import relativedelta
 from rest_framework.test import force_authenticate
 from unittest.mock import patch, MagicMock, PropertyMock
 from .views import ThroughputView
+from .models import DailyKpi, DailyOrderPicks, RollupWatermark
+from .rollups import update_kpi_rollups, ROLLUP_LOOKBACK_DAYS
 import logging
 
 class KPIDashboardTests(TestCase):
@@ -81,6 +92,11 @@ class KPIDashboardTests(TestCase):
             picked_at=timezone.now()  # Picked today
         )
 
+        # The picking, order and throughput KPIs are read from the daily rollups,
+        # the pick accuracy from the pick counters (the items above are not created through the views)
+        update_kpi_rollups()
+        reconcile_pick_counters()
+
     def test_order_picking_accuracy(self):
         response = self.client.get(reverse('order_picking_accuracy'))
         self.assertEqual(response.status_code, 200)
@@ -95,6 +111,52 @@ class KPIDashboardTests(TestCase):
         self.assertEqual(data['accuracy_percentage'], round(expected_accuracy, 2))
         self.assertEqual(data['target_accuracy'], 99)
 
+    def test_order_picking_accuracy_reads_the_counters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('order_picking_accuracy'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('inventory_pickcounter', queries[0]['sql'])
+
+    def test_order_picking_accuracy_breakdown_by_day(self):
+        self.picklist_item3.repick = True
+        self.picklist_item3.manually_picked = True
+        self.picklist_item3.save()
+        reconcile_pick_counters()
+
+        response = self.client.get(reverse('order_picking_accuracy'), {'breakdown': 'day'})
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(data['repicked'], 1)
+        self.assertEqual(data['manually_picked'], 1)
+        yesterday = timezone.localdate(self.picklist_item1.picked_at).strftime("%Y-%m-%d")
+        today = timezone.localdate(self.picklist_item3.picked_at).strftime("%Y-%m-%d")
+        self.assertEqual(data['breakdown'], [
+            {'day': yesterday, 'picked': 1, 'repicked': 0, 'manually_picked': 0, 'accuracy_percentage': 100.0},
+            {'day': today, 'picked': 1, 'repicked': 1, 'manually_picked': 1, 'accuracy_percentage': 0.0},
+        ])
+
+    def test_order_picking_accuracy_breakdown_by_employee(self):
+        response = self.client.get(reverse('order_picking_accuracy'), {'breakdown': 'employee'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['breakdown'], [{
+            'employee_id': self.user.user_id,
+            'employee': 'Test User',
+            'picked': 2,
+            'repicked': 0,
+            'manually_picked': 0,
+            'accuracy_percentage': 100.0,
+        }])
+
+        # a range without picks
+        response = self.client.get(reverse('order_picking_accuracy'), {'breakdown': 'employee', 'start': '2020-01-01', 'end': '2020-01-31'})
+        self.assertEqual(response.json()['breakdown'], [])
+
+    def test_order_picking_accuracy_invalid_breakdown(self):
+        self.assertEqual(self.client.get(reverse('order_picking_accuracy'), {'breakdown': 'week'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('order_picking_accuracy'), {'breakdown': 'day', 'start': '01/01/2020'}).status_code, 400)
+
     def test_daily_picks_data(self):
         response = self.client.get(reverse('daily_picks_data'))
         self.assertEqual(response.status_code, 200)
@@ -153,6 +215,7 @@ class KPIDashboardTests(TestCase):
 
     def test_order_picking_accuracy_empty(self):
         InventoryPicklistItem.objects.all().delete()
+        reconcile_pick_counters()
         response = self.client.get(reverse('order_picking_accuracy'))
         self.assertEqual(response.status_code, 200)
 
@@ -186,6 +249,56 @@ class KPIDashboardTests(TestCase):
         data = response.json()
         self.assertIn("Invalid date format", data.get("error", ""))
 
+    def test_order_fulfillment_rate_counts(self):
+        start = timezone.make_aware(timezone.datetime(2024, 5, 14, 10))
+        other_part = Part.objects.create(sku_color='TEST02', sku='TEST', description='Other Part')
+        for order_id, part in [(2, self.part), (3, other_part), (4, None)]:
+            order = Orders.objects.create(order_id=order_id, status='In Progress', start_timestamp=start)
+            if part is not None:
+                OrderPart.objects.create(order_id=order, sku_color=part, qty=1)
+        ManufacturingTask.objects.create(sku_color=self.part, qty=1, due_date=date(2024, 6, 1), status='bending')
+        ManufacturingTask.objects.create(sku_color=self.part, qty=1, due_date=date(2024, 6, 1), status='completed')
+        ManufacturingTask.objects.create(sku_color=other_part, qty=1, due_date=date(2024, 6, 1), status='completed')
+
+        response = self.client.get(reverse('order_fulfillment_rate'), {'filter': 'month', 'date': '2024-05-20'})
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(len(data), 31)
+        day_entry = next(item for item in data if item['period'] == '2024-05-14')
+        self.assertEqual(day_entry['total_orders_started'], 3)
+        self.assertEqual(day_entry['orders_started'], 3)
+        self.assertEqual(day_entry['total_orders_count'], 4)
+        self.assertEqual(day_entry['partially_fulfilled'], 1)
+        self.assertEqual(day_entry['fully_fulfilled'], 2)
+        self.assertEqual(sum(item['orders_started'] for item in data), 3)
+
+    def test_order_fulfillment_rate_ranges(self):
+        url = reverse('order_fulfillment_rate')
+
+        quarter = self.client.get(url, {'filter': 'quarter', 'date': '2024-05-20'}).json()
+        year = self.client.get(url, {'filter': 'year', 'date': '2024-05-20'}).json()
+        custom = self.client.get(url, {'start': '2024-02-27', 'end': '2024-03-02'}).json()
+
+        self.assertEqual((quarter[0]['period'], quarter[-1]['period'], len(quarter)), ('2024-04-01', '2024-06-30', 91))
+        self.assertEqual((year[0]['period'], year[-1]['period'], len(year)), ('2024-01-01', '2024-12-31', 366))
+        self.assertEqual([item['period'] for item in custom], ['2024-02-27', '2024-02-28', '2024-02-29', '2024-03-01', '2024-03-02'])
+
+    def test_order_fulfillment_rate_invalid_range(self):
+        url = reverse('order_fulfillment_rate')
+        self.assertEqual(self.client.get(url, {'start': '2024-03-02'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2024-03-02', 'end': '2024-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2024-03-02', 'end': 'tomorrow'}).status_code, 400)
+
+    def test_order_fulfillment_rate_constant_queries(self):
+        url = reverse('order_fulfillment_rate')
+        with CaptureQueriesContext(connection) as day:
+            self.client.get(url, {'filter': 'day'})
+        with CaptureQueriesContext(connection) as year:
+            self.client.get(url, {'filter': 'year'})
+        self.assertEqual(len(day), 2)
+        self.assertEqual(len(year), 2)
+
     def test_order_fulfillment_rate_method_not_allowed(self):
         url = reverse('order_fulfillment_rate')
         response = self.client.post(url)
@@ -194,6 +307,7 @@ class KPIDashboardTests(TestCase):
     def test_active_orders_get(self):
         self.order.start_timestamp = timezone.now() - timedelta(days=10)
         self.order.save()
+        update_kpi_rollups()
         url = reverse('active_orders')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
@@ -229,6 +343,7 @@ class KPIDashboardTests(TestCase):
             picklist_complete_timestamp=timezone.now() - timedelta(days=4)
         )
 
+        update_kpi_rollups()
         url = reverse('completed_orders')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
@@ -316,27 +431,9 @@ class ThroughputViewTests(TestCase):
         response = self.view(request)
         self.assertEqual(response.status_code, 200)
 
-    @patch('orders.models.Orders.objects.filter')
-    @patch('inventory.models.InventoryPicklistItem.objects.filter')
-    @patch('orders.models.OrderPart.objects.filter')
-    def test_throughput_data_structure(self, mock_packed, mock_picked, mock_shipped):
+    def test_throughput_data_structure(self):
         """Test the basic structure of the returned data."""
-        # Mock the shipped orders response
-        mock_order = MagicMock()
-        mock_order.ship_date = self.today
-        mock_shipped_qs = MagicMock()
-        mock_shipped_qs.__iter__.return_value = [mock_order]
-        mock_shipped.return_value = mock_shipped_qs
-
-        # Mock the picked items response
-        mock_picked_qs = MagicMock()
-        mock_picked_qs.annotate.return_value.values.return_value.annotate.return_value = []
-        mock_picked.return_value = mock_picked_qs
-
-        # Mock the packed items response
-        mock_packed_qs = MagicMock()
-        mock_packed_qs.annotate.return_value.values.return_value.annotate.return_value = []
-        mock_packed.return_value = mock_packed_qs
+        update_kpi_rollups()
 
         request = self.factory.get(self.url)
         force_authenticate(request, user=self.user)
@@ -353,116 +450,91 @@ class ThroughputViewTests(TestCase):
             self.assertIn('packed', day_data)
             self.assertIn('shipped', day_data)
 
-    @patch('orders.models.OrderPart.objects.filter')
-    def test_shipped_items_calculation(self, mock_orderpart_filter):
-        """Test shipped items are correctly calculated."""
-        # Mock the aggregate method to return a total of 5
-        mock_orderpart_filter.return_value.aggregate.return_value = {'total': 5}
+    def test_all_metrics_together(self):
+        """Test when all three metrics have data for the same day."""
+        part = Part.objects.create(sku_color='TEST01', sku='TEST', description='Test Part')
+        order = Orders.objects.create(order_id=1, status='In Progress', start_timestamp=timezone.now(), ship_date=self.today)
+        OrderPart.objects.create(order_id=order, sku_color=part, qty=5)
+        OrderPart.objects.create(order_id=order, sku_color=part, qty=2, packed_timestamp=timezone.now())
+        picklist = InventoryPicklist.objects.create(order_id=order, status=False)
+        for _ in range(3):
+            InventoryPicklistItem.objects.create(picklist_id=picklist, sku_color=part, amount=1, status=True, picked_at=timezone.now())
+        update_kpi_rollups()
 
-        # Make the request
         request = self.factory.get(self.url)
         force_authenticate(request, user=self.user)
         response = self.view(request)
 
-        # Assert the response
         self.assertEqual(response.status_code, 200)
-        data = response.data
-        today_data = next((item for item in data if item['day'] == self.today.strftime('%Y-%m-%d')), None)
-        self.assertIsNotNone(today_data)
-        self.assertEqual(today_data['shipped'], 0)
-
-    @patch('orders.models.Orders.objects.filter')
-    @patch('inventory.models.InventoryPicklistItem.objects.filter')
-    @patch('orders.models.OrderPart.objects.filter')
-    def test_picked_items_calculation(self, mock_packed, mock_picked, mock_shipped):
-        """Test picked items are correctly calculated."""
-        # Mock empty shipped orders
-        mock_shipped.return_value = []
-        
-        # Mock picked items for today
-        mock_picked_item = {'day': self.today, 'total_picked': 10}
-        mock_picked_qs = MagicMock()
-        mock_picked_qs.annotate.return_value.values.return_value.annotate.return_value = [mock_picked_item]
-        mock_picked.return_value = mock_picked_qs
-        
-        # Mock empty packed items
-        mock_packed.return_value.annotate.return_value.values.return_value.annotate.return_value = []
+        today_data = next(item for item in response.data if item['day'] == self.today.strftime('%Y-%m-%d'))
+        self.assertEqual(today_data['shipped'], 7)
+        self.assertEqual(today_data['picked'], 3)
+        self.assertEqual(today_data['packed'], 1)
+
+    def test_reads_rollups_only(self):
+        """Test that the view does not read the raw tables and issues one query."""
+        DailyKpi.objects.create(day=self.today, picked_items=10, packed_parts=7, shipped_qty=4)
 
         request = self.factory.get(self.url)
         force_authenticate(request, user=self.user)
-        response = self.view(request)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(request)
 
         today_data = next(item for item in response.data if item['day'] == self.today.strftime("%Y-%m-%d"))
-        self.assertEqual(today_data['picked'], 10)
-        self.assertEqual(today_data['shipped'], 0)
-        self.assertEqual(today_data['packed'], 0)
-
-    @patch('orders.models.Orders.objects.filter')
-    @patch('inventory.models.InventoryPicklistItem.objects.filter')
-    @patch('orders.models.OrderPart.objects.filter')
-    def test_packed_items_calculation(self, mock_packed, mock_picked, mock_shipped):
-        """Test packed items are correctly calculated."""
-        # Mock empty shipped and picked items
-        mock_shipped.return_value = []
-        mock_picked.return_value.annotate.return_value.values.return_value.annotate.return_value = []
-        
-        # Mock packed items for today
-        mock_packed_item = {'day': self.today, 'total_packed': 7}
-        mock_packed_qs = MagicMock()
-        mock_packed_qs.annotate.return_value.values.return_value.annotate.return_value = [mock_packed_item]
-        mock_packed.return_value = mock_packed_qs
+        self.assertEqual((today_data['picked'], today_data['packed'], today_data['shipped']), (10, 7, 4))
+        self.assertEqual(len([x for x in queries if 'kpi_dashboard_dailykpi' in x['sql']]), 1)
+        self.assertFalse([x for x in queries if 'inventory_' in x['sql'] or 'orders_' in x['sql']])
 
-        request = self.factory.get(self.url)
+    def get(self, **params):
+        request = self.factory.get(self.url, params)
         force_authenticate(request, user=self.user)
-        response = self.view(request)
+        return self.view(request)
 
-        today_data = next(item for item in response.data if item['day'] == self.today.strftime("%Y-%m-%d"))
-        self.assertEqual(today_data['packed'], 7)
-        self.assertEqual(today_data['shipped'], 0)
-        self.assertEqual(today_data['picked'], 0)
-
-    @patch('orders.models.Orders.objects.filter')
-    @patch('inventory.models.InventoryPicklistItem.objects.filter')
-    @patch('orders.models.OrderPart.objects.filter')
-    def test_all_metrics_together(self, mock_orders_filter, mock_picklist_filter, mock_orderpart_filter):
-        """Test when all three metrics have data for the same day."""
-        # Mock shipped items using side_effect
-        def mock_aggregate(*args, **kwargs):
-            return {'total': 5}
+    def test_weekly_and_monthly_buckets(self):
+        """Test that the daily rollups are summed per week and per month."""
+        for day, picked in [(date(2024, 1, 29), 1), (date(2024, 2, 2), 2), (date(2024, 2, 5), 4), (date(2024, 3, 1), 8)]:
+            DailyKpi.objects.create(day=day, picked_items=picked, packed_parts=1, shipped_qty=0.5)
 
-        mock_orderpart_filter.return_value.aggregate.side_effect = mock_aggregate
+        weeks = self.get(bucket='week', start='2024-01-31', end='2024-02-11')
+        months = self.get(bucket='month', start='2024-01-01', end='2024-03-31')
 
-        # Mock picked items
-        mock_picklist_filter.return_value.annotate.return_value.values.return_value.annotate.return_value = [
-            {'day': self.today, 'total_picked': 3}
-        ]
+        self.assertEqual(weeks.status_code, 200)
+        self.assertEqual([(x['day'], x['picked']) for x in weeks.data], [('2024-01-29', 2), ('2024-02-05', 4)])
+        self.assertEqual(
+            [(x['day'], x['picked'], x['packed'], x['shipped']) for x in months.data],
+            [('2024-01-01', 1, 1, 0.5), ('2024-02-01', 6, 2, 1.0), ('2024-03-01', 8, 1, 0.5)],
+        )
 
-        # Mock packed items
-        mock_orderpart_filter.return_value.annotate.return_value.values.return_value.annotate.return_value = [
-            {'day': self.today, 'total_packed': 2}
-        ]
+    def test_custom_range(self):
+        """Test that the range can be chosen and that the default is the last 365 days."""
+        DailyKpi.objects.create(day=date(2024, 2, 2), picked_items=3)
 
-        # Make the request
-        request = self.factory.get(self.url)
-        force_authenticate(request, user=self.user)
-        response = self.view(request)
+        response = self.get(start='2024-02-01', end='2024-02-03')
 
-        # Assert the response
-        self.assertEqual(response.status_code, 200)
-        data = response.data
-        today_data = next((item for item in data if item['day'] == self.today.strftime('%Y-%m-%d')), None)
-        self.assertIsNotNone(today_data)
-        self.assertEqual(today_data['shipped'], 0)
-        self.assertEqual(today_data['picked'], 3)
-        self.assertEqual(today_data['packed'], 0)
+        self.assertEqual([(x['day'], x['picked']) for x in response.data], [('2024-02-01', 0), ('2024-02-02', 3), ('2024-02-03', 0)])
+        self.assertEqual(len(self.get(bucket='month').data), 13)
+
+    def test_invalid_parameters(self):
+        """Test that an unknown bucket or an invalid range is rejected."""
+        self.assertEqual(self.get(bucket='hour').status_code, 400)
+        self.assertEqual(self.get(start='yesterday').status_code, 400)
+        self.assertEqual(self.get(start='2024-02-03', end='2024-02-01').status_code, 400)
 
-    @patch('orders.models.Orders.objects.filter')
-    @patch('inventory.models.InventoryPicklistItem.objects.filter')
-    @patch('orders.models.OrderPart.objects.filter')
-    def test_exception_handling(self, mock_packed, mock_picked, mock_shipped):
+    def test_bucketed_constant_queries(self):
+        """Test that a bucketed series is computed by one query."""
+        DailyKpi.objects.bulk_create([DailyKpi(day=self.today - timedelta(days=x), picked_items=1) for x in range(365)])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(bucket='week')
+
+        self.assertEqual(sum(x['picked'] for x in response.data), 365)
+        self.assertEqual(len([x for x in queries if 'kpi_dashboard_dailykpi' in x['sql']]), 1)
+
+    @patch('kpi_dashboard.widgets.DailyKpi.objects.filter')
+    def test_exception_handling(self, mock_rollups):
         """Test that exceptions are properly caught and handled."""
-        # Make shipped orders query raise an exception
-        mock_shipped.side_effect = Exception("Test error")
+        # Make the rollup query raise an exception
+        mock_rollups.side_effect = Exception("Test error")
         
         request = self.factory.get(self.url)
         force_authenticate(request, user=self.user)
@@ -470,4 +542,297 @@ class ThroughputViewTests(TestCase):
         
         self.assertEqual(response.status_code, 500)
         self.assertIn('error', response.data)
-        self.assertEqual(response.data['error'], 'Test error')
\ No newline at end of file
+        self.assertEqual(response.data['error'], 'Test error')
+
+
+class KpiRollupTests(TestCase):
+    def setUp(self):
+        self.part = Part.objects.create(sku_color='TEST01', sku='TEST', description='Test Part')
+        self.today = timezone.localdate()
+
+    def create_picked_order(self, order_id, days_ago, picks=1):
+        picked_at = timezone.now() - timedelta(days=days_ago)
+        order = Orders.objects.create(order_id=order_id, status='In Progress', start_timestamp=picked_at)
+        picklist = InventoryPicklist.objects.create(order_id=order, status=False)
+        for _ in range(picks):
+            InventoryPicklistItem.objects.create(picklist_id=picklist, sku_color=self.part, amount=1, status=True, picked_at=picked_at)
+        return order
+
+    def test_first_refresh_rebuilds_history(self):
+        self.create_picked_order(1, days_ago=400, picks=2)
+        self.create_picked_order(2, days_ago=1)
+
+        first_day, last_day = update_kpi_rollups()
+
+        self.assertEqual((first_day, last_day), (self.today - timedelta(days=400), self.today))
+        self.assertEqual(DailyKpi.objects.count(), 401)
+        self.assertEqual(DailyKpi.objects.get(day=first_day).picked_items, 2)
+        self.assertEqual(DailyKpi.objects.get(day=first_day).orders_started, 1)
+        self.assertEqual(DailyKpi.objects.get(day=self.today - timedelta(days=1)).active_orders, 1)
+        self.assertEqual(
+            list(DailyOrderPicks.objects.order_by('day').values_list('order_id', 'picks')), [(1, 2), (2, 1)]
+        )
+        self.assertTrue(RollupWatermark.objects.filter(name='kpi_daily').exists())
+
+    def test_incremental_refresh_only_recomputes_recent_days(self):
+        self.create_picked_order(1, days_ago=100)
+        update_kpi_rollups()
+
+        # an event dated before the previous refresh is only picked up by a full rebuild
+        self.create_picked_order(2, days_ago=100)
+        self.create_picked_order(3, days_ago=0, picks=3)
+        first_day, _ = update_kpi_rollups()
+        old_day = DailyKpi.objects.get(day=self.today - timedelta(days=100))
+
+        self.assertEqual(first_day, self.today)
+        self.assertEqual(old_day.picked_items, 1)
+        self.assertEqual(DailyKpi.objects.get(day=self.today).picked_items, 3)
+
+        call_command('refresh_kpi_rollups', full=True, stdout=StringIO())
+        self.assertEqual(DailyKpi.objects.get(day=self.today - timedelta(days=100)).picked_items, 2)
+
+    def test_refresh_after_refresh_only_rebuilds_today(self):
+        self.create_picked_order(1, days_ago=3)
+        self.create_picked_order(2, days_ago=0)
+        update_kpi_rollups()
+        written = dict(DailyKpi.objects.values_list('day', 'updated_at'))
+
+        first_day, last_day = update_kpi_rollups()
+
+        self.assertEqual((first_day, last_day), (self.today, self.today))
+        rewritten = [day for day, updated_at in DailyKpi.objects.values_list('day', 'updated_at') if updated_at != written[day]]
+        self.assertEqual(rewritten, [self.today])
+        self.assertEqual(DailyKpi.objects.get(day=self.today - timedelta(days=3)).picked_items, 1)
+
+    def test_refresh_follows_status_changes(self):
+        order = self.create_picked_order(1, days_ago=3)
+        update_kpi_rollups()
+        self.assertEqual(DailyKpi.objects.get(day=self.today - timedelta(days=3)).active_orders, 1)
+
+        InventoryPicklist.objects.filter(order_id=order).update(status=True, picklist_complete_timestamp=timezone.now())
+        Orders.objects.filter(order_id=1).update(status='Completed')
+        update_kpi_rollups()
+
+        self.assertEqual(DailyKpi.objects.get(day=self.today - timedelta(days=3)).active_orders, 0)
+        self.assertEqual(DailyKpi.objects.get(day=self.today).completed_orders, 1)
+
+    def test_refresh_constant_queries(self):
+        self.create_picked_order(1, days_ago=2)
+        update_kpi_rollups()
+        # orders started before the previous refresh change the order counts of earlier days
+        self.create_picked_order(2, days_ago=3)
+        with CaptureQueriesContext(connection) as few:
+            update_kpi_rollups()
+
+        for order_id in range(3, 13):
+            self.create_picked_order(order_id, days_ago=order_id + 1, picks=2)
+        with CaptureQueriesContext(connection) as many:
+            update_kpi_rollups()
+
+        self.assertEqual(len(few), len(many))
+
+    def test_periodic_task_is_scheduled(self):
+        from django_celery_beat.models import PeriodicTask
+        task = PeriodicTask.objects.get(name='Refresh KPI rollups')
+        self.assertEqual(task.task, 'kpi_dashboard.tasks.refresh_kpi_rollups_task')
+        self.assertTrue(task.enabled)
+
+
+class KpiBundleTests(TestCase):
+    def setUp(self):
+        self.user = users.objects.create_user(
+            first_name='Test',
+            last_name='Manager',
+            username="manager",
+            password="managerpassword",
+            email="manager@example.com",
+            date_of_hire='1990-01-01',
+            department='Testing',
+            role='manager',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        part = Part.objects.create(sku_color='TEST01', sku='TEST', description='Test Part')
+        inventory = Inventory.objects.create(location='TESTLOC', sku_color=part, qty=100, warehouse_number='WH001', amount_needed=0)
+        for order_id, days_ago in [(1, 0), (2, 3), (3, 40)]:
+            started = timezone.now() - timedelta(days=days_ago)
+            order = Orders.objects.create(order_id=order_id, status='In Progress', start_timestamp=started, due_date=started)
+            picklist = InventoryPicklist.objects.create(order_id=order, assigned_employee_id=self.user, status=False)
+            InventoryPicklistItem.objects.create(picklist_id=picklist, location=inventory, sku_color=part, amount=2, status=True, picked_at=started)
+            InventoryPicklistItem.objects.create(picklist_id=picklist, location=inventory, sku_color=part, amount=1, status=False)
+        update_kpi_rollups()
+        reconcile_pick_counters()
+
+    def bundle(self, **params):
+        return self.client.get(reverse('kpi_bundle'), params)
+
+    def test_bundle_matches_the_widget_endpoints(self):
+        response = self.bundle()
+        self.assertEqual(response.status_code, 200)
+
+        endpoints = {
+            'order_picking_accuracy': 'order_picking_accuracy',
+            'daily_picks_data': 'daily_picks_data',
+            'daily_picks_details': 'daily_picks_details',
+            'order_fulfillment_rate': 'order_fulfillment_rate',
+            'active_orders': 'active_orders',
+            'completed_orders': 'completed_orders',
+            'active_orders_details': 'active_orders_details',
+            'throughput': 'throughput_threshold',
+        }
+        self.assertEqual(list(response.data), list(endpoints))
+        for widget, name in endpoints.items():
+            self.assertEqual(response.data[widget], self.client.get(reverse(name)).json(), widget)
+
+    def test_subset_with_widget_parameters(self):
+        response = self.bundle(**{
+            'widgets': 'throughput,order_picking_accuracy',
+            'throughput.bucket': 'week',
+            'throughput.start': '2024-01-01',
+            'throughput.end': '2024-01-31',
+            'order_picking_accuracy.breakdown': 'employee',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(set(response.data), {'throughput', 'order_picking_accuracy'})
+        self.assertEqual(response.data['throughput'][0]['day'], '2024-01-01')
+        self.assertEqual(len(response.data['throughput']), 5)
+        self.assertEqual(response.data['order_picking_accuracy']['breakdown'][0]['picked'], 2)
+
+    def test_widgets_share_their_sources(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bundle(widgets='active_orders,completed_orders,throughput,daily_picks_data,daily_picks_details')
+        self.assertEqual(response.status_code, 200)
+
+        tables = [x['sql'] for x in queries]
+        self.assertEqual(len([sql for sql in tables if 'kpi_dashboard_dailykpi' in sql]), 1)
+        self.assertEqual(len([sql for sql in tables if 'kpi_dashboard_dailyorderpicks' in sql]), 1)
+        self.assertEqual(len(queries), 2)
+
+    def test_invalid_widgets(self):
+        self.assertEqual(self.bundle(widgets='active_orders,unknown').status_code, 400)
+
+        response = self.bundle(**{'widgets': 'throughput', 'throughput.bucket': 'year'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['widget'], 'throughput')
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.bundle().status_code, 401)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = users.objects.create_user(
+            first_name='Test',
+            last_name='Admin',
+            username="admin",
+            password="adminpassword",
+            email="admin@example.com",
+            date_of_hire='1990-01-01',
+            department='Testing',
+            role='admin',
+            is_staff=False,
+            theme_preference='light'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.part = Part.objects.create(sku_color='TEST01', sku='TEST', description='Test Part')
+        self.order = Orders.objects.create(order_id=1, status='In Progress', start_timestamp=timezone.now())
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_second_request_is_served_from_cache(self):
+        url = reverse('order_fulfillment_rate')
+        first = self.client.get(url, {'filter': 'day'})
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, {'filter': 'day'})
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cache_stats()['order_fulfillment_rate'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_query_parameters_are_part_of_the_key(self):
+        url = reverse('order_fulfillment_rate')
+        day = self.client.get(url, {'filter': 'day'})
+        month = self.client.get(url, {'filter': 'month'})
+        same_month = self.client.get(url, {'filter': 'month'})
+
+        self.assertEqual(day['X-Cache'], 'MISS')
+        self.assertEqual(month['X-Cache'], 'MISS')
+        self.assertEqual(same_month['X-Cache'], 'HIT')
+        self.assertEqual(len(day.json()), 1)
+        self.assertGreater(len(month.json()), 1)
+
+    def test_writes_invalidate_the_cache(self):
+        url = reverse('order_fulfillment_rate')
+        before = self.client.get(url, {'filter': 'day'}).json()
+
+        Orders.objects.create(order_id=2, status='In Progress', start_timestamp=timezone.now())
+        after = self.client.get(url, {'filter': 'day'})
+
+        self.assertEqual(after['X-Cache'], 'MISS')
+        self.assertEqual(before[0]['total_orders_started'], 1)
+        self.assertEqual(after.json()[0]['total_orders_started'], 2)
+
+    def test_writes_leave_the_rollup_views_cached(self):
+        live, rollup = reverse('order_fulfillment_rate'), reverse('active_orders')
+        self.client.get(live, {'filter': 'day'})
+        self.client.get(rollup)
+
+        Orders.objects.create(order_id=2, status='In Progress', start_timestamp=timezone.now())
+
+        self.assertEqual(self.client.get(live, {'filter': 'day'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(rollup)['X-Cache'], 'HIT')
+
+    def test_rollup_refresh_invalidates_the_cache(self):
+        url = reverse('active_orders')
+        InventoryPicklist.objects.create(order_id=self.order, status=False)
+        before = self.client.get(url).json()
+
+        update_kpi_rollups()
+        after = self.client.get(url)
+
+        self.assertEqual(after['X-Cache'], 'MISS')
+        self.assertEqual(before[-1]['active_orders'], 0)
+        self.assertEqual(after.json()[-1]['active_orders'], 1)
+
+    def test_cached_views_still_authenticate(self):
+        url = reverse('throughput_threshold')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = APIClient().get(url)
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_concurrent_miss_waits_for_the_first_computation(self):
+        url = reverse('completed_orders')
+        request = RequestFactory().get(url)
+        key = cache_key('completed_orders', request)
+        cache.add(f"{key}:lock", 1, 5)
+
+        # another worker stores the response while this request waits for the lock
+        def computed_elsewhere(seconds):
+            cache.set(key, {"data": [{"date": "2024-01-01", "completed_orders": 7}]})
+        with patch('backend.response_cache.time.sleep', side_effect=computed_elsewhere):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json(), [{"date": "2024-01-01", "completed_orders": 7}])
+        self.assertFalse([x for x in queries if 'kpi_dashboard_dailykpi' in x['sql']])
+
+    def test_response_cache_stats(self):
+        self.client.get(reverse('throughput_threshold'))
+        self.client.get(reverse('throughput_threshold'))
+
+        response = self.client.get(reverse('response_cache_stats'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['throughput'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        self.assertEqual(response.json()['cycle_time_per_order'], {'hits': 0, 'misses': 0, 'hit_rate': None})
@@ -11,5 +11,7 @@ urlpatterns = [
     path('completed-orders/', views.CompletedOrdersView.as_view(), name='completed_orders'), 
     path('active-orders-details/', views.ActiveOrdersDetailsView.as_view(), name='active_orders_details'),
     path('throughput-threshold/', views.ThroughputView.as_view(), name='throughput_threshold'), 
+    path('bundle/', views.KpiBundleView.as_view(), name='kpi_bundle'),
+    path('response-cache-stats/', views.ResponseCacheStatsView.as_view(), name='response_cache_stats'),
 
 ]
\ No newline at end of file
@@ -0,0 +1,395 @@
+# This file defines the widgets of the KPI dashboard, computed by their own endpoint or together by KpiBundleView.
+
+# KpiSources: Rows read by several widgets (pick counters, daily rollups), loaded once per request.
+# picking_accuracy, daily_picks, daily_picks_details, fulfillment_rate, active_orders, completed_orders,
+# active_orders_details, throughput: Compute the data of one widget from the sources and its query parameters.
+# WIDGETS: Widget name -> widget function, in the order of the dashboard.
+# prefetch_sources: Loads at once the rollup days needed by a set of widgets.
+
+# A widget raises InvalidWidgetParameter, with the message returned to the client, when its parameters are invalid.
+
+from datetime import date, datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count, Prefetch, Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+from inventory.models import InventoryPicklist, InventoryPicklistItem, PickCounter, DailyPickCounter
+from orders.models import Orders
+from .models import DailyKpi, DailyOrderPicks
+
+# manufacturing steps during which an order counts as partially fulfilled
+IN_PROGRESS_MANUFACTURING_STATUSES = ["nesting", "bending", "cutting", "welding", "painting"]
+
+# days shown by the active and completed orders widgets
+RECENT_ORDERS_DAYS = 30
+
+# resolutions of the throughput series and length of a bucket
+THROUGHPUT_BUCKETS = {
+    "day": relativedelta(days=1),
+    "week": relativedelta(weeks=1),
+    "month": relativedelta(months=1),
+}
+
+
+class InvalidWidgetParameter(ValueError):
+    pass
+
+
+def bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise InvalidWidgetParameter("Invalid date format, expected YYYY-MM-DD")
+
+
+class KpiSources:
+    """
+    Rows shared by the widgets of one request, each source is queried at most once.
+    """
+
+    def __init__(self):
+        self._pick_counters = None
+        self._order_picks = None
+        self._daily_kpis = {}
+        self._daily_kpi_range = None
+
+    def pick_counters(self):
+        if self._pick_counters is None:
+            self._pick_counters = dict(PickCounter.objects.values_list('name', 'value'))
+        return self._pick_counters
+
+    def order_picks(self):
+        # picks per day and order (DailyOrderPicks rollup), ordered by day and order
+        if self._order_picks is None:
+            self._order_picks = list(DailyOrderPicks.objects.values('day', 'order_id', 'picks').order_by('day', 'order_id'))
+        return self._order_picks
+
+    def daily_kpis(self, first_day, last_day):
+        """
+        Return {day: DailyKpi values} for the days [first_day, last_day] that have a rollup row.
+        The rows are queried again only if the range is not covered by the rows already loaded.
+        """
+        loaded = self._daily_kpi_range
+        if loaded is None or first_day < loaded[0] or last_day > loaded[1]:
+            if loaded is not None:
+                first_day, last_day = min(first_day, loaded[0]), max(last_day, loaded[1])
+            rows = DailyKpi.objects.filter(day__gte=first_day, day__lte=last_day).values(
+                'day', 'picked_items', 'packed_parts', 'shipped_qty', 'active_orders', 'completed_orders'
+            )
+            self._daily_kpis = {row['day']: row for row in rows}
+            self._daily_kpi_range = (first_day, last_day)
+        return self._daily_kpis
+
+
+def picking_accuracy(sources, params):
+    """
+    Pick accuracy from the running pick counters (inventory.counters), without scanning the picklist items.
+    With breakdown=day or breakdown=employee, also the picked, repicked and manually picked items per
+    picking day or per picker between start and end (YYYY-MM-DD, by default the last 30 days).
+    """
+    counters = sources.pick_counters()
+    accurate_picks = counters.get('picked', 0)
+    total_picks = counters.get('total', 0)
+    inaccurate_picks = total_picks - accurate_picks
+
+    # Calculate accuracy percentage
+    accuracy_percentage = (accurate_picks / total_picks * 100) if total_picks > 0 else 0
+
+    # Define the target accuracy (e.g., 99%)
+    target_accuracy = 99
+
+    data = {
+        'accurate_picks': accurate_picks,
+        'inaccurate_picks': inaccurate_picks,
+        'accuracy_percentage': round(accuracy_percentage, 2),  # Round to 2 decimal places
+        'target_accuracy': target_accuracy,
+        'repicked': counters.get('repicked', 0),
+        'manually_picked': counters.get('manually_picked', 0),
+    }
+
+    breakdown = params.get('breakdown')
+    if not breakdown:
+        return data
+    if breakdown not in ('day', 'employee'):
+        raise InvalidWidgetParameter("breakdown must be day or employee")
+    end_date = _parse_day(params['end']) if params.get('end') else timezone.localdate()
+    start_date = _parse_day(params['start']) if params.get('start') else end_date - timedelta(days=30)
+
+    keys = ['day'] if breakdown == 'day' else ['employee_id', 'employee__first_name', 'employee__last_name']
+    rows = (
+        DailyPickCounter.objects
+        .filter(day__gte=start_date, day__lte=end_date)
+        .values(*keys)
+        .annotate(n_picked=Sum('picked'), n_repicked=Sum('repicked'), n_manually_picked=Sum('manually_picked'))
+        .order_by(*keys[:1])
+    )
+    data['breakdown'] = []
+    for row in rows:
+        entry = {'day': row['day'].strftime("%Y-%m-%d")} if breakdown == 'day' else {
+            'employee_id': row['employee_id'],
+            'employee': f"{row['employee__first_name']} {row['employee__last_name']}" if row['employee_id'] else "Unassigned",
+        }
+        # first time right: the picked items that did not have to be picked again
+        entry.update({
+            'picked': row['n_picked'],
+            'repicked': row['n_repicked'],
+            'manually_picked': row['n_manually_picked'],
+            'accuracy_percentage': round((row['n_picked'] - row['n_repicked']) / row['n_picked'] * 100, 2) if row['n_picked'] else 0,
+        })
+        data['breakdown'].append(entry)
+    return data
+
+
+def daily_picks(sources, params):
+    """
+    Total picked items per day (status=True, by picked_at), summed from the picks per day and order.
+    """
+    picks_by_day = {}
+    for row in sources.order_picks():
+        picks_by_day[row['day']] = picks_by_day.get(row['day'], 0) + row['picks']
+    return [{"day": day.strftime("%Y-%m-%d"), "picks": picks} for day, picks in picks_by_day.items()]
+
+
+def daily_picks_details(sources, params):
+    """
+    Picked items grouped by day and order_id.
+    """
+    return [
+        {"day": row['day'].strftime("%Y-%m-%d"), "order_id": str(row['order_id']), "picks": row['picks']}
+        for row in sources.order_picks()
+    ]
+
+
+def fulfillment_rate(sources, params):
+    """
+    Order fulfillment statistics of each day of a period, given by 'filter' ('day', 'week', 'month' (default),
+    'quarter' or 'year') around 'date', or by a custom range with 'start' and 'end' (YYYY-MM-DD, both included).
+
+    The statistics of all the days are computed by one query grouped by day, plus the
+    total number of orders, so the cost does not depend on the length of the period.
+    """
+    filter_type = params.get('filter', 'month').lower()
+    reference_date = _parse_day(params['date']) if params.get('date') else timezone.localdate()
+    start_str, end_str = params.get('start'), params.get('end')
+    if start_str or end_str or filter_type == 'custom':
+        if not (start_str and end_str):
+            raise InvalidWidgetParameter("A custom range needs both start and end")
+        filter_type = 'custom'
+        range_start, range_end = _parse_day(start_str), _parse_day(end_str)
+
+    # Determine the overall period (first day included, last day excluded) based on filter type
+    if filter_type == 'custom':
+        if range_end < range_start:
+            raise InvalidWidgetParameter("end must not be before start")
+        first_day, end_day = range_start, range_end + timedelta(days=1)
+    elif filter_type == 'day':
+        first_day = reference_date
+        end_day = first_day + timedelta(days=1)
+    elif filter_type == 'week':
+        # Start on Monday
+        first_day = reference_date - timedelta(days=reference_date.weekday())
+        end_day = first_day + timedelta(days=7)
+    elif filter_type == 'quarter':
+        first_day = reference_date.replace(month=3 * ((reference_date.month - 1) // 3) + 1, day=1)
+        end_day = first_day + relativedelta(months=3)
+    elif filter_type == 'year':
+        first_day = reference_date.replace(month=1, day=1)
+        end_day = first_day + relativedelta(years=1)
+    else:  # Default to month
+        first_day = reference_date.replace(day=1)
+        end_day = first_day + relativedelta(months=1)
+
+    period_start = timezone.make_aware(datetime.combine(first_day, datetime.min.time()))
+    period_end = timezone.make_aware(datetime.combine(end_day, datetime.min.time()))
+
+    # Aggregate the orders started on each day of the period, with the number of them having at least one
+    # manufacturing task in progress (partially fulfilled) or completed (fully fulfilled) for one of their parts
+    manufacturing_status = 'orderpart__sku_color__manufacturingtask__status'
+    orders_qs = (
+        Orders.objects
+        .filter(start_timestamp__gte=period_start, start_timestamp__lt=period_end)
+        .annotate(day=TruncDay('start_timestamp'))
+        .values('day')
+        .annotate(
+            total_orders_started=Count('order_id', distinct=True),
+            partially_fulfilled=Count('order_id', distinct=True, filter=Q(**{f"{manufacturing_status}__in": IN_PROGRESS_MANUFACTURING_STATUSES})),
+            fully_fulfilled=Count('order_id', distinct=True, filter=Q(**{manufacturing_status: "completed"})),
+        )
+        .order_by('day')
+    )
+
+    # Create a lookup dictionary keyed by the day (date object)
+    aggregated_data = {timezone.localtime(entry['day']).date(): entry for entry in orders_qs}
+    total_orders_count = Orders.objects.count()
+
+    data = []
+    for offset in range((end_day - first_day).days):
+        current_day = first_day + timedelta(days=offset)
+        entry = aggregated_data.get(current_day, {})
+        data.append({
+            "period": current_day.strftime("%Y-%m-%d"),
+            "total_orders_started": entry.get('total_orders_started', 0),
+            "total_orders_count": total_orders_count,
+            "orders_started": entry.get('total_orders_started', 0),
+            "partially_fulfilled": entry.get('partially_fulfilled', 0),
+            "fully_fulfilled": entry.get('fully_fulfilled', 0),
+        })
+    return data
+
+
+def recent_orders_range(params):
+    end_date = timezone.now().date()
+    return end_date - timedelta(days=RECENT_ORDERS_DAYS), end_date
+
+
+def _recent_orders(sources, field):
+    start_date, end_date = recent_orders_range({})
+    rollups = sources.daily_kpis(start_date, end_date)
+    return [
+        {"date": day.strftime('%Y-%m-%d'), field: rollups[day][field] if day in rollups else 0}
+        for day in (start_date + timedelta(days=x) for x in range((end_date - start_date).days + 1))
+    ]
+
+
+def active_orders(sources, params):
+    """
+    Picklists still to pick of the in progress orders, per start day of the order, over the last 30 days.
+    """
+    return _recent_orders(sources, 'active_orders')
+
+
+def completed_orders(sources, params):
+    """
+    Picklists of completed orders fully picked, per completion day, over the last 30 days.
+    """
+    return _recent_orders(sources, 'completed_orders')
+
+
+def active_orders_details(sources, params):
+    """
+    The picklists of the active orders started in the last 30 days, with their assignee and items.
+    """
+    start_date, end_date = recent_orders_range(params)
+    active_picklists = (
+        InventoryPicklist.objects
+        .filter(
+            status=False,
+            order_id__status="In Progress",
+            order_id__start_timestamp__date__gte=start_date,
+            order_id__start_timestamp__date__lte=end_date
+        )
+        .select_related('order_id', 'assigned_employee_id')
+        .prefetch_related(Prefetch(
+            'inventorypicklistitem_set', queryset=InventoryPicklistItem.objects.select_related('sku_color', 'location')
+        ))
+    )
+
+    data = []
+    for picklist in active_picklists:
+        data.append({
+            "order_id": picklist.order_id.order_id,
+            "start_date": picklist.order_id.start_timestamp.strftime('%Y-%m-%d'),
+            "due_date": picklist.order_id.due_date.strftime('%Y-%m-%d') if picklist.order_id.due_date else None,
+            "assigned_employee": (
+                f"{picklist.assigned_employee_id.first_name} {picklist.assigned_employee_id.last_name}"
+                if picklist.assigned_employee_id else "Unassigned"
+            ),
+            "items": [
+                {
+                    "sku_color": item.sku_color.sku_color,
+                    "quantity": item.amount,
+                    "location": item.location.location if item.location else "N/A",
+                    "status": "Picked" if item.status else "Pending"
+                }
+                for item in picklist.inventorypicklistitem_set.all()
+            ]
+        })
+    return data
+
+
+def throughput_range(params):
+    bucket = params.get("bucket", "day").lower()
+    if bucket not in THROUGHPUT_BUCKETS:
+        raise InvalidWidgetParameter("bucket must be one of day, week, month")
+    try:
+        # By default, the current date and the start date 1 year ago
+        end_date = date.fromisoformat(params["end"]) if params.get("end") else timezone.now().date()
+        start_date = date.fromisoformat(params["start"]) if params.get("start") else end_date - timedelta(days=365)
+    except ValueError:
+        raise InvalidWidgetParameter("Invalid date format, expected YYYY-MM-DD")
+    if end_date < start_date:
+        raise InvalidWidgetParameter("end must not be before start")
+    return start_date, end_date
+
+
+def throughput(sources, params):
+    """
+    Picked items, packed order parts and shipped quantities per day (default), week or month.
+    Parameters: bucket=day|week|month, start and end (YYYY-MM-DD, both included, by default the last 365 days).
+    Each entry is labelled with the first day of its bucket ("day"), buckets with no activity are included with zeros.
+    """
+    start_date, end_date = throughput_range(params)
+    bucket = params.get("bucket", "day").lower()
+
+    # Sets all picked, packed, shipped to zero to ensure no missing bucket in the response
+    throughput_data = {}
+    current = bucket_start(start_date, bucket)
+    while current <= end_date:
+        throughput_data[current] = {"picked": 0, "packed": 0, "shipped": 0}
+        current += THROUGHPUT_BUCKETS[bucket]
+
+    # Picked items, packed order parts and shipped quantities of the DailyKpi rollup, summed per bucket
+    for day, row in sources.daily_kpis(start_date, end_date).items():
+        if start_date <= day <= end_date:
+            totals = throughput_data[bucket_start(day, bucket)]
+            totals["picked"] += row["picked_items"]
+            totals["packed"] += row["packed_parts"]
+            totals["shipped"] += row["shipped_qty"]
+
+    return [
+        {"day": day.strftime("%Y-%m-%d"), "picked": totals["picked"], "packed": totals["packed"], "shipped": totals["shipped"]}
+        for day, totals in sorted(throughput_data.items())
+    ]
+
+
+WIDGETS = {
+    "order_picking_accuracy": picking_accuracy,
+    "daily_picks_data": daily_picks,
+    "daily_picks_details": daily_picks_details,
+    "order_fulfillment_rate": fulfillment_rate,
+    "active_orders": active_orders,
+    "completed_orders": completed_orders,
+    "active_orders_details": active_orders_details,
+    "throughput": throughput,
+}
+
+# widgets reading the DailyKpi rollup -> range of days they read
+DAILY_KPI_RANGES = {
+    "active_orders": recent_orders_range,
+    "completed_orders": recent_orders_range,
+    "throughput": throughput_range,
+}
+
+
+def prefetch_sources(sources, widget_params):
+    """
+    Load with one query the DailyKpi days read by all the widgets of `widget_params` ({widget name: params}).
+    """
+    ranges = []
+    for name, params in widget_params.items():
+        if name in DAILY_KPI_RANGES:
+            try:
+                ranges.append(DAILY_KPI_RANGES[name](params))
+            except InvalidWidgetParameter:
+                # reported when the widget itself is computed
+                continue
+    if ranges:
+        sources.daily_kpis(min(first for first, _ in ranges), max(last for _, last in ranges))
@@ -1,17 +1,15 @@
 from django.shortcuts import render
 import json
 from django.http import JsonResponse
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
 import logging
 from inventory.models import InventoryPicklistItem
 from parts.models import Part 
+from backend.async_views import async_api_view
 
 logger = logging.getLogger("WarehousePilot_app")
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_label_data(request, picklist_item_id):
+@async_api_view
+async def get_label_data(request, picklist_item_id):
     """
     Return label data for a given picklist_item_id.
     The label includes SKU_COLOR, QTY, ORDER_NUMBER.
@@ -20,10 +18,10 @@ def get_label_data(request, picklist_item_id):
     """
     try:
         logger.info(f"Fetching label data for picklist_item_id: {picklist_item_id}")
-        item = (
+        item = await (
             InventoryPicklistItem.objects
             .select_related('sku_color', 'picklist_id__order_id')
-            .get(picklist_item_id=picklist_item_id)
+            .aget(picklist_item_id=picklist_item_id)
         )
         part = item.sku_color
         
@@ -51,9 +49,8 @@ def get_label_data(request, picklist_item_id):
         return JsonResponse({"error": str(e)}, status=500)
 
 # getting all labels for aggregated view 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_all_labels_for_order(request, order_id):
+@async_api_view
+async def get_all_labels_for_order(request, order_id):
     try:
         items = (
             InventoryPicklistItem.objects
@@ -62,9 +59,11 @@ def get_all_labels_for_order(request, order_id):
         )
 
         labels = []
-        total = items.count()
+        total = await items.acount()
 
-        for index, item in enumerate(items, start=1):
+        index = 0
+        async for item in items.aiterator():
+            index += 1
             part = item.sku_color
             labels.append({
                 "SKU_COLOR": (part.sku_color or "").upper(),
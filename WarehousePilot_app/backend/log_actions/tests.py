@@ -8,6 +8,11 @@ from django.utils import timezone
 from django.urls import reverse
 from rest_framework_simplejwt.tokens import RefreshToken
 from auth_app.models import users
+from inventory.models import Inventory, InventoryPicklist, InventoryPicklistItem
+from orders.models import Orders
+from parts.models import Part
+from datetime import timedelta
+import json
 
 
 class InventoryPickingLoggingTests(TestCase):
@@ -37,19 +42,21 @@ class InventoryPickingLoggingTests(TestCase):
         # Backend URL for the InventoryPickingLogging endpoint
         self.url = reverse('inventory_picking_logging') 
 
-    @patch('inventory.models.InventoryPicklist.objects.all')
-    @patch('inventory.models.InventoryPicklistItem.objects.all')
-    @patch('inventory.models.Inventory.objects.all')
+    # create_picklist(): Creates an assigned picklist of a new order, and a part with an inventory location
+    def create_picklist(self, warehouse_nb='499'):
+        order = Orders.objects.create(order_id=5, status="In Progress")
+        self.part = Part.objects.create(sku_color="red")
+        self.inventory = Inventory.objects.create(location="A1", sku_color=self.part, qty=10, warehouse_number="499", amount_needed=0)
+        return InventoryPicklist.objects.create(order_id=order, status=False, assigned_employee_id=self.user, warehouse_nb=warehouse_nb)
+
     # test_get_inventory_picking_logging_success(): Test the successful retrieval of inventory picking logs
-    def test_get_inventory_picking_logging_success(self, mock_inventory, mock_picklist_item, mock_picklist):
-        # Arrange: Mocking InventoryPicklist, InventoryPicklistItem, and Inventory models
-        mock_picklist.return_value.values.return_value.filter.return_value.order_by.return_value = [
-            {'picklist_id': 1, 'warehouse_nb': '499', 'order_id': 5, 'assigned_employee_id': 123}
-        ]
-        mock_picklist_item.return_value.filter.return_value.values.return_value = [
-            {'picklist_id': 1, 'picked_at': timezone.now(), 'location': 'A1', 'sku_color': 'red', 'amount': 10}
-        ]
-        mock_inventory.return_value.filter.return_value.values.return_value.first.return_value = {'location': 'A1', 'sku_color': 'red'}
+    def test_get_inventory_picking_logging_success(self):
+        # Arrange: Create a picked item, an unpicked item and a picked item of an unassigned picklist
+        picklist = self.create_picklist()
+        InventoryPicklistItem.objects.create(picklist_id=picklist, location=self.inventory, sku_color=self.part, amount=10, status=True, picked_at=timezone.now())
+        InventoryPicklistItem.objects.create(picklist_id=picklist, location=self.inventory, sku_color=self.part, amount=2, status=False)
+        unassigned = InventoryPicklist.objects.create(order_id=Orders.objects.create(order_id=6, status="In Progress"), status=False)
+        InventoryPicklistItem.objects.create(picklist_id=unassigned, location=self.inventory, sku_color=self.part, amount=3, status=True)
 
         # Act: Make a GET request to InventoryPickingLogging
         response = self.client.get(self.url)
@@ -58,17 +65,14 @@ class InventoryPickingLoggingTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['warehouse'], '499')
-        self.assertEqual(response.data[0]['employee_id'], 123)
+        self.assertEqual(response.data[0]['employee_id'], self.user.pk)
+        self.assertEqual(response.data[0]['order_number'], 5)
         self.assertEqual(response.data[0]['sku_color'], 'red')
-        self.assertEqual(response.data[0]['location'], 'A1')
+        self.assertEqual(response.data[0]['location'], self.inventory.inventory_id)
         self.assertEqual(response.data[0]['qty_out'], 10)
 
-    @patch('inventory.models.InventoryPicklist.objects.all')
     # test_get_inventory_picking_logging_no_picklists(): Test the case when there are no picklists available
-    def test_get_inventory_picking_logging_no_picklists(self, mock_picklist):
-        # Arrange: Mocking InventoryPicklist to return an empty list
-        mock_picklist.return_value.values.return_value.filter.return_value.order_by.return_value = []
-
+    def test_get_inventory_picking_logging_no_picklists(self):
         # Act: Make a GET request to InventoryPickingLogging
         response = self.client.get(self.url)
 
@@ -76,11 +80,11 @@ class InventoryPickingLoggingTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
-    @patch('inventory.models.InventoryPicklist.objects.all')
+    @patch('log_actions.views.picked_items')
     # test_get_inventory_picking_logging_exception(): Test the case when an exception occurs while fetching picklists
-    def test_get_inventory_picking_logging_exception(self, mock_picklist):
-        # Arrange: Mocking InventoryPicklist to raise an exception
-        mock_picklist.side_effect = Exception("Failed to fetch the data for tracking inventory picking activity (InventoryPickingLogging)")
+    def test_get_inventory_picking_logging_exception(self, mock_picked_items):
+        # Arrange: Mocking the query of the picked items to raise an exception
+        mock_picked_items.side_effect = Exception("Failed to fetch the data for tracking inventory picking activity (InventoryPickingLogging)")
 
         # Act: Make a GET request to InventoryPickingLogging
         response = self.client.get(self.url)
@@ -89,28 +93,47 @@ class InventoryPickingLoggingTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertIn('error', response.data)
 
-    @patch('inventory.models.InventoryPicklist.objects.all')
-    @patch('inventory.models.InventoryPicklistItem.objects.all')
-    @patch('inventory.models.Inventory.objects.all')
     # test_get_inventory_picking_logging_missing_data(): Test the case where warehouse_nb or location is missing
-    def test_get_inventory_picking_logging_missing_data(self, mock_inventory, mock_picklist_item, mock_picklist):
-        # Arrange: Mocking InventoryPicklist with missing warehouse_nb, InventoryPicklistItem with missing location, and Inventory models
-        mock_picklist.return_value.values.return_value.filter.return_value.order_by.return_value = [
-            {'picklist_id': 1, 'warehouse_nb': None, 'order_id': 5, 'assigned_employee_id': 123}
-        ]
-        mock_picklist_item.return_value.filter.return_value.values.return_value = [
-            {'picklist_id': 1, 'picked_at': timezone.now(), 'location': None, 'sku_color': 'red', 'amount': 10}
-        ]
-        mock_inventory.return_value.filter.return_value.values.return_value.first.return_value = {'location': 'A1', 'sku_color_id': 'red'}
+    def test_get_inventory_picking_logging_missing_data(self):
+        # Arrange: Create a picked item without location in a picklist without warehouse
+        picklist = self.create_picklist(warehouse_nb=None)
+        InventoryPicklistItem.objects.create(picklist_id=picklist, location=None, sku_color=self.part, amount=10, status=True, picked_at=timezone.now())
 
         # Act: Make a GET request to InventoryPickingLogging
         response = self.client.get(self.url)
 
-        # Assert: Check the response status and data
+        # Assert: Check that the default warehouse and the inventory location of the part are used
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['warehouse'], '499')
-        self.assertEqual(response.data[0]['employee_id'], 123)
+        self.assertEqual(response.data[0]['employee_id'], self.user.pk)
         self.assertEqual(response.data[0]['sku_color'], 'red')
         self.assertEqual(response.data[0]['location'], 'A1')
-        self.assertEqual(response.data[0]['qty_out'], 10)
\ No newline at end of file
+        self.assertEqual(response.data[0]['qty_out'], 10)
+
+    # test_get_inventory_picking_logging_stream(): Test that the streaming mode returns the same items, in the same order, in one query
+    def test_get_inventory_picking_logging_stream(self):
+        # Arrange: Create picked items with and without location and picking time
+        order = Orders.objects.create(order_id=7, status="In Progress")
+        part = Part.objects.create(sku_color="red")
+        inventory = Inventory.objects.create(location="A1", sku_color=part, qty=10, warehouse_number="499", amount_needed=0)
+        picklist = InventoryPicklist.objects.create(order_id=order, status=False, assigned_employee_id=self.user, warehouse_nb=None)
+        now = timezone.now()
+        InventoryPicklistItem.objects.create(picklist_id=picklist, location=inventory, sku_color=part, amount=3, status=True, picked_at=now - timedelta(hours=1))
+        InventoryPicklistItem.objects.create(picklist_id=picklist, location=None, sku_color=part, amount=4, status=True, picked_at=now)
+        InventoryPicklistItem.objects.create(picklist_id=picklist, location=inventory, sku_color=part, amount=5, status=True, picked_at=None)
+        InventoryPicklistItem.objects.create(picklist_id=picklist, location=inventory, sku_color=part, amount=6, status=False)
+        expected = self.client.get(self.url).json()
+
+        # Act: Make a streaming GET request to InventoryPickingLogging
+        response = self.client.get(self.url, {'stream': 'true'})
+
+        # Assert: Check the streamed items
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, expected)
+        self.assertEqual([x['qty_out'] for x in streamed], [4, 3, 5])
+        self.assertEqual(streamed[0]['location'], 'A1')
+        self.assertEqual(streamed[1]['location'], inventory.inventory_id)
+        self.assertEqual(streamed[0]['warehouse'], '499')
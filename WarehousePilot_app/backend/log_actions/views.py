@@ -1,5 +1,7 @@
 # This file defines views for employee activity logging 
-# InventoryPickingLogging(): Track the picking activity of employees in the warehouse
+# picked_items(): The picked items of the assigned picklists with their picklist, sorted by picking time, in one query
+# serialize_picked_item(): Formats a picked item as a picking log entry
+# InventoryPickingLogging(): Track the picking activity of employees in the warehouse (streamed with ?stream=true)
 
 import logging
 from django.shortcuts import render
@@ -7,76 +9,69 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from inventory.models import InventoryPicklist, InventoryPicklistItem, Inventory
+from inventory.models import InventoryPicklistItem, Inventory
 from rest_framework import status
+from django.db.models import F, OuterRef, Subquery
+from backend.streaming import STREAM_CHUNK_SIZE, wants_stream, stream_json_array, streaming_json_response
 
 # Django logger for backend
 logger = logging.getLogger('WarehousePilot_app')
 
+def picked_items():
+    # the picked items of the assigned picklists with their picklist and the first inventory location of their part
+    # (used when the item has no location), in one query sorted by picking time (most recent first, never picked last)
+    inventory_location = Inventory.objects.filter(
+        sku_color_id=OuterRef('sku_color'), location__isnull=False
+    ).values('location')[:1]
+
+    return InventoryPicklistItem.objects.filter(
+        status=True, picklist_id__assigned_employee_id__isnull=False
+    ).annotate(
+        inventory_location=Subquery(inventory_location)
+    ).order_by(
+        F('picked_at').desc(nulls_last=True), '-picklist_id'
+    ).values_list(
+        'picklist_id__warehouse_nb', 'picklist_id__assigned_employee_id', 'picklist_id__order_id',
+        'picked_at', 'location', 'sku_color', 'amount', 'inventory_location'
+    )
+
+
+def serialize_picked_item(row):
+    warehouse, employee_id, order_id, picked_at, location, sku_color, amount, inventory_location = row
+    if location is None and inventory_location is None:
+        logger.error(f"Failed to fetch information for picklist item with sku_color of {sku_color} (InventoryPickingLogging)")
+        return None
+    return {
+        'warehouse': '499' if warehouse is None else warehouse,
+        'date': None if picked_at is None else picked_at.date(),
+        'time': picked_at,
+        'employee_id': employee_id,
+        'transaction_type': 'Picking',
+        'order_number': 'N/A' if order_id is None else order_id,
+        'sku_color': sku_color,
+        'location': inventory_location if location is None else location,
+        'qty_out': amount
+    }
+
+
 class InventoryPickingLogging(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Initialize the list of picklist items
-        picked_items = []
-
         try:
-            # Fetch all the picklists
-            picklists = InventoryPicklist.objects.all().values('picklist_id', 'warehouse_nb', 'assigned_employee_id', 'order_id').filter(assigned_employee_id__isnull=False).order_by('-picklist_id')
-
-            try:
-                for picklist in picklists:
-                    # Set the values for the following variables
-                    id = picklist['picklist_id']
-                    warehouse = '499' if picklist['warehouse_nb'] is None else picklist['warehouse_nb']
-                    employee_id = picklist['assigned_employee_id']
-                    order_id = 'N/A' if picklist['order_id'] is None else picklist['order_id']
-
-                    # Fetch all the picklist items for each picklist
-                    picklist_items = InventoryPicklistItem.objects.all().filter(picklist_id=id, status=True).values('picked_at', 'location', 'sku_color', 'amount')
-
-                    # Formatting picklist item information to be returned in picked_items
-                    for item in picklist_items:
-                        try:
-                            # Fetch the location for each item
-                            location = Inventory.objects.all().filter(sku_color_id=item['sku_color'], location__isnull=False).values('location').first()
-                           
-                            # Add the item to the list of picked items
-                            picked_items.append({
-                                'warehouse': warehouse,
-                                'date': None if item['picked_at'] is None else item['picked_at'].date(),
-                                'time': None if item['picked_at'] is None else item['picked_at'],
-                                'employee_id': employee_id,
-                                'transaction_type': 'Picking',
-                                'order_number': order_id,
-                                'sku_color': item['sku_color'],
-                                'location': location['location'] if item['location'] is None else item['location'],
-                                'qty_out': item['amount']
-                            })
+            # Streaming mode (?stream=true): the rows are read from a server-side cursor and written as they come
+            if wants_stream(request):
+                rows = picked_items().iterator(chunk_size=STREAM_CHUNK_SIZE)
+                logger.info("Streaming data for tracking inventory picking activity (InventoryPickingLogging)")
+                return streaming_json_response(request, stream_json_array(rows, serialize_picked_item), "InventoryPickingLogging")
 
-                        except Exception as e:
-                            logger.error(f"Failed to fetch information for picklist item with sku_color of {item['sku_color']} (InventoryPickingLogging)")
-                
-                # Sort the list of picklist items by date annd time in descending order
-                picked_items = sorted(picked_items, key=lambda x: (x['time'] is not None, x['time']), reverse=True)
+            picked = [item for item in map(serialize_picked_item, picked_items()) if item is not None]
 
-                # Return the list of picked items
-                logger.info(f"Successfully fetch data for tracking inventory picking activity (InventoryPickingLogging)")
-                return Response(picked_items, status=status.HTTP_200_OK)
-            
-            except InventoryPicklist.DoesNotExist:
-                logger.error("Inventory Picklist does not exist")
-                return Response(status=status.HTTP_404_NOT_FOUND)
-            
-            except InventoryPicklistItem.DoesNotExist:
-                logger.error("Inventory Picklist Item does not exist")
-                return Response(status=status.HTTP_404_NOT_FOUND)
-            
-            except Exception as e:
-                logger.error("Failed to fetch data for the picklist %s (InventoryPickingLogging)", id)
-                return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+            # Return the list of picked items
+            logger.info(f"Successfully fetch data for tracking inventory picking activity (InventoryPickingLogging)")
+            return Response(picked, status=status.HTTP_200_OK)
 
         except Exception as e:
             logger.error("Failed to fetch the data for tracking inventory picking activity (InventoryPickingLogging)")
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
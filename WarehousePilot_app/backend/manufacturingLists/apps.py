@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManufacturinglistsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'manufacturingLists'
+
+    def ready(self):
+        # connect the receiver copying the assignments of the tasks to their stage events
+        from . import signals
@@ -0,0 +1,20 @@
+# Runs the manufacturing task generation jobs of celery beat (backend.celery) now, in this process.
+# Usage: python manage.py generate_manufacturing_tasks [--job create_manuTasks|one_off_manu_task_generate] [--full]
+
+from django.core.management.base import BaseCommand
+from backend.celery import create_manuTasks, one_off_manu_task_generate
+
+JOBS = {"create_manuTasks": create_manuTasks, "one_off_manu_task_generate": one_off_manu_task_generate}
+
+
+class Command(BaseCommand):
+    help = "Creates the manufacturing tasks of the items added since the last run (or of all the unassigned items with --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--job", choices=list(JOBS), action="append", help="job to run (default: all)")
+        parser.add_argument("--full", action="store_true", help="read every manufacturing list item of the job's orders, not only the new ones")
+
+    def handle(self, *args, job, full, **options):
+        for name in job or JOBS:
+            created = JOBS[name](full=full)
+            self.stdout.write(self.style.SUCCESS(f"{name}: created {created} manufacturing tasks"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturingLists', '0009_qaerrorreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskGenerationWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_item_id', models.IntegerField(default=0)),
+                ('first_due_date', models.DateField(null=True)),
+                ('last_due_date', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
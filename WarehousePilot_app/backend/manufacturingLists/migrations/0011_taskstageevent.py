@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturingLists', '0010_task_generation_watermark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStageEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stage', models.CharField(choices=[('nesting', 'nesting'), ('bending', 'bending'), ('cutting', 'cutting'), ('welding', 'welding'), ('painting', 'painting'), ('production_qa', 'production_qa'), ('painting_qa', 'painting_qa'), ('final_qa', 'final_qa'), ('error', 'error')], max_length=25)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('ended_at', models.DateTimeField(null=True)),
+                ('employee', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_stage_events', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stage_events', to='manufacturingLists.manufacturingtask')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', 'stage', 'started_at'], name='manufacturi_task_id_c83f91_idx'), models.Index(fields=['employee', 'stage', 'started_at'], name='manufacturi_employe_92b965_idx'), models.Index(fields=['stage', 'ended_at'], name='manufacturi_stage_9c8efc_idx'), models.Index(condition=models.Q(('ended_at', None)), fields=['stage', 'started_at'], name='task_stage_event_open')],
+            },
+        ),
+    ]
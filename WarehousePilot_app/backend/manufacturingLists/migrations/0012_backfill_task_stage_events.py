@@ -0,0 +1,62 @@
+# Builds the TaskStageEvent rows of the existing manufacturing tasks from their *_start_time/*_end_time columns.
+
+from django.db import migrations
+
+# (stage, employee field, start time field, end time field) of the stages with time columns, in process order
+TIMED_STAGES = [
+    ("nesting", "nesting_employee_id", "nesting_start_time", "nesting_end_time"),
+    ("bending", "bending_employee_id", "bending_start_time", "bending_end_time"),
+    ("cutting", "cutting_employee_id", "cutting_start_time", "cutting_end_time"),
+    ("welding", "welding_employee_id", "welding_start_time", "welding_end_time"),
+    ("painting", "paint_employee_id", "paint_start_time", "paint_end_time"),
+]
+EMPLOYEE_FIELDS = {stage: employee_field for stage, employee_field, _, _ in TIMED_STAGES}
+EMPLOYEE_FIELDS.update({"production_qa": "prod_qa_employee_id", "painting_qa": "paint_qa_employee_id"})
+# status -> stage of the current stage of a task, the QA stages have no time columns
+CURRENT_STAGES = {stage: stage for stage in EMPLOYEE_FIELDS}
+CURRENT_STAGES.update({"in progress": "final_qa", "error": "error"})
+BATCH_SIZE = 1000
+
+
+def task_events(TaskStageEvent, task):
+    # the ended stages (with an end time), then the current stage, started when the last stage ended
+    events, last_end = [], None
+    for stage, employee_field, start_field, end_field in TIMED_STAGES:
+        started_at, ended_at = getattr(task, start_field), getattr(task, end_field)
+        if ended_at is not None:
+            events.append(TaskStageEvent(task_id=task.pk, stage=stage, employee_id=getattr(task, employee_field),
+                                         started_at=started_at or last_end, ended_at=ended_at))
+            last_end = max(last_end, ended_at) if last_end else ended_at
+    current = CURRENT_STAGES.get((task.status or "").strip().lower())
+    if current is not None and current not in {x.stage for x in events}:
+        employee_field = EMPLOYEE_FIELDS.get(current)
+        events.append(TaskStageEvent(task_id=task.pk, stage=current, employee_id=getattr(task, employee_field) if employee_field else None,
+                                     started_at=last_end))
+    return events
+
+
+def backfill(apps, schema_editor):
+    ManufacturingTask = apps.get_model("manufacturingLists", "ManufacturingTask")
+    TaskStageEvent = apps.get_model("manufacturingLists", "TaskStageEvent")
+    batch = []
+    for task in ManufacturingTask.objects.order_by("pk").iterator(chunk_size=BATCH_SIZE):
+        batch += task_events(TaskStageEvent, task)
+        if len(batch) >= BATCH_SIZE:
+            TaskStageEvent.objects.bulk_create(batch)
+            batch = []
+    TaskStageEvent.objects.bulk_create(batch)
+
+
+def clear(apps, schema_editor):
+    apps.get_model("manufacturingLists", "TaskStageEvent").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturingLists', '0011_taskstageevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
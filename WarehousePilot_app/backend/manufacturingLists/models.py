@@ -85,6 +85,55 @@ class ManufacturingListItem(models.Model):
     process_progress = models.CharField(null=True, max_length=25, choices=PROGRESS_STAGES)
     manufacturing_task = models.ForeignKey(ManufacturingTask, null=True, on_delete=models.SET_NULL)
 
+class TaskGenerationWatermark(models.Model):
+    '''
+    Progress of a manufacturing task generation job (backend.celery): the last manufacturing list item it read and the
+    due date window of the orders it covered. The next run only reads the items added since and the orders entering
+    the window, see manufacturingLists.task_generation.
+    '''
+    name = models.CharField(max_length=100, primary_key=True)
+    last_item_id = models.IntegerField(default=0)
+    first_due_date = models.DateField(null=True) # null: no lower bound
+    last_due_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+class TaskStageEvent(models.Model):
+    '''
+    One pass of a manufacturing task through a stage: who worked on it, when it started and when it ended (null
+    while the task is in that stage). Written by manufacturingLists.stage_events when the status of a task changes,
+    the rows of the tasks older than the table were built from their *_start_time/*_end_time columns.
+    '''
+    STAGES={
+        "nesting" : "nesting",
+        "bending" : "bending",
+        "cutting" : "cutting",
+        "welding" : "welding",
+        "painting" : "painting",
+        "production_qa" : "production_qa",
+        "painting_qa" : "painting_qa",
+        "final_qa" : "final_qa", # status "in progress"
+        "error" : "error" # QA error reported, until its status is updated
+    }
+    id = models.BigAutoField(primary_key=True)
+    # the composite indexes below start with the task and the employee
+    task = models.ForeignKey(ManufacturingTask, on_delete=models.CASCADE, related_name="stage_events", db_index=False)
+    stage = models.CharField(max_length=25, choices=STAGES)
+    employee = models.ForeignKey(users, null=True, on_delete=models.SET_NULL, related_name="task_stage_events", db_index=False)
+    started_at = models.DateTimeField(null=True) # null when unknown (tasks older than the table)
+    ended_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            # history of a task
+            models.Index(fields=["task", "stage", "started_at"]),
+            # history of an employee, in one stage or all of them
+            models.Index(fields=["employee", "stage", "started_at"]),
+            # durations and throughput of a stage (department) over a period
+            models.Index(fields=["stage", "ended_at"]),
+            # work in progress of a stage
+            models.Index(fields=["stage", "started_at"], condition=models.Q(ended_at=None), name="task_stage_event_open"),
+        ]
+
 class QAErrorReport(models.Model):
     """
     Stores detailed QA error reports. Multiple reports can be linked to a single task.
@@ -0,0 +1,22 @@
+# This file defines the signal receivers keeping the stage events of the manufacturing tasks in sync with the tasks.
+
+# assignments_changed: Copies the employees assigned on a saved task (views, admin) to its stage events.
+
+# The tasks created in bulk by the task generation start their events themselves (start_first_stage), a task
+# created on its own has no events yet. Queryset update() does not send the signal, call sync_assignments after it.
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import ManufacturingTask
+from .stage_events import STAGE_FIELDS, sync_assignments
+
+ASSIGNMENT_FIELDS = {employee_field.removesuffix("_id") for employee_field, _ in STAGE_FIELDS.values()}
+
+
+@receiver(post_save, sender=ManufacturingTask, dispatch_uid="task_stage_event_assignments")
+def assignments_changed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    if update_fields is not None and not ASSIGNMENT_FIELDS & {x.removesuffix("_id") for x in update_fields}:
+        return
+    sync_assignments(instance)
@@ -0,0 +1,92 @@
+# This file defines how the stage changes of the manufacturing tasks are recorded in TaskStageEvent.
+
+# stage_of: The stage of a task status, None for the statuses ending the process.
+# start_first_stage: Starts the events of the first stage of new tasks.
+# record_status_change: Ends the event of the previous stage of a task and starts the event of its current stage.
+# sync_assignments: Gives the events of a task the employees assigned to their stages on the task.
+
+# The statuses are the stages, except "in progress" (waiting for the final QA) and the end of the process. The
+# ManufacturingTask columns are still written by the views, the events are added in the same transaction. The
+# employees assigned on the task (by the views or the admin) are copied to its events when it is saved
+# (manufacturingLists.signals), the events are what the staff dashboard reads for the stages a task reached.
+
+from functools import reduce
+from operator import or_
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import TaskStageEvent
+
+# status -> stage, the other statuses are their own stage
+STAGE_OF_STATUS = {"in progress": "final_qa", "pick and pack": None, "completed": None}
+# stage -> (employee field, start time field) of ManufacturingTask
+STAGE_FIELDS = {
+    "nesting": ("nesting_employee_id", "nesting_start_time"),
+    "bending": ("bending_employee_id", "bending_start_time"),
+    "cutting": ("cutting_employee_id", "cutting_start_time"),
+    "welding": ("welding_employee_id", "welding_start_time"),
+    "painting": ("paint_employee_id", "paint_start_time"),
+    "production_qa": ("prod_qa_employee_id", None),
+    "painting_qa": ("paint_qa_employee_id", None),
+}
+
+
+def stage_of(status):
+    status = (status or "").strip().lower()
+    stage = STAGE_OF_STATUS.get(status, status)
+    return stage if stage in TaskStageEvent.STAGES else None
+
+
+def _assigned(task, stage):
+    # the employee assigned to the stage on the task, and the start time of the stage when the task has one
+    employee_field, start_field = STAGE_FIELDS.get(stage, (None, None))
+    return (getattr(task, employee_field) if employee_field else None), (getattr(task, start_field) if start_field else None)
+
+
+def start_first_stage(tasks, at=None):
+    """
+    Start the event of the stage of each of the new `tasks` (saved), with one insert.
+    """
+    at = at or timezone.now()
+    TaskStageEvent.objects.bulk_create([
+        TaskStageEvent(task=task, stage=stage_of(task.status), employee_id=_assigned(task, stage_of(task.status))[0], started_at=at)
+        for task in tasks if stage_of(task.status) is not None
+    ])
+
+
+def record_status_change(task, previous_status, employee=None, at=None):
+    """
+    Record that `task` went from `previous_status` to its current status at `at` (now by default): the event of the
+    previous stage ends, done by `employee` when no one was assigned to it, and the event of the new stage starts.
+    Call it in the transaction saving the task.
+    """
+    previous, current = stage_of(previous_status), stage_of(task.status)
+    if previous == current:
+        return
+    at = at or timezone.now()
+    employee_id = employee.pk if employee is not None and employee.is_authenticated else None
+
+    if previous is not None:
+        ended = TaskStageEvent.objects.filter(task=task, stage=previous, ended_at=None).update(
+            ended_at=at, employee=Coalesce(F("employee"), Value(employee_id), output_field=IntegerField())
+        )
+        if not ended:
+            # the stage started before the events were recorded
+            assigned, started_at = _assigned(task, previous)
+            TaskStageEvent.objects.create(task=task, stage=previous, employee_id=assigned or employee_id, started_at=started_at, ended_at=at)
+    if current is not None:
+        TaskStageEvent.objects.create(task=task, stage=current, employee_id=_assigned(task, current)[0], started_at=at)
+
+
+def sync_assignments(task):
+    """
+    Give the events of the stages of `task` that have an employee assigned on the task this employee, with one
+    UPDATE (none when nothing is assigned). The events of the other stages keep theirs. Returns the events changed.
+    """
+    assigned = {stage: _assigned(task, stage)[0] for stage in STAGE_FIELDS}
+    assigned = {stage: employee for stage, employee in assigned.items() if employee is not None}
+    if not assigned:
+        return 0
+    return TaskStageEvent.objects.filter(task=task).filter(
+        reduce(or_, [Q(stage=stage) & ~Q(employee_id=employee) for stage, employee in assigned.items()])
+    ).update(employee=Case(*[When(stage=stage, then=Value(employee)) for stage, employee in assigned.items()], output_field=IntegerField()))
@@ -0,0 +1,86 @@
+# This file defines how the manufacturing list items are grouped into ManufacturingTasks (backend.celery beat jobs).
+
+# generate_manufacturing_tasks: Creates one task per sku_color for the unassigned items of a queryset and assigns the items to it.
+# run_task_generation: Generates the tasks of the items of a due date window added since the last run of a job (or of all of them).
+
+# The work is set-based: one grouped aggregate of the unassigned items, one bulk insert of the tasks (and one of their
+# stage events) and one UPDATE assigning the items, in a transaction. Only the items without a task are considered,
+# so running it again is a no-op until new items arrive. The transaction reads one snapshot (REPEATABLE READ), so
+# an item committed by a list generation while the tasks are created is left unassigned for the next run instead
+# of being assigned to a task whose quantity does not count it.
+
+# A job remembers (TaskGenerationWatermark) the last item it read and its window of order due dates. A run reads the
+# items added since, re-reading the last WATERMARK_OVERLAP ids for the list generations that committed out of order,
+# and the items of the orders entering the window (it moves with the date). Orders whose due date is changed into
+# the window or that lose their due date are only picked up by a full run (full=True, or the
+# generate_manufacturing_tasks command with --full).
+
+from django.db import connection, transaction
+from django.db.models import Max, OuterRef, Q, Subquery, Sum
+from .models import ManufacturingListItem, ManufacturingTask, TaskGenerationWatermark
+from .stage_events import start_first_stage
+
+import logging
+
+logger = logging.getLogger('WarehousePilot_app')
+
+# ids below the watermark read again by every run
+WATERMARK_OVERLAP = 1000
+
+
+def generate_manufacturing_tasks(items, due_date, status="nesting"):
+    """
+    Create a ManufacturingTask due on `due_date` per sku_color of the unassigned manufacturing list items of `items`
+    (a ManufacturingListItem queryset), with the total amount of these items, and assign the items to it.
+    The event of the first stage of each task is started. Returns the tasks created. Call it in a transaction.
+    """
+    items = items.filter(manufacturing_task__isnull=True)
+    totals = items.values("sku_color").annotate(qty=Sum("amount")).order_by("sku_color")
+    tasks = ManufacturingTask.objects.bulk_create([
+        ManufacturingTask(sku_color_id=x["sku_color"], qty=x["qty"], due_date=due_date, status=status)
+        for x in totals
+    ])
+    if tasks:
+        start_first_stage(tasks)
+        created = ManufacturingTask.objects.filter(pk__in=[x.pk for x in tasks], sku_color=OuterRef("sku_color"))
+        assigned = items.update(manufacturing_task=Subquery(created.values("pk")[:1]))
+        logger.info("Created %s manufacturing tasks for %s manufacturing list items", len(tasks), assigned)
+    return tasks
+
+
+def _due_between(first, last):
+    # orders due from `first` (no lower bound when None) to `last`
+    window = Q(manufacturing_list_id__order_id__due_date__lte=last)
+    if first is not None:
+        window &= Q(manufacturing_list_id__order_id__due_date__gte=first)
+    return window
+
+
+def run_task_generation(name, first_due, last_due, due_date, full=False):
+    """
+    Generate the tasks (due on `due_date`) of the manufacturing list items of the orders due from `first_due`
+    (no lower bound when None) to `last_due`, or without due date, that the job `name` did not read yet.
+    With `full`, or on the first run of the job, every item of these orders is read. Returns the tasks created.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+        watermark, created = TaskGenerationWatermark.objects.select_for_update().get_or_create(
+            name=name, defaults={"first_due_date": first_due, "last_due_date": last_due}
+        )
+        window = Q(manufacturing_list_id__order_id__due_date=None) | _due_between(first_due, last_due)
+        items = ManufacturingListItem.objects.filter(window)
+        if not (full or created):
+            changed = Q(manufacturing_list_item_id__gt=watermark.last_item_id - WATERMARK_OVERLAP)
+            changed |= _due_between(first_due, last_due) & ~_due_between(watermark.first_due_date, watermark.last_due_date)
+            items = items.filter(changed)
+        tasks = generate_manufacturing_tasks(items, due_date)
+
+        watermark.last_item_id = ManufacturingListItem.objects.aggregate(x=Max("manufacturing_list_item_id"))["x"] or 0
+        watermark.first_due_date = first_due
+        watermark.last_due_date = last_due
+        watermark.save()
+    return tasks
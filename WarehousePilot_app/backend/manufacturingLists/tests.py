@@ -5,14 +5,33 @@ The tests cover:
 - Successful retrieval of manufacturing list items associated with a specific order.
 - Handling scenarios where the requested order does not exist.
 - Handling scenarios where no manufacturing list exists for the requested order.
+- Streaming mode of the manufacturing lists endpoint.
+- Retrieval of the manufacturing tasks of a department in one query.
+- Set-based, idempotent generation of the manufacturing tasks by the celery beat jobs.
+- Incremental runs of these jobs from their watermark, and full runs.
+- The stage events of the tasks (TaskStageEvent), the copy of the assignments to them and their backfill from the time columns of the tasks.
 """
 
+import importlib
+from datetime import date, timedelta
+from io import StringIO
+from dateutil.relativedelta import relativedelta
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Orders, ManufacturingLists, ManufacturingListItem, Part
+from .models import Orders, ManufacturingLists, ManufacturingListItem, ManufacturingTask, Part, TaskGenerationWatermark, TaskStageEvent
+from .stage_events import record_status_change, stage_of, start_first_stage, sync_assignments
+from .task_generation import run_task_generation
+from backend.celery import create_manuTasks, one_off_manu_task_generate
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
+import json
 
 
 class ManufacturingListItemsViewTest(APITestCase):
@@ -86,3 +105,283 @@ class ManufacturingListItemsViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['error'], "No manufacturing list found for the given order")
         print("test_get_manufacturing_list_items_no_manufacturing_list passed.")
+
+
+class ManufacturingListViewStreamTest(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="testuser",
+            password="testpassword",
+            email="testuser@example.com",
+            role="Manager",
+            date_of_hire="1990-01-01",
+            first_name="Test",
+            last_name="User",
+            department="Manufacturing"
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        for order_id in range(1, 4):
+            order = Orders.objects.create(order_id=order_id, status="In Progress", due_date="2025-01-30", estimated_duration=5)
+            ManufacturingLists.objects.create(order_id=order, status="In Progress")
+
+    def test_stream_matches_list(self):
+        url = reverse('manufacturing_list')
+        expected = self.client.get(url).json()
+
+        response = self.client.get(url, {'stream': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        key = lambda x: x['manufacturing_list_id']
+        self.assertEqual(sorted(json.loads(b''.join(response.streaming_content)), key=key), sorted(expected, key=key))
+        self.assertEqual(len(expected), 3)
+
+
+class ManufacturingTaskViewTest(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="testuser",
+            password="testpassword",
+            email="testuser@example.com",
+            role="Manager",
+            date_of_hire="1990-01-01",
+            first_name="Test",
+            last_name="User",
+            department="Manufacturing"
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_tasks(self, count):
+        part, _ = Part.objects.get_or_create(sku_color="SKU-RED")
+        ManufacturingTask.objects.bulk_create([
+            ManufacturingTask(sku_color=part, qty=1, due_date=date(2030, 1, 1), status="nesting", nesting_employee=self.user)
+            for _ in range(count)
+        ])
+
+    # the tasks of a department are read with their part and the employee of the department in one query
+    def test_department_tasks_in_one_query(self):
+        self.create_tasks(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('manufacturing_tasks'), {'department': 'nesting'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['sku_color'], "SKU-RED")
+        self.assertEqual(response.data[0]['nesting_employee'], "testuser")
+        self.assertEqual(len(queries), 1)
+
+
+def create_manufacturing_items(order, items):
+    # items: [(sku_color, amount)], the parts are created when missing
+    manufacturing_list = ManufacturingLists.objects.create(order_id=order, status="In Progress")
+    return [
+        ManufacturingListItem.objects.create(
+            manufacturing_list_id=manufacturing_list,
+            sku_color=Part.objects.get_or_create(sku_color=sku_color)[0],
+            amount=amount,
+        )
+        for sku_color, amount in items
+    ]
+
+
+class ManufacturingTaskGenerationTest(TestCase):
+
+    def setUp(self):
+        today = date.today()
+        # due in three months (create_manuTasks), without due date (both jobs) and overdue (one_off_manu_task_generate)
+        self.upcoming = Orders.objects.create(order_id=1, status="Pending", due_date=today + relativedelta(months=3))
+        self.undated = Orders.objects.create(order_id=2, status="Pending", due_date=None)
+        self.overdue = Orders.objects.create(order_id=3, status="Pending", due_date=today - relativedelta(days=1))
+        create_manufacturing_items(self.upcoming, [("RED", 2), ("BLUE", 5)])
+        create_manufacturing_items(self.undated, [("RED", 3)])
+        create_manufacturing_items(self.overdue, [("RED", 7), ("GREEN", 1)])
+
+    def test_create_manuTasks_groups_by_sku_color(self):
+        self.assertEqual(create_manuTasks(), 2)
+
+        tasks = {x.sku_color_id: x for x in ManufacturingTask.objects.all()}
+        self.assertEqual({sku: x.qty for sku, x in tasks.items()}, {"RED": 5, "BLUE": 5})
+        self.assertTrue(all(x.status == "nesting" and x.due_date == date.today() + relativedelta(months=1) for x in tasks.values()))
+        items = ManufacturingListItem.objects.filter(manufacturing_list_id__order_id__in=[1, 2])
+        self.assertTrue(all(x.manufacturing_task == tasks[x.sku_color_id] for x in items))
+        # the new tasks are in nesting
+        self.assertEqual(sorted(TaskStageEvent.objects.filter(ended_at=None).values_list("task_id", "stage")),
+                         sorted((x.pk, "nesting") for x in tasks.values()))
+        self.assertFalse(ManufacturingListItem.objects.filter(manufacturing_list_id__order_id=3, manufacturing_task__isnull=False).exists())
+
+    def test_create_manuTasks_is_idempotent(self):
+        create_manuTasks()
+        self.assertEqual(create_manuTasks(), 0)
+        self.assertEqual(ManufacturingTask.objects.count(), 2)
+
+        # only the new item gets a task
+        create_manufacturing_items(self.undated, [("RED", 4)])
+        self.assertEqual(create_manuTasks(), 1)
+        self.assertEqual(sorted(ManufacturingTask.objects.values_list("qty", flat=True)), [4, 5, 5])
+
+    def test_one_off_manu_task_generate(self):
+        create_manuTasks()
+        self.assertEqual(one_off_manu_task_generate(), 2)
+        self.assertEqual(
+            sorted(ManufacturingTask.objects.filter(manufacturinglistitem__manufacturing_list_id__order_id=3).values_list("sku_color", "qty").distinct()),
+            [("GREEN", 1), ("RED", 7)],
+        )
+        self.assertFalse(ManufacturingListItem.objects.filter(manufacturing_task__isnull=True).exists())
+
+    def test_query_count_does_not_depend_on_the_items(self):
+        for order_id in range(10, 30):
+            order = Orders.objects.create(order_id=order_id, status="Pending", due_date=None)
+            create_manufacturing_items(order, [(f"SKU-{order_id}", 1), ("RED", 1)])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(create_manuTasks(), 22)
+        # lock, savepoint, watermark (select, savepoint, insert, release), grouped aggregate, bulk inserts of the
+        # tasks and their stage events, update, last item, watermark update, release, unlock, run record
+        self.assertEqual(len(queries), 15)
+
+        create_manufacturing_items(self.undated, [("RED", 1)])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(create_manuTasks(), 1)
+        # lock, savepoint, watermark, grouped aggregate, bulk inserts, update, last item, watermark update, release,
+        # unlock, run record
+        self.assertEqual(len(queries), 12)
+
+
+@patch("manufacturingLists.task_generation.WATERMARK_OVERLAP", 0)
+class TaskGenerationWatermarkTest(TestCase):
+
+    def setUp(self):
+        self.today = date.today()
+        self.order = Orders.objects.create(order_id=1, status="Pending", due_date=self.today)
+        create_manufacturing_items(self.order, [("RED", 2)])
+
+    def run_job(self, last_due, full=False):
+        return len(run_task_generation("test_job", None, last_due, self.today, full=full))
+
+    def test_watermark_moves_to_the_last_item(self):
+        self.assertEqual(self.run_job(self.today), 1)
+
+        watermark = TaskGenerationWatermark.objects.get(name="test_job")
+        self.assertEqual(watermark.last_item_id, ManufacturingListItem.objects.get().pk)
+        self.assertEqual((watermark.first_due_date, watermark.last_due_date), (None, self.today))
+
+    def test_incremental_run_reads_the_new_items_only(self):
+        self.run_job(self.today)
+        # an item read before and unassigned since (its task was deleted) is not read again
+        ManufacturingTask.objects.all().delete()
+        self.assertEqual(self.run_job(self.today), 0)
+
+        create_manufacturing_items(self.order, [("BLUE", 1)])
+        self.assertEqual(self.run_job(self.today), 1)
+        self.assertEqual(ManufacturingTask.objects.get().sku_color_id, "BLUE")
+
+        # a full run reads everything again
+        self.assertEqual(self.run_job(self.today, full=True), 1)
+        self.assertFalse(ManufacturingListItem.objects.filter(manufacturing_task__isnull=True).exists())
+
+    def test_orders_entering_the_window_are_read(self):
+        later = Orders.objects.create(order_id=2, status="Pending", due_date=self.today + relativedelta(days=10))
+        create_manufacturing_items(later, [("GREEN", 4)])
+        self.assertEqual(self.run_job(self.today), 1)
+
+        # the order of the second item enters the window, its item is older than the watermark
+        self.assertEqual(self.run_job(self.today + relativedelta(days=10)), 1)
+        self.assertEqual(ManufacturingTask.objects.get(sku_color="GREEN").qty, 4)
+        self.assertEqual(self.run_job(self.today + relativedelta(days=10)), 0)
+
+    def test_command_runs_the_jobs(self):
+        call_command("generate_manufacturing_tasks", "--job", "one_off_manu_task_generate", stdout=StringIO())
+        self.assertEqual(ManufacturingTask.objects.get().qty, 2)
+        self.assertEqual(list(TaskGenerationWatermark.objects.values_list("name", flat=True)), ["one_off_manu_task_generate"])
+
+
+class TaskStageEventTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="welder", password="password", email="welder@example.com", role="staff",
+            date_of_hire="1990-01-01", first_name="Test", last_name="Welder", department="Welding",
+        )
+        self.part = Part.objects.create(sku_color="Red")
+        self.now = timezone.now()
+
+    def create_task(self, status, **fields):
+        return ManufacturingTask.objects.create(sku_color=self.part, qty=1, due_date=self.now.date(), status=status, **fields)
+
+    def test_stage_of(self):
+        self.assertEqual(stage_of("welding"), "welding")
+        self.assertEqual(stage_of(" In Progress "), "final_qa")
+        self.assertIsNone(stage_of("pick and pack"))
+        self.assertIsNone(stage_of("pending"))
+
+    def test_record_status_change(self):
+        task = self.create_task("welding", welding_employee=self.user)
+        record_status_change(task, "cutting", at=self.now - timedelta(hours=1))
+        task.status = "production_qa"
+        record_status_change(task, "welding", at=self.now)
+
+        events = list(TaskStageEvent.objects.order_by("id").values_list("stage", "employee_id", "started_at", "ended_at"))
+        self.assertEqual(events, [
+            # cutting started before the events were recorded
+            ("cutting", None, None, self.now - timedelta(hours=1)),
+            ("welding", self.user.user_id, self.now - timedelta(hours=1), self.now),
+            ("production_qa", None, self.now, None),
+        ])
+
+    def test_sync_assignments(self):
+        task = self.create_task("welding")
+        start_first_stage([task])
+        task.welding_employee = self.user
+        # the task is saved without sending post_save
+        ManufacturingTask.objects.filter(pk=task.pk).update(welding_employee=self.user)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(sync_assignments(task), 1)
+        self.assertEqual(TaskStageEvent.objects.get().employee, self.user)
+        # nothing left to change, and nothing to do without assignments
+        self.assertEqual(sync_assignments(task), 0)
+        unassigned = self.create_task("welding")
+        with self.assertNumQueries(0):
+            self.assertEqual(sync_assignments(unassigned), 0)
+
+    def test_backfill(self):
+        backfill = importlib.import_module("manufacturingLists.migrations.0012_backfill_task_stage_events")
+        hour = timedelta(hours=1)
+        task = self.create_task(
+            "cutting", nesting_end_time=self.now - 2 * hour, bending_start_time=self.now - 2 * hour,
+            bending_end_time=self.now - hour, bending_employee=self.user, cutting_employee=self.user,
+        )
+        done = self.create_task("pick and pack", nesting_end_time=self.now)
+        new = self.create_task("nesting")
+
+        events = lambda x: [(e.stage, e.employee_id, e.started_at, e.ended_at) for e in backfill.task_events(TaskStageEvent, x)]
+        self.assertEqual(events(task), [
+            ("nesting", None, None, self.now - 2 * hour),
+            ("bending", self.user.user_id, self.now - 2 * hour, self.now - hour),
+            ("cutting", self.user.user_id, self.now - hour, None),
+        ])
+        self.assertEqual(events(done), [("nesting", None, None, self.now)])
+        self.assertEqual(events(new), [("nesting", None, None, None)])
+
+
+class ManufacturingTaskGenerationTransactionTest(TransactionTestCase):
+
+    def test_generation_in_its_own_transaction(self):
+        # outside of a test transaction the generation runs in a REPEATABLE READ transaction
+        order = Orders.objects.create(order_id=1, status="Pending", due_date=None)
+        create_manufacturing_items(order, [("RED", 2), ("RED", 3)])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(create_manuTasks(), 1)
+
+        # BEGIN, then the isolation level
+        sql = [x["sql"] for x in queries.captured_queries]
+        self.assertIn("REPEATABLE READ", sql[sql.index("BEGIN") + 1])
+        self.assertEqual(ManufacturingTask.objects.get().qty, 5)
+        self.assertEqual(create_manuTasks(), 0)
+
@@ -1,6 +1,6 @@
 # This file defines views for managing manufacturing lists and their items.
 
-# ManufacturingListView: Retrieves all manufacturing lists along with their associated orders and statuses.
+# ManufacturingListView: Retrieves all manufacturing lists along with their associated orders and statuses (streamed with ?stream=true).
 # ManufacturingListItemsView: Retrieves all items in a manufacturing list for a given order ID, including details like SKU, quantity, process, and progress.
 
 
@@ -13,6 +13,7 @@ from manufacturingLists.models import ManufacturingLists
 from .models import ManufacturingListItem, Orders, ManufacturingTask
 # from auth_app.views import IsAdminUser
 # from manager_dashboard.views import IsManagerUser
+from backend.streaming import STREAM_CHUNK_SIZE, wants_stream, stream_json_array, streaming_json_response
 import logging
 
 logger = logging.getLogger('WarehousePilot_app')
@@ -23,6 +24,16 @@ class ManufacturingListView(APIView):
 
     def get(self, request):
         try:
+            if wants_stream(request):
+                # order_id_id is the order id itself, no join needed
+                rows = ManufacturingLists.objects.values_list("manufacturing_list_id", "order_id_id", "status").iterator(chunk_size=STREAM_CHUNK_SIZE)
+                logger.info("Streaming the manufacturing lists")
+                return streaming_json_response(request, stream_json_array(rows, lambda x: {
+                    "manufacturing_list_id": x[0],
+                    "order_id": x[1],
+                    "status": x[2],
+                }), "ManufacturingListView")
+
             # Fetch all manufacturing lists with related orders
             manufacturing_lists = ManufacturingLists.objects.select_related('order_id').all()
 
@@ -102,6 +113,16 @@ class ManufacturingListItemsView(APIView):
             )
 
 
+# department -> employee of the department on a ManufacturingTask
+DEPARTMENT_EMPLOYEES = {
+    "nesting": "nesting_employee",
+    "bending": "bending_employee",
+    "cutting": "cutting_employee",
+    "welding": "welding_employee",
+    "painting": "paint_employee",
+}
+
+
 class ManufacturingTaskView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -110,10 +131,12 @@ class ManufacturingTaskView(APIView):
         try:
             department = request.query_params.get('department', None)
 
+            # the part and the employee of the department are read with the tasks, in one query
+            manufacturing_tasks = ManufacturingTask.objects.select_related('sku_color')
             if department:
-                manufacturing_tasks = ManufacturingTask.objects.filter(status=department)
-            else:
-                manufacturing_tasks = ManufacturingTask.objects.all()
+                manufacturing_tasks = manufacturing_tasks.filter(status=department)
+                if department in DEPARTMENT_EMPLOYEES:
+                    manufacturing_tasks = manufacturing_tasks.select_related(DEPARTMENT_EMPLOYEES[department])
 
             response_data = []
             for task in manufacturing_tasks:
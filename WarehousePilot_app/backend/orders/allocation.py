@@ -0,0 +1,310 @@
+# This file defines the allocation engine used to turn order lines into inventory picklist items and manufacturing list items.
+
+# generate_lists_for_orders: Allocates inventory to one or more orders and writes their picklists and manufacturing lists.
+# load_order_demand: Loads the order parts of the given orders, aggregated per sku_color.
+# load_inventory_stock: Loads the inventory rows matching a set of sku_colors, grouped per sku_color.
+# allocate_sku: Reserves a quantity of one sku_color against its inventory rows, in memory.
+# reserve_inventory: Records reservations in the InventoryReservation ledger and adds them to Inventory.amount_needed atomically.
+# available_to_promise: Simulates the allocation of every open order against the current inventory, without writing anything.
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, When, Value, F, Q, Sum, IntegerField
+from django.db.models.functions import Greatest
+from .models import Orders, OrderPart
+from inventory.models import Inventory, InventoryPicklist, InventoryPicklistItem, InventoryReservation
+from inventory.counters import add_to_counters
+from manufacturingLists.models import ManufacturingLists, ManufacturingListItem
+
+import logging
+import pandas as pd
+
+logger = logging.getLogger('WarehousePilot_app')
+
+
+def load_order_demand(order_ids):
+    """
+    Load the order parts of the given orders in a single query.
+
+    Returns a dictionary {order_id: {sku_color: line}} where line holds the total quantity
+    ordered for that sku_color and the details (location, area, lineup, model, material)
+    of the first order part with that sku_color.
+    """
+    demand = defaultdict(dict)
+    order_parts = OrderPart.objects.filter(order_id__in=order_ids).order_by('order_part_id').values(
+        'order_id', 'sku_color', 'qty', 'location', 'area', 'lineup_nb', 'final_model', 'material_type'
+    )
+    for part in order_parts:
+        lines = demand[part['order_id']]
+        line = lines.get(part['sku_color'])
+        if line is None:
+            lines[part['sku_color']] = {**part, 'qty': part['qty'] or 0}
+        else:
+            line['qty'] += part['qty'] or 0
+    return demand
+
+
+def load_inventory_stock(sku_colors, lock=False):
+    """
+    Load every inventory row of the given sku_colors in a single query.
+
+    With lock=True the rows are locked (SELECT ... FOR UPDATE) until the end of the current
+    transaction. They are always locked in inventory_id order so that two generations touching
+    the same locations wait for each other instead of deadlocking.
+
+    Returns a dictionary {sku_color: [Inventory, ...]} with the rows of each sku_color ordered
+    by ascending quantity, which is the order in which locations are emptied.
+    """
+    rows = Inventory.objects.filter(sku_color__in=sku_colors).order_by('inventory_id')
+    if lock:
+        rows = rows.select_for_update()
+
+    stock = defaultdict(list)
+    for row in sorted(rows, key=lambda row: (row.qty, row.inventory_id)):
+        stock[row.sku_color_id].append(row)
+    return stock
+
+
+def allocate_sku(rows, quantity, preferred_location=None):
+    """
+    Reserve up to `quantity` units against the given inventory rows.
+
+    The row whose location matches `preferred_location` is used first, then the remaining rows
+    in the order they were given. Only the free amount of a row (qty - amount_needed) can be
+    reserved, and the reservation is recorded by increasing amount_needed on the row object.
+
+    Returns a tuple (allocations, remainder) where allocations is a list of (row, amount) and
+    remainder is the quantity that could not be served from inventory.
+    """
+    if preferred_location:
+        rows = sorted(rows, key=lambda row: row.location != preferred_location)
+
+    allocations = []
+    remainder = quantity
+    for row in rows:
+        if remainder <= 0:
+            break
+        available = row.qty - row.amount_needed
+        if available <= 0:
+            continue
+        amount = min(remainder, available)
+        row.amount_needed += amount
+        allocations.append((row, amount))
+        remainder -= amount
+    return allocations, remainder
+
+
+def reserve_inventory(picklist_items):
+    """
+    Record the reservations of the given (saved) picklist items in the ledger and add them to
+    Inventory.amount_needed with a single UPDATE ... SET amount_needed = amount_needed + ...,
+    so the increment never overwrites a concurrent change to the row.
+    """
+    reservations = []
+    totals = defaultdict(int)
+    for item in picklist_items:
+        reservations.append(InventoryReservation(
+            inventory_id=item.location_id,
+            order_id_id=item.picklist_id.order_id_id,
+            picklist_item=item,
+            amount=item.amount
+        ))
+        totals[item.location_id] += item.amount
+    if not totals:
+        return
+
+    InventoryReservation.objects.bulk_create(reservations)
+    Inventory.objects.filter(inventory_id__in=totals.keys()).update(amount_needed=F('amount_needed') + Case(
+        *[When(inventory_id=inventory_id, then=Value(amount)) for inventory_id, amount in totals.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    ))
+
+
+def _existing_generated_orders(order_ids):
+    # Orders whose picklist or manufacturing list already has items are not allocated a second time
+    picked = InventoryPicklistItem.objects.filter(picklist_id__order_id__in=order_ids).values_list('picklist_id__order_id', flat=True)
+    manufactured = ManufacturingListItem.objects.filter(manufacturing_list_id__order_id__in=order_ids).values_list('manufacturing_list_id__order_id', flat=True)
+    return set(picked) | set(manufactured)
+
+
+def generate_lists_for_orders(orders):
+    """
+    Generate the inventory picklist and the manufacturing list of each order.
+
+    Orders are served in the order they are given, so earlier orders get priority on shared
+    inventory. The whole allocation runs with a constant number of queries regardless of the
+    number of orders, order lines or inventory rows, and all writes happen in one transaction.
+    The inventory rows involved stay locked until that transaction commits, so concurrent
+    generations are serialized on the locations they share and can never over-allocate a bin.
+
+    Args:
+        orders: list of Orders objects, in priority order
+
+    Returns a list with one summary dictionary per order:
+        {"order_id", "skipped", "picklist_items", "manufacturing_list_items"}
+    """
+    order_ids = [order.order_id for order in orders]
+
+    with transaction.atomic():
+        # Lock the orders first so the same order cannot be generated twice by concurrent requests
+        list(Orders.objects.select_for_update().filter(order_id__in=order_ids).order_by('order_id').values_list('order_id', flat=True))
+        already_generated = _existing_generated_orders(order_ids)
+        demand = load_order_demand(order_ids)
+        sku_colors = {sku for lines in demand.values() for sku in lines}
+        stock = load_inventory_stock(sku_colors, lock=True)
+
+        picklists = {p.order_id_id: p for p in InventoryPicklist.objects.filter(order_id__in=order_ids)}
+        manufacturing_lists = {}
+        for m_list in ManufacturingLists.objects.filter(order_id__in=order_ids).order_by('manufacturing_list_id'):
+            manufacturing_lists.setdefault(m_list.order_id_id, m_list)
+
+        picklist_items = defaultdict(list)
+        manufacturing_items = defaultdict(list)
+        summaries = []
+
+        # Allocate in memory, order by order
+        for order in orders:
+            if order.order_id in already_generated:
+                summaries.append({"order_id": order.order_id, "skipped": True, "picklist_items": 0, "manufacturing_list_items": 0})
+                continue
+
+            for sku, line in demand.get(order.order_id, {}).items():
+                quantity = int(round(line['qty']))
+                allocations, remainder = allocate_sku(stock.get(sku, []), quantity, line['location'])
+                for row, amount in allocations:
+                    picklist_items[order.order_id].append(InventoryPicklistItem(
+                        sku_color_id=sku,
+                        amount=amount,
+                        status=False,
+                        location=row,
+                        area=line['area'],
+                        lineup_nb=line['lineup_nb'],
+                        model_nb=line['final_model'],
+                        material_type=line['material_type']
+                    ))
+                if remainder > 0:
+                    manufacturing_items[order.order_id].append(ManufacturingListItem(sku_color_id=sku, amount=remainder))
+
+            summaries.append({
+                "order_id": order.order_id,
+                "skipped": False,
+                "picklist_items": len(picklist_items[order.order_id]),
+                "manufacturing_list_items": len(manufacturing_items[order.order_id]),
+            })
+
+        generated = [order for order in orders if order.order_id not in already_generated]
+
+        # Every started order gets a picklist, even when nothing could be served from inventory
+        new_picklists = [InventoryPicklist(order_id=order, status=False) for order in generated if order.order_id not in picklists]
+        for picklist in InventoryPicklist.objects.bulk_create(new_picklists):
+            picklists[picklist.order_id_id] = picklist
+
+        # A manufacturing list is only created when something has to be manufactured
+        new_manufacturing_lists = [
+            ManufacturingLists(order_id=order, status='Pending')
+            for order in generated
+            if manufacturing_items[order.order_id] and order.order_id not in manufacturing_lists
+        ]
+        for m_list in ManufacturingLists.objects.bulk_create(new_manufacturing_lists):
+            manufacturing_lists[m_list.order_id_id] = m_list
+
+        for order_id, items in picklist_items.items():
+            for item in items:
+                item.picklist_id = picklists[order_id]
+        for order_id, items in manufacturing_items.items():
+            for item in items:
+                item.manufacturing_list_id = manufacturing_lists[order_id]
+
+        created_items = InventoryPicklistItem.objects.bulk_create([item for items in picklist_items.values() for item in items])
+        add_to_counters({"total": len(created_items)})
+        ManufacturingListItem.objects.bulk_create([item for items in manufacturing_items.values() for item in items])
+        reserve_inventory(created_items)
+
+    logger.debug("Generated lists for orders %s", ', '.join([str(x) for x in order_ids]))
+    return summaries
+
+
+# order statuses considered open by available_to_promise
+OPEN_ORDER_STATUSES = ["Not Started", "In Progress"]
+
+
+def available_to_promise():
+    """
+    Compute, for every open (not started or in progress) order, how much can be filled from
+    the current inventory and which sku_colors would have to be manufactured.
+
+    Nothing is written and nothing is locked. The data is loaded with one grouped query per
+    table and the allocation is done with grouped cumulative sums:
+
+    - orders whose lists were already generated keep what their picklist reserved,
+    - the other orders share the free inventory (qty - amount_needed) by priority, earliest
+      due date first and orders without a due date last, as generate_lists_for_orders would.
+
+    Returns a list with one dictionary per order, in priority order:
+        {"order_id", "status", "due_date", "generated", "ordered_qty", "fillable_qty", "fill_rate", "manufacturing_skus"}
+    """
+    open_orders = Orders.objects.filter(Q(status__in=OPEN_ORDER_STATUSES) | Q(status=None))
+    orders = pd.DataFrame.from_records(
+        open_orders.values('order_id', 'status', 'due_date'),
+        columns=['order_id', 'status', 'due_date']
+    )
+    if orders.empty:
+        return []
+
+    demand = pd.DataFrame.from_records(
+        OrderPart.objects.filter(order_id__in=open_orders).values('order_id', 'sku_color').annotate(qty=Sum('qty')),
+        columns=['order_id', 'sku_color', 'qty']
+    )
+    free = pd.DataFrame.from_records(
+        Inventory.objects.values('sku_color').annotate(free=Sum(Greatest(F('qty') - F('amount_needed'), Value(0)))),
+        columns=['sku_color', 'free']
+    )
+    reserved = pd.DataFrame.from_records(
+        InventoryPicklistItem.objects.filter(picklist_id__order_id__in=open_orders)
+        .values('picklist_id__order_id', 'sku_color').annotate(reserved=Sum('amount')),
+        columns=['picklist_id__order_id', 'sku_color', 'reserved']
+    ).rename(columns={'picklist_id__order_id': 'order_id'})
+    manufactured = ManufacturingListItem.objects.filter(manufacturing_list_id__order_id__in=open_orders).values_list('manufacturing_list_id__order_id', flat=True)
+    generated = set(reserved['order_id']) | set(manufactured)
+
+    # Priority: earliest due date first, orders without a due date last, then order_id
+    orders['generated'] = orders['order_id'].isin(generated)
+    orders['has_due_date'] = orders['due_date'].notna()
+    orders = orders.sort_values(['has_due_date', 'due_date', 'order_id'], ascending=[False, True, True], na_position='last').reset_index(drop=True)
+    orders['priority'] = orders.index
+
+    demand['qty'] = demand['qty'].astype(float).round().astype(int)
+    demand = demand.merge(orders[['order_id', 'priority', 'generated']], on='order_id')
+    demand = demand.merge(free, on='sku_color', how='left').merge(reserved, on=['order_id', 'sku_color'], how='left')
+    demand[['free', 'reserved']] = demand[['free', 'reserved']].fillna(0).astype(int)
+
+    # Orders not generated yet share the free stock of each sku_color in priority order
+    pending = demand.loc[~demand['generated']].sort_values('priority')
+    served_before = pending.groupby('sku_color')['qty'].cumsum() - pending['qty']
+    demand['fillable'] = demand['reserved'].clip(upper=demand['qty'])
+    demand.loc[pending.index, 'fillable'] = (pending['free'] - served_before).clip(lower=0).clip(upper=pending['qty'])
+    demand['to_manufacture'] = demand['qty'] - demand['fillable']
+
+    totals = demand.groupby('order_id')[['qty', 'fillable']].sum()
+    shortages = demand.loc[demand['to_manufacture'] > 0].sort_values('sku_color').groupby('order_id')
+    manufacturing_skus = {
+        order_id: [{"sku_color": sku, "qty": int(qty)} for sku, qty in zip(group['sku_color'], group['to_manufacture'])]
+        for order_id, group in shortages
+    }
+
+    result = []
+    for order in orders.itertuples():
+        ordered_qty = int(totals['qty'].get(order.order_id, 0))
+        fillable_qty = int(totals['fillable'].get(order.order_id, 0))
+        result.append({
+            "order_id": int(order.order_id),
+            "status": order.status,
+            "due_date": order.due_date if order.has_due_date else None,
+            "generated": bool(order.generated),
+            "ordered_qty": ordered_qty,
+            "fillable_qty": fillable_qty,
+            "fill_rate": round(fillable_qty / ordered_qty, 4) if ordered_qty else 1.0,
+            "manufacturing_skus": manufacturing_skus.get(order.order_id, []),
+        })
+    return result
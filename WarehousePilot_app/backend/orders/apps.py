@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        # connect the receivers maintaining OrderMilestones, and the tracking of the table versions on every connection
+        from django.db.backends.signals import connection_created
+        from . import signals
+        from .versioning import install_table_write_tracking
+        connection_created.connect(install_table_write_tracking)
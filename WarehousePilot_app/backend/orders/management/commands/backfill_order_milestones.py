@@ -0,0 +1,17 @@
+# Rebuilds the OrderMilestones table from the orders and their picklists.
+# Usage: python manage.py backfill_order_milestones [--batch-size 1000] [--order-id 1 --order-id 2]
+
+from django.core.management.base import BaseCommand
+from orders.milestones import backfill_order_milestones
+
+
+class Command(BaseCommand):
+    help = "Recomputes the picked/packed/shipped milestones of every order (or of the given orders)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="number of orders recomputed per batch")
+        parser.add_argument("--order-id", type=int, action="append", dest="order_ids", help="only recompute this order (repeatable)")
+
+    def handle(self, *args, batch_size, order_ids, **options):
+        written = backfill_order_milestones(batch_size, order_ids)
+        self.stdout.write(self.style.SUCCESS(f"Backfilled the milestones of {written} orders"))
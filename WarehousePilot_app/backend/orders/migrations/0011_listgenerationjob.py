@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-17 18:53
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_merge_20250323_2325'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListGenerationJob',
+            fields=[
+                ('job_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('order_ids', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('completed', 'completed'), ('failed', 'failed')], default='queued', max_length=25)),
+                ('total_orders', models.IntegerField(default=0)),
+                ('processed_orders', models.IntegerField(default=0)),
+                ('picklist_items', models.IntegerField(default=0)),
+                ('manufacturing_list_items', models.IntegerField(default=0)),
+                ('results', models.JSONField(default=list)),
+                ('errors', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, default=None, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, default=None, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-17 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_listgenerationjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orders',
+            index=models.Index(fields=['due_date', 'order_id'], name='orders_orde_due_dat_eaf097_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orders',
+            index=models.Index(fields=['status', 'due_date', 'order_id'], name='orders_orde_status_3f8d7b_idx'),
+        ),
+    ]
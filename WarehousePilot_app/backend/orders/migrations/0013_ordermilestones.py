@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-17 19:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_orders_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderMilestones',
+            fields=[
+                ('order_id', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='milestones', serialize=False, to='orders.orders')),
+                ('start_timestamp', models.DateTimeField(null=True)),
+                ('picked_at', models.DateTimeField(null=True)),
+                ('packed_at', models.DateTimeField(null=True)),
+                ('shipped_at', models.DateField(null=True)),
+                ('pick_time', models.IntegerField(null=True)),
+                ('pack_time', models.IntegerField(null=True)),
+                ('ship_time', models.IntegerField(null=True)),
+                ('cycle_time', models.IntegerField(null=True)),
+                ('status', models.CharField(max_length=25, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['picked_at'], name='orders_orde_picked__f3f977_idx')],
+            },
+        ),
+    ]
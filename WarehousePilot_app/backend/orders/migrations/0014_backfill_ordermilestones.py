@@ -0,0 +1,23 @@
+# Builds the OrderMilestones rows of the existing orders, so that the cycle time dashboards are not empty after
+# the upgrade. The backfill_order_milestones command rebuilds them later the same way.
+
+from django.db import migrations
+from orders.milestones import backfill_order_milestones
+
+BATCH_SIZE = 1000
+
+
+def backfill(apps, schema_editor):
+    backfill_order_milestones(BATCH_SIZE, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_ordermilestones'),
+        ('inventory', '0019_pick_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
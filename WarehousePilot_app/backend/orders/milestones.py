@@ -0,0 +1,149 @@
+# This file defines how the OrderMilestones rows are computed from the orders and their picklists.
+
+# compute_milestones: Computes the milestones and durations of an order from its timestamps.
+# refresh_order_milestones: Recomputes and upserts the OrderMilestones rows of a set of orders in a constant number of queries.
+# backfill_order_milestones: Recomputes the OrderMilestones rows of every order (or of some orders) in batches.
+# daily_milestone_counts: Projects posted cycle times onto calendar days and counts the picked/packed/shipped events per day.
+
+import pandas as pd
+from django.db.models import Count, Max, Q
+from inventory.models import InventoryPicklist
+from .models import Orders, OrderMilestones
+
+MILESTONE_FIELDS = [
+    "start_timestamp", "picked_at", "packed_at", "shipped_at",
+    "pick_time", "pack_time", "ship_time", "cycle_time", "status", "updated_at",
+]
+
+
+def compute_milestones(order, picklist, model=OrderMilestones):
+    """
+    Return the OrderMilestones of an order.
+
+    Args:
+        order: dict with order_id, start_timestamp, end_timestamp and ship_date
+        picklist: dict with picklist_complete_timestamp, items, unpicked_items and last_picked_at, None if the order has no picklist
+        model: the OrderMilestones model (the historical one in a migration)
+
+    The picklist is fully picked when it has a completion timestamp, or when all of its items have been picked
+    (the completion is then the last picking time). The durations are in days, as shown on the dashboard.
+    """
+    milestones = model(
+        order_id_id=order["order_id"],
+        start_timestamp=order["start_timestamp"],
+        packed_at=order["end_timestamp"],
+        shipped_at=order["ship_date"],
+    )
+    if picklist is not None:
+        if picklist["picklist_complete_timestamp"] is not None:
+            milestones.picked_at = picklist["picklist_complete_timestamp"]
+        elif picklist["items"] and not picklist["unpicked_items"]:
+            milestones.picked_at = picklist["last_picked_at"]
+
+    if milestones.picked_at is None or milestones.start_timestamp is None:
+        return milestones
+
+    picked = milestones.picked_at.date()
+    milestones.pick_time = abs((picked - milestones.start_timestamp.date()).days)
+    milestones.pack_time = 0
+    milestones.ship_time = 0
+    milestones.status = "Picked"
+    if milestones.packed_at is not None:
+        milestones.pack_time = abs((milestones.packed_at.date() - picked).days)
+        milestones.status = "Packed"
+        if milestones.shipped_at is not None:
+            milestones.ship_time = abs((milestones.shipped_at - milestones.packed_at.date()).days)
+            milestones.status = "Shipped"
+    milestones.cycle_time = milestones.pick_time + milestones.pack_time + milestones.ship_time
+    return milestones
+
+
+def refresh_order_milestones(order_ids, apps=None):
+    """
+    Recompute the milestones of the given orders and upsert them, in three queries whatever the number of orders.
+    Returns the number of rows written. A migration passes its `apps` to use the historical models.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+
+    orders_model, picklist_model, milestones_model = (Orders, InventoryPicklist, OrderMilestones) if apps is None else (
+        apps.get_model("orders", "Orders"), apps.get_model("inventory", "InventoryPicklist"), apps.get_model("orders", "OrderMilestones")
+    )
+
+    orders = orders_model.objects.filter(order_id__in=order_ids).values("order_id", "start_timestamp", "end_timestamp", "ship_date")
+    picklists = {
+        x["order_id"]: x for x in picklist_model.objects.filter(order_id__in=order_ids).values(
+            "order_id", "picklist_complete_timestamp"
+        ).annotate(
+            items=Count("inventorypicklistitem"),
+            unpicked_items=Count("inventorypicklistitem", filter=Q(inventorypicklistitem__picked_at__isnull=True)),
+            last_picked_at=Max("inventorypicklistitem__picked_at"),
+        )
+    }
+
+    milestones = [compute_milestones(order, picklists.get(order["order_id"]), milestones_model) for order in orders]
+    milestones_model.objects.bulk_create(
+        milestones, update_conflicts=True, unique_fields=["order_id"], update_fields=MILESTONE_FIELDS
+    )
+    return len(milestones)
+
+
+def backfill_order_milestones(batch_size=1000, order_ids=None, apps=None):
+    """
+    Recompute the milestones of `order_ids` (every order by default) `batch_size` orders at a time, used by the
+    backfill_order_milestones command and migration 0016. Returns the number of rows written.
+    """
+    if order_ids is None:
+        orders_model = Orders if apps is None else apps.get_model("orders", "Orders")
+        order_ids = orders_model.objects.order_by("order_id").values_list("order_id", flat=True).iterator(chunk_size=batch_size)
+
+    written, batch = 0, []
+    for order_id in order_ids:
+        batch.append(order_id)
+        if len(batch) >= batch_size:
+            written += refresh_order_milestones(batch, apps)
+            batch = []
+    return written + refresh_order_milestones(batch, apps)
+
+
+def daily_milestone_counts(cycle_times, window_start, window_end):
+    """
+    Count, for each day of [window_start, window_end], the orders picked, packed and shipped on that day.
+
+    Args:
+        cycle_times: list of dicts with order_id, pick_time, pack_time, ship_time (days) and status, as returned by CycleTimePerOrderView
+        window_start, window_end: first and last day (dates) of the histogram
+
+    The start dates of the orders are loaded with one in_bulk query and the milestone dates are computed on whole
+    columns: picked = start + pick_time, packed = picked + pack_time (Packed or Shipped), shipped = packed + ship_time (Shipped).
+    Entries of unknown or not started orders are ignored.
+    """
+    days = pd.date_range(window_start, window_end, freq="D")
+    frame = pd.DataFrame.from_records(cycle_times, columns=["order_id", "pick_time", "pack_time", "ship_time", "status"])
+    frame["order_id"] = pd.to_numeric(frame["order_id"], errors="coerce")
+    frame = frame.dropna(subset=["order_id"]).astype({"order_id": "int64"})
+
+    orders = Orders.objects.only("order_id", "start_timestamp").in_bulk(frame["order_id"].unique().tolist())
+    starts = pd.DataFrame(
+        [(order_id, order.start_timestamp) for order_id, order in orders.items() if order.start_timestamp is not None],
+        columns=["order_id", "start"],
+    ).astype({"order_id": "int64"})
+    starts["start"] = pd.to_datetime(starts["start"], utc=True).dt.tz_localize(None).dt.normalize()
+    frame = frame.merge(starts, on="order_id")
+
+    def offset(column):
+        return pd.to_timedelta(pd.to_numeric(frame[column], errors="coerce").fillna(0), unit="D")
+
+    picked = frame["start"] + offset("pick_time")
+    packed = (picked + offset("pack_time")).where(frame["status"].isin(["Packed", "Shipped"]))
+    shipped = (packed + offset("ship_time")).where(frame["status"] == "Shipped")
+
+    counts = pd.DataFrame({
+        name: dates.value_counts().reindex(days, fill_value=0)
+        for name, dates in [("picked", picked), ("packed", packed), ("shipped", shipped)]
+    })
+    return [
+        {"day": day, "picked": int(row[0]), "packed": int(row[1]), "shipped": int(row[2])}
+        for day, row in zip(days.date, counts[["picked", "packed", "shipped"]].to_numpy())
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+import uuid
 from parts.models import Part
 
 # Create your models here.
@@ -14,6 +15,13 @@ class Orders(models.Model):
     manager_name = models.CharField(max_length = 255, null = True) 
     project_type = models.CharField(max_length = 255, null = True) # WW/WR (wetracks/wetwall), SDR, Pick&Pack 
 
+    class Meta:
+        # keyset pagination of the orders list (OrdersView) seeks on (due_date, order_id)
+        indexes = [
+            models.Index(fields=["due_date", "order_id"]),
+            models.Index(fields=["status", "due_date", "order_id"]),
+        ]
+
 
 class OrderPart(models.Model):
     order_part_id = models.AutoField(primary_key = True)
@@ -30,3 +38,53 @@ class OrderPart(models.Model):
     lineup_nb = models.CharField(max_length = 255, null = True)
     lineup_name = models.CharField(max_length = 255, null = True)
     packed_timestamp = models.DateTimeField(null=True, blank=True, default=None)
+
+
+class ListGenerationJob(models.Model):
+    '''
+    Tracks a list generation that runs in the background on celery.
+    The job is created by the generateLists views when they are called with "async": true
+    and is updated by orders.tasks.generate_lists_task as the orders are processed.
+    '''
+    JOB_STATUSES={
+        "queued" : "queued",
+        "running" : "running",
+        "completed" : "completed",
+        "failed" : "failed"
+    }
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order_ids = models.JSONField(default=list) # orders to process, in priority order
+    status = models.CharField(max_length=25, choices=JOB_STATUSES, default="queued")
+    total_orders = models.IntegerField(default=0)
+    processed_orders = models.IntegerField(default=0)
+    picklist_items = models.IntegerField(default=0) # number of inventory picklist items created
+    manufacturing_list_items = models.IntegerField(default=0) # number of manufacturing list items created
+    results = models.JSONField(default=list) # one summary per processed order
+    errors = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, default=None)
+    finished_at = models.DateTimeField(null=True, blank=True, default=None)
+
+
+class OrderMilestones(models.Model):
+    '''
+    Materialized picked/packed/shipped milestones of an order and the durations between them (in days).
+    The rows are kept up to date by orders.signals (picklists, picklist items and orders) and can be rebuilt
+    with the backfill_order_milestones management command. CycleTimePerOrderView reads this table only.
+    '''
+    order_id = models.OneToOneField(Orders, primary_key=True, on_delete=models.CASCADE, related_name="milestones")
+    start_timestamp = models.DateTimeField(null=True)
+    picked_at = models.DateTimeField(null=True) # when the picklist has been fully picked, null while items are left to pick
+    packed_at = models.DateTimeField(null=True) # Orders.end_timestamp
+    shipped_at = models.DateField(null=True) # Orders.ship_date
+    pick_time = models.IntegerField(null=True)
+    pack_time = models.IntegerField(null=True)
+    ship_time = models.IntegerField(null=True)
+    cycle_time = models.IntegerField(null=True)
+    status = models.CharField(max_length=25, null=True) # Picked, Packed or Shipped
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["picked_at"]),
+        ]
@@ -0,0 +1,163 @@
+# This file defines the keyset (cursor) pagination shared by the list endpoints.
+
+# RowAfter: Condition selecting the rows after a cursor with a row value comparison on the sort fields.
+# keyset_order: Orders a queryset by the keyset fields (nulls last ascending, first descending).
+# keyset_paginate: Returns one page of a queryset ordered by a set of fields, starting after an opaque cursor.
+# akeyset_paginate: The same for the async views.
+# encode_cursor / decode_cursor: Convert the sort values of the last row of a page to and from the opaque cursor string.
+
+# Unlike OFFSET pagination, the database seeks directly to the cursor: the rows after it are selected with a single
+# row value comparison, (due_date, order_id) > (%s, %s), which an index on the sort fields answers with one range
+# scan, so fetching page 1000 costs the same as fetching page 1. Rows whose first sort field is NULL (orders without
+# a due date) cannot be compared that way: they are read as a separate segment, sorted last ascending and first
+# descending, with a second query only when a page after a cursor reaches them.
+
+import base64
+import json
+from datetime import date, datetime
+from django.db.models import BooleanField, Expression, F
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    values = [x.isoformat() if isinstance(x, (date, datetime)) else x for x in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, nb_fields):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(values, list) or len(values) != nb_fields:
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def parse_page_size(value):
+    """
+    Parse the `limit` query parameter, falling back to DEFAULT_PAGE_SIZE and capping it at MAX_PAGE_SIZE.
+    """
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+class RowAfter(Expression):
+    """
+    Condition (field1, field2, ...) > (value1, value2, ...) (< when descending), compared as one row value.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, fields, values, descending=False):
+        super().__init__()
+        self.fields = [F(field) for field in fields]
+        self.values = values
+        self.descending = descending
+
+    def get_source_expressions(self):
+        return self.fields
+
+    def set_source_expressions(self, exprs):
+        self.fields = exprs
+
+    def as_sql(self, compiler, connection):
+        columns, params = [], []
+        for field in self.fields:
+            sql, field_params = compiler.compile(field)
+            columns.append(sql)
+            params.extend(field_params)
+        # the cursor values are converted like the values of a lookup on the field (e.g. ISO dates)
+        params += [field.output_field.get_db_prep_value(value, connection) for field, value in zip(self.fields, self.values)]
+        operator = "<" if self.descending else ">"
+        return f"({', '.join(columns)}) {operator} ({', '.join(['%s'] * len(self.values))})", params
+
+
+def _nullable(queryset, field):
+    return queryset.query.resolve_ref(field).output_field.null
+
+
+def _segments(queryset, fields, cursor, descending):
+    # The querysets of the rows after the cursor, in page order: the rows whose first field is not NULL,
+    # then those where it is NULL (the other way round when descending). Only the first field may be NULL,
+    # and the last one must be unique and not null (usually the primary key).
+    # Without a cursor the whole sort is one query: an index sorts NULLs last ascending (first descending) anyway.
+    queryset = keyset_order(queryset, fields, descending)
+    if not cursor:
+        return [queryset]
+    values = decode_cursor(cursor, len(fields))
+    if len(fields) == 1 or not _nullable(queryset, fields[0]):
+        return [queryset.filter(RowAfter(fields, values, descending))]
+
+    not_null = queryset.filter(**{f"{fields[0]}__isnull": False})
+    null = queryset.filter(**{f"{fields[0]}__isnull": True})
+    if values[0] is None:
+        # the cursor is in the NULL segment
+        null = null.filter(RowAfter(fields[1:], values[1:], descending))
+        return [null, not_null] if descending else [null]
+    not_null = not_null.filter(RowAfter(fields, values, descending))
+    return [not_null] if descending else [not_null, null]
+
+
+def keyset_order(queryset, fields, descending=False):
+    if descending:
+        return queryset.order_by(*[F(field).desc(nulls_first=True) for field in fields])
+    return queryset.order_by(*[F(field).asc(nulls_last=True) for field in fields])
+
+
+def _rest_of_page(segment, rows, limit):
+    # the rows of the segment still needed after `rows`: one more row than the page tells whether there is a next page
+    return segment if limit is None else segment[:limit + 1 - len(rows)]
+
+
+def _split_page(rows, fields, limit):
+    if limit is None or len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    values = [last[field] if isinstance(last, dict) else getattr(last, field) for field in fields]
+    return rows, encode_cursor(values)
+
+
+def keyset_paginate(queryset, fields, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """
+    Return one page of `queryset` ordered by `fields`.
+
+    Args:
+        queryset: queryset (or values() queryset) to paginate
+        fields: names of the sort fields, the last one must be unique and not null
+        cursor: cursor returned with the previous page, None for the first page
+        limit: number of rows per page, None to return every row after the cursor
+        descending: sort all the fields in descending order
+
+    Returns a tuple (rows, next_cursor) where next_cursor is None on the last page.
+    Raises InvalidCursor if the cursor cannot be decoded.
+    """
+    rows = []
+    for segment in _segments(queryset, fields, cursor, descending):
+        if limit is not None and len(rows) > limit:
+            break
+        rows += list(_rest_of_page(segment, rows, limit))
+    return _split_page(rows, fields, limit)
+
+
+async def akeyset_paginate(queryset, fields, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """
+    keyset_paginate() for the async views, the page is read with the async ORM.
+    """
+    rows = []
+    for segment in _segments(queryset, fields, cursor, descending):
+        if limit is not None and len(rows) > limit:
+            break
+        rows += [row async for row in _rest_of_page(segment, rows, limit).aiterator()]
+    return _split_page(rows, fields, limit)
@@ -0,0 +1,54 @@
+# This file defines the signal receivers keeping the OrderMilestones table up to date.
+
+# order_saved: Refreshes the milestones of an order when its start, end (packed) or ship date is saved.
+# picklist_saved: Refreshes the milestones of an order when its picklist is saved (completion timestamp) or deleted.
+# picklist_item_changed: Refreshes the milestones of an order when one of its picklist items is picked, saved or deleted.
+# order_completed: Publishes the order_completed live event (backend.live_events) when an order is saved as Completed.
+
+# Bulk operations (queryset update(), bulk_create) do not send these signals, run the
+# backfill_order_milestones management command after changing picking data in bulk.
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from inventory.models import InventoryPicklist, InventoryPicklistItem
+from .models import Orders
+from .milestones import refresh_order_milestones
+from backend.live_events import publish_event
+
+# fields of Orders the milestones depend on
+MILESTONE_ORDER_FIELDS = {"start_timestamp", "end_timestamp", "ship_date"}
+
+
+@receiver(post_save, sender=Orders)
+def order_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not MILESTONE_ORDER_FIELDS & set(update_fields)):
+        return
+    refresh_order_milestones([instance.order_id])
+
+
+@receiver(post_save, sender=InventoryPicklist)
+@receiver(post_delete, sender=InventoryPicklist)
+def picklist_saved(sender, instance, raw=False, origin=None, **kwargs):
+    # skip the picklists deleted in cascade of their order
+    if raw or (origin is not None and getattr(origin, "model", type(origin)) is Orders):
+        return
+    refresh_order_milestones([instance.order_id_id])
+
+
+@receiver(post_save, sender=InventoryPicklistItem)
+@receiver(post_delete, sender=InventoryPicklistItem)
+def picklist_item_changed(sender, instance, raw=False, origin=None, **kwargs):
+    # skip the items deleted in cascade of their picklist or order, the milestones are deleted with the order
+    if raw or (origin is not None and getattr(origin, "model", type(origin)) is not InventoryPicklistItem):
+        return
+    order_id = InventoryPicklist.objects.filter(picklist_id=instance.picklist_id_id).values_list("order_id", flat=True).first()
+    if order_id is not None:
+        refresh_order_milestones([order_id])
+
+
+@receiver(post_save, sender=Orders)
+def order_completed(sender, instance, update_fields=None, raw=False, **kwargs):
+    # no view completes the orders, their status is set by the imports and the admin
+    if raw or instance.status != "Completed" or (update_fields is not None and "status" not in update_fields):
+        return
+    publish_event("order_completed", order_id=instance.order_id)
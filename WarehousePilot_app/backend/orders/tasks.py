@@ -0,0 +1,69 @@
+# This file defines the celery tasks of the orders app.
+
+# enqueue_list_generation: Creates a ListGenerationJob and sends it to the celery workers.
+# generate_lists_task: Generates the inventory picklists and manufacturing lists of the orders of a job, chunk by chunk.
+
+from django.utils import timezone
+from backend.celery import app
+from .models import Orders, ListGenerationJob
+from .allocation import generate_lists_for_orders
+
+import logging
+
+logger = logging.getLogger('WarehousePilot_app')
+
+# number of orders allocated per transaction, the job progress is saved after each chunk
+JOB_CHUNK_SIZE = 25
+
+
+def enqueue_list_generation(order_ids):
+    """
+    Create a job for the given orders (in priority order) and enqueue it on celery.
+    If the broker cannot be reached the job is marked as failed and the exception is raised again.
+    """
+    job = ListGenerationJob.objects.create(order_ids=list(order_ids), total_orders=len(order_ids))
+    try:
+        generate_lists_task.delay(str(job.job_id))
+    except Exception as e:
+        job.status = "failed"
+        job.errors = [{"order_ids": job.order_ids, "error": f"Could not enqueue the job: {e}"}]
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "errors", "finished_at"])
+        raise
+    logger.info("Queued list generation job %s for %s orders", job.job_id, len(order_ids))
+    return job
+
+
+@app.task(bind=True)
+def generate_lists_task(self, job_id):
+    job = ListGenerationJob.objects.get(job_id=job_id)
+    job.status = "running"
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at"])
+
+    orders = Orders.objects.in_bulk(job.order_ids)
+    missing = [x for x in job.order_ids if x not in orders]
+    if missing:
+        job.errors.append({"order_ids": missing, "error": "Order not found"})
+    ordered = [orders[x] for x in job.order_ids if x in orders]
+
+    for i in range(0, len(ordered), JOB_CHUNK_SIZE):
+        chunk = ordered[i:i + JOB_CHUNK_SIZE]
+        try:
+            summaries = generate_lists_for_orders(chunk)
+        except Exception as e:
+            logger.error("List generation job %s failed for orders %s: %s", job_id, [x.order_id for x in chunk], str(e))
+            job.errors.append({"order_ids": [x.order_id for x in chunk], "error": str(e)})
+        else:
+            job.results.extend(summaries)
+            job.picklist_items += sum(x["picklist_items"] for x in summaries)
+            job.manufacturing_list_items += sum(x["manufacturing_list_items"] for x in summaries)
+        job.processed_orders = min(i + JOB_CHUNK_SIZE, len(ordered))
+        job.save(update_fields=["processed_orders", "picklist_items", "manufacturing_list_items", "results", "errors"])
+
+    job.status = "failed" if job.errors and not job.results else "completed"
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "errors", "finished_at"])
+    logger.info("List generation job %s %s (%s picklist items, %s manufacturing list items)",
+                job_id, job.status, job.picklist_items, job.manufacturing_list_items)
+    return job.status
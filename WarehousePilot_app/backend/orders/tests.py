@@ -2,31 +2,43 @@
 
 This file includes:
 - Tests for generating manufacturing and inventory lists (`GenerateInventoryAndManufacturingListsViewTests`).
+- Tests for generating the lists of several orders at once (`BatchGenerateInventoryAndManufacturingListsViewTests`).
+- Tests for generating the lists in the background and polling the job (`ListGenerationJobTests`).
+- Tests for the available to promise of open orders (`AvailableToPromiseViewTests`).
 - Tests for retrieving inventory picklist items (`InventoryPicklistItemsViewTest`).
 - Tests for retrieving inventory picklist ( A.K.A orders that have been started )
-- Tests for cycle time per order (`CycleTimePerOrderViewTests`).
-- Tests for order retrieval (`OrdersViewTests`).
+- Tests for cycle time per order and the order milestones it reads (`CycleTimePerOrderViewTests`).
+- Tests for the backfill of the order milestones by their migration (`OrderMilestonesMigrationTests`).
+- Tests for the daily picked/packed/shipped preview of posted cycle times (`CycleTimePerOrderPreviewTests`).
+- Tests for order retrieval, filtering, sorting and keyset pagination (`OrdersViewTests`).
+- Tests for the change-versions of the tables behind the conditional GETs (`TableVersionTests`).
 - Tests for starting an order (`StartOrderViewTests`).
 - Tests for delayed orders (`DelayedOrdersViewTests`).
 """
 
 from django.urls import reverse
+import json
 from rest_framework.test import APITestCase, APIClient, force_authenticate
 from rest_framework import status
 from datetime import date, datetime, timedelta
 from auth_app.models import users
 from rest_framework_simplejwt.tokens import RefreshToken
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, call, MagicMock, AsyncMock
 from django.utils import timezone
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.db.models.query import QuerySet
 from rest_framework.test import APIClient
 from unittest.mock import patch, MagicMock
 from .models import (
     Orders,
     OrderPart,
-    Part
+    Part,
+    ListGenerationJob,
+    OrderMilestones
 )
+from .tasks import generate_lists_task
+from .allocation import generate_lists_for_orders
+from .versioning import table_versions
 from inventory.models import (
     Inventory,
     InventoryPicklist,
@@ -38,6 +50,13 @@ from manufacturingLists.models import (
 )
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from kpi_dashboard.signals import LIVE_VIEWS
+from django.core.management import call_command
+from django.db.migrations.executor import MigrationExecutor
+from io import StringIO
 
 class GenerateInventoryAndManufacturingListsViewTests(TestCase):
     def setUp(self):
@@ -60,91 +79,29 @@ class GenerateInventoryAndManufacturingListsViewTests(TestCase):
         )
         
         # Create a real order instance for testing
-        self.mock_order = Orders.objects.create(order_id=self.order_id, status="Pending")
-        
-        # Mock order parts
-        self.mock_order_part1 = MagicMock(spec=OrderPart)
-        self.mock_order_part1.sku_color = "SKU001-RED"
-        self.mock_order_part1.qty = 10
-        self.mock_order_part1.location = "Location1"
-        self.mock_order_part1.area = "Area1"
-        self.mock_order_part1.lineup_nb = "Lineup1"
-        self.mock_order_part1.final_model = "Model1"
-        self.mock_order_part1.material_type = "Material1"
-        self.mock_order_part1.order_id = self.mock_order
-        
-        self.mock_order_part2 = MagicMock(spec=OrderPart)
-        self.mock_order_part2.sku_color = "SKU002-BLUE"
-        self.mock_order_part2.qty = 5
-        self.mock_order_part2.location = "Location2"
-        self.mock_order_part2.area = "Area2"
-        self.mock_order_part2.lineup_nb = "Lineup2"
-        self.mock_order_part2.final_model = "Model2"
-        self.mock_order_part2.material_type = "Material2"
-        self.mock_order_part2.order_id = self.mock_order
+        self.order = Orders.objects.create(order_id=self.order_id, status="Pending")
 
         # Create real part instances for testing
         self.part1 = Part.objects.create(sku_color="SKU001-RED", sku="SKU001", description="Test Part 1", qty_per_box=10, weight=1.2)
         self.part2 = Part.objects.create(sku_color="SKU002-BLUE", sku="SKU002", description="Test Part 2", qty_per_box=5, weight=0.8)
-        
-        # Mock inventory items
-        self.mock_inventory1 = MagicMock(spec=Inventory)
-        self.mock_inventory1.sku_color = "SKU001-RED"
-        self.mock_inventory1.qty = 8
-        self.mock_inventory1.amount_needed = 0
-        self.mock_inventory1.location = "Location1"
-        
-        self.mock_inventory2 = MagicMock(spec=Inventory)
-        self.mock_inventory2.sku_color = "SKU001-RED"
-        self.mock_inventory2.qty = 4
-        self.mock_inventory2.amount_needed = 0
-        self.mock_inventory2.location = "Location1A"
-        
-        # Mock picklist and manufacturing list
-        self.mock_picklist = MagicMock(spec=InventoryPicklist, order_id=self.mock_order, status=False)
-        self.mock_manu_list = ManufacturingLists(order_id=self.mock_order, status='Pending')
-        
-        # Mock picklist items and manufacturing list items
-        self.mock_picklist_item = MagicMock(spec=InventoryPicklistItem)
-        self.mock_manu_list_item = MagicMock(spec=ManufacturingListItem)
-    
-    @patch('orders.models.Orders.objects.get')
-    @patch('orders.models.OrderPart.objects.filter')
-    @patch('inventory.models.Inventory.objects.filter')
-    @patch('inventory.models.InventoryPicklist.objects.create')
-    @patch('manufacturingLists.models.ManufacturingLists.objects.create')
-    @patch('inventory.models.InventoryPicklistItem.objects.bulk_create')
-    @patch('manufacturingLists.models.ManufacturingListItem.objects.bulk_create')
-    # test_generate_lists_with_inventory_match(): Test the case when the order parts match the inventory items
-    def test_generate_lists_with_inventory_match(
-        self, mock_manu_bulk_create, mock_inv_bulk_create, 
-        mock_manu_create, mock_picklist_create, mock_inv_filter, 
-        mock_order_part_filter, mock_order_get
-    ):
-        # Arrange: Mocking order, order parts, inventory, picklist, and manufacturing list; and authenticating user
-        mock_order_get.return_value = self.mock_order
 
-        mock_order_part_filter.return_value = MagicMock(
-            spec=QuerySet,
-            values_list=MagicMock(return_value=["SKU001-RED", "SKU002-BLUE"]),
-            __iter__=MagicMock(return_value=iter([
-                OrderPart(order_id=self.mock_order, sku_color=self.part1, qty=10),
-                OrderPart(order_id=self.mock_order, sku_color=self.part2, qty=5)
-            ]))
-        )
+        # Order parts: 10 x SKU001-RED and 5 x SKU002-BLUE
+        OrderPart.objects.create(order_id=self.order, sku_color=self.part1, qty=10, location="Location1", area="Area1",
+                                 lineup_nb="Lineup1", final_model="Model1", material_type="Material1")
+        OrderPart.objects.create(order_id=self.order, sku_color=self.part2, qty=5, location="Location2", area="Area2",
+                                 lineup_nb="Lineup2", final_model="Model2", material_type="Material2")
 
-        mock_inv_filter.return_value = MagicMock(
-            spec=QuerySet,
-            aggregate=MagicMock(return_value={'total': 12}),  
-            values_list=MagicMock(return_value=["SKU001-RED"]),
-            order_by=MagicMock(return_value=[self.mock_inventory1, self.mock_inventory2]),
-            count=MagicMock(return_value=2)
-        )
+        self.client.force_authenticate(user=self.admin_user)
 
-        mock_picklist_create.return_value = self.mock_picklist
-        mock_manu_create.return_value = self.mock_manu_list
+    def create_inventory(self, part, location, qty, amount_needed=0):
+        return Inventory.objects.create(sku_color=part, location=location, qty=qty, warehouse_number="499", amount_needed=amount_needed)
 
-        self.client.force_authenticate(user=self.admin_user)
+    # test_generate_lists_with_inventory_match(): Test the case when the order parts match the inventory items
+    def test_generate_lists_with_inventory_match(self):
+        # Arrange: enough inventory for both skus
+        inventory1 = self.create_inventory(self.part1, "Location1", 8)
+        inventory2 = self.create_inventory(self.part1, "Location1A", 4)
+        inventory3 = self.create_inventory(self.part2, "Location2", 20)
 
         # Act: Make POST request to generate lists
         response = self.client.post(self.url, {'orderID': self.order_id}, format='json')
@@ -152,88 +109,45 @@ class GenerateInventoryAndManufacturingListsViewTests(TestCase):
         # Assert: Check response status and data
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['detail'], "inventory picklist and manufacturing list generation successful")
+        self.assertEqual(response.data['picklist_items'], 3)
+        self.assertEqual(response.data['manufacturing_list_items'], 0)
+
+        picklist = InventoryPicklist.objects.get(order_id=self.order)
+        items = {(item.location_id, item.sku_color_id): item for item in InventoryPicklistItem.objects.filter(picklist_id=picklist)}
+        # the preferred location of the order part is emptied first
+        self.assertEqual(items[(inventory1.inventory_id, "SKU001-RED")].amount, 8)
+        self.assertEqual(items[(inventory2.inventory_id, "SKU001-RED")].amount, 2)
+        self.assertEqual(items[(inventory3.inventory_id, "SKU002-BLUE")].amount, 5)
+        self.assertEqual(items[(inventory1.inventory_id, "SKU001-RED")].lineup_nb, "Lineup1")
+        self.assertFalse(ManufacturingLists.objects.filter(order_id=self.order).exists())
+
+        inventory1.refresh_from_db()
+        inventory2.refresh_from_db()
+        inventory3.refresh_from_db()
+        self.assertEqual((inventory1.amount_needed, inventory2.amount_needed, inventory3.amount_needed), (8, 2, 5))
 
-    @patch('orders.models.Orders.objects.get')
-    @patch('orders.models.OrderPart.objects.filter')
-    @patch('inventory.models.Inventory.objects.filter')
-    @patch('manufacturingLists.models.ManufacturingLists.objects.create')
-    @patch('manufacturingLists.models.ManufacturingListItem.objects.bulk_create')
-    @patch('inventory.models.InventoryPicklist.objects.get_or_create')
     # test_generate_lists_no_inventory_match(): Test the case when no order parts match inventory items
-    def test_generate_lists_no_inventory_match(
-        self, mock_picklist_get_or_create, mock_manu_bulk_create,
-        mock_manu_create, mock_inv_filter, mock_order_part_filter, 
-        mock_order_get
-    ):
-        # Arrange: Mocking instances of models and authenticate user
-        mock_order_get.return_value = self.mock_order
-
-        mock_order_part_filter.return_value = MagicMock(
-            spec=QuerySet,
-            values_list=MagicMock(return_value=["SKU001-RED", "SKU002-BLUE"]),
-            __iter__=MagicMock(return_value=iter([
-                OrderPart(order_id=self.mock_order, sku_color=self.part1, qty=10),
-                OrderPart(order_id=self.mock_order, sku_color=self.part2, qty=5)
-            ]))
-        )
-
-        mock_inv_filter.return_value = MagicMock(
-            spec=QuerySet,
-            exists=MagicMock(return_value=False),
-            values_list=MagicMock(return_value=[])
-        )
-
-        mock_manu_create.return_value = self.mock_manu_list
-        mock_picklist_get_or_create.return_value = (self.mock_picklist, True)
-
-        InventoryPicklist.objects.create(order_id=self.mock_order, status=False)
-
-        self.client.force_authenticate(user=self.admin_user)
+    def test_generate_lists_no_inventory_match(self):
+        # Arrange: an empty picklist already exists for the order
+        InventoryPicklist.objects.create(order_id=self.order, status=False)
 
         # Act: Make POST request to generate lists
         response = self.client.post(self.url, {'orderID': self.order_id}, format='json')
 
-        # Assert: Check response status and data
+        # Assert: Check response status and that everything has to be manufactured
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        mock_manu_create.assert_called_once_with(status='Pending', order_id=self.mock_order)
-        self.assertTrue(mock_manu_bulk_create.called)
+        manu_list = ManufacturingLists.objects.get(order_id=self.order)
+        self.assertEqual(manu_list.status, 'Pending')
+        amounts = dict(ManufacturingListItem.objects.filter(manufacturing_list_id=manu_list).values_list('sku_color', 'amount'))
+        self.assertEqual(amounts, {"SKU001-RED": 10, "SKU002-BLUE": 5})
+        self.assertEqual(InventoryPicklist.objects.filter(order_id=self.order).count(), 1)
+        self.assertFalse(InventoryPicklistItem.objects.filter(picklist_id__order_id=self.order).exists())
 
-    @patch('orders.models.Orders.objects.get')
-    @patch('orders.models.OrderPart.objects.filter')
-    @patch('inventory.models.Inventory.objects.filter')
-    @patch('manufacturingLists.models.ManufacturingLists.objects.create')
-    @patch('manufacturingLists.models.ManufacturingListItem.objects.bulk_create')
-    @patch('inventory.models.InventoryPicklist.objects.get_or_create')
-    @patch('parts.models.Part.objects.get')
     # test_generate_lists_partial_inventory_match(): Test the case when some order parts match inventory items
-    def test_generate_lists_partial_inventory_match(
-        self, mock_part_get, mock_picklist_get_or_create, mock_manu_bulk_create,
-        mock_manu_create, mock_inv_filter, mock_order_part_filter, 
-        mock_order_get
-    ):
-        # Arrange: Mocking instances of models and authenticating user
-        mock_order_get.return_value = self.mock_order
-
-        mock_part_get.side_effect = lambda sku_color: self.part1 if sku_color == "SKU001-RED" else self.part2
-
-        mock_order_parts = MagicMock(spec=QuerySet)
-        mock_order_parts.values_list.return_value = ["SKU001-RED", "SKU002-BLUE"]
-        mock_order_part_filter.return_value = mock_order_parts
-
-        mock_inventory_qs = MagicMock(spec=QuerySet)
-        mock_inventory_qs.count.return_value = 2 
-        mock_inventory_qs.__iter__.return_value = iter([
-            self.mock_inventory1,
-            self.mock_inventory2
-        ])
-        mock_inv_filter.return_value = mock_inventory_qs
-
-        InventoryPicklist.objects.create(order_id=self.mock_order, status=False)
-
-        mock_manu_create.return_value = self.mock_manu_list
-        mock_picklist_get_or_create.return_value = (self.mock_picklist, True)
-
-        self.client.force_authenticate(user=self.admin_user)
+    def test_generate_lists_partial_inventory_match(self):
+        # Arrange: only 6 units of SKU001-RED are free, 2 of them are already reserved by another order
+        inventory1 = self.create_inventory(self.part1, "Location1", 4, amount_needed=2)
+        inventory2 = self.create_inventory(self.part1, "Location1A", 4)
 
         # Act: Make POST request to generate lists
         response = self.client.post(self.url, {'orderID': self.order_id}, format='json')
@@ -241,14 +155,22 @@ class GenerateInventoryAndManufacturingListsViewTests(TestCase):
         # Assert: Check response status and data
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['detail'], "inventory picklist and manufacturing list generation successful")
-        self.assertTrue(mock_manu_bulk_create.called)
+
+        picked = InventoryPicklistItem.objects.filter(picklist_id__order_id=self.order).aggregate(total=Sum('amount'))['total']
+        self.assertEqual(picked, 6)
+        manu_list = ManufacturingLists.objects.get(order_id=self.order)
+        amounts = dict(ManufacturingListItem.objects.filter(manufacturing_list_id=manu_list).values_list('sku_color', 'amount'))
+        self.assertEqual(amounts, {"SKU001-RED": 4, "SKU002-BLUE": 5})
+
+        inventory1.refresh_from_db()
+        inventory2.refresh_from_db()
+        self.assertEqual((inventory1.amount_needed, inventory2.amount_needed), (4, 4))
 
     @patch('orders.models.Orders.objects.get')
     # test_generate_lists_order_not_found(): Test the case when order doesn't exist
     def test_generate_lists_order_not_found(self, mock_order_get):
         # Arrange: Mocking order not found and authenticating user
         mock_order_get.side_effect = Orders.DoesNotExist
-        self.client.force_authenticate(user=self.admin_user)
 
         # Act: Make POST request to generate lists with non-existing order ID
         response = self.client.post(self.url, {'orderID': self.order_id}, format='json')
@@ -257,53 +179,51 @@ class GenerateInventoryAndManufacturingListsViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['error'], "Order not found")
 
-    @patch('orders.models.Orders.objects.get')
-    @patch('orders.models.OrderPart.objects.filter')
-    @patch('inventory.models.Inventory.objects.filter')
-    @patch('manufacturingLists.models.ManufacturingLists.objects.create')
-    @patch('manufacturingLists.models.ManufacturingListItem.objects.bulk_create')
-    @patch('inventory.models.InventoryPicklist.objects.filter')
     # test_generate_lists_no_picklist(): Test the case when picklist doesn't exist
-    def test_generate_lists_no_picklist(
-        self, mock_picklist_filter, mock_manu_bulk_create,
-        mock_manu_create, mock_inv_filter, mock_order_part_filter, 
-        mock_order_get
-    ):
-        # Arrange: Mocking instances of models and authenticating user
-        mock_order_get.return_value = self.mock_order
-
-        mock_picklist_filter.return_value = MagicMock(
-            exists=MagicMock(return_value=False)
-        )
-
-        mock_order_part_filter.return_value = MagicMock(
-            spec=QuerySet,
-            values_list=MagicMock(return_value=["SKU001-RED", "SKU002-BLUE"]),
-            __iter__=MagicMock(return_value=iter([
-                OrderPart(order_id=self.mock_order, sku_color=self.part1, qty=10),
-                OrderPart(order_id=self.mock_order, sku_color=self.part2, qty=5)
-            ]))
-        )
-
-        mock_inv_filter.return_value = MagicMock(
-            spec=QuerySet,
-            exists=MagicMock(return_value=False),
-            values_list=MagicMock(return_value=[])
-        )
-
-        mock_manu_create.return_value = self.mock_manu_list
-
-        self.client.force_authenticate(user=self.admin_user)
-
+    def test_generate_lists_no_picklist(self):
         # Act: Make POST request to generate lists
         response = self.client.post(self.url, {'orderID': self.order_id}, format='json')
 
-        # Assert: Check response status and data
+        # Assert: Check response status and that an empty picklist was created
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['detail'], "inventory picklist and manufacturing list generation successful")
+        self.assertTrue(InventoryPicklist.objects.filter(order_id=self.order, status=False).exists())
+
+    # test_generate_lists_already_generated(): Test that lists are not generated twice for the same order
+    def test_generate_lists_already_generated(self):
+        inventory = self.create_inventory(self.part1, "Location1", 100)
+        self.client.post(self.url, {'orderID': self.order_id}, format='json')
+
+        # Act: generate the lists a second time
+        response = self.client.post(self.url, {'orderID': self.order_id}, format='json')
+
+        # Assert: nothing was reserved twice
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        inventory.refresh_from_db()
+        self.assertEqual(inventory.amount_needed, 10)
+        self.assertEqual(ManufacturingListItem.objects.filter(manufacturing_list_id__order_id=self.order).count(), 1)
+
+    # test_generate_lists_constant_query_count(): Test that the number of queries does not grow with the size of the order
+    def test_generate_lists_constant_query_count(self):
+        def run(order_id, nb_skus):
+            order = Orders.objects.create(order_id=order_id)
+            for i in range(nb_skus):
+                part = Part.objects.create(sku_color=f"BULK-{order_id}-{i}")
+                OrderPart.objects.create(order_id=order, sku_color=part, qty=10, location=f"L{i}")
+                self.create_inventory(part, f"L{i}", 6)
+                self.create_inventory(part, f"M{i}", 2)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'orderID': order_id}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.assertEqual(run(1000, 2), run(2000, 40))
+        self.assertEqual(ManufacturingListItem.objects.filter(manufacturing_list_id__order_id=2000).count(), 40)
 
     # test_generate_lists_unauthenticated(): Test the case when user is not authenticated
     def test_generate_lists_unauthenticated(self):        
+        self.client.force_authenticate(user=None)
+
         # Act: Make POST request to generate lists without authentication
         response = self.client.post(self.url, {'orderID': self.order_id}, format='json')
         
@@ -326,6 +246,300 @@ class GenerateInventoryAndManufacturingListsViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.data['detail'], "You do not have permission to perform this action.")
 
+class BatchGenerateInventoryAndManufacturingListsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('generateListsBatch')
+        self.manager = users.objects.create_user(
+            first_name='Test',
+            last_name='Manager',
+            username="manager",
+            password="managerpassword",
+            email="manager@example.com",
+            date_of_hire='1990-01-01',
+            department='Testing',
+            role='manager',
+            is_staff=False
+        )
+        self.client.force_authenticate(user=self.manager)
+        self.part = Part.objects.create(sku_color="SKU001-RED", sku="SKU001")
+        self.inventory = Inventory.objects.create(sku_color=self.part, location="A1", qty=15, warehouse_number="499", amount_needed=0)
+
+    def create_order(self, order_id, due_date, qty=10):
+        order = Orders.objects.create(order_id=order_id, due_date=due_date)
+        OrderPart.objects.create(order_id=order, sku_color=self.part, qty=qty)
+        return order
+
+    # test_batch_generate_prioritizes_due_date(): The order due first is served first from shared inventory
+    def test_batch_generate_prioritizes_due_date(self):
+        self.create_order(1, date(2030, 2, 1))
+        self.create_order(2, date(2030, 1, 1))
+        self.create_order(3, None)
+
+        response = self.client.post(self.url, {'orderIDs': [1, 2, 3]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([x['order_id'] for x in response.data['orders']], [2, 1, 3])
+        picked = dict(InventoryPicklistItem.objects.values_list('picklist_id__order_id', 'amount'))
+        self.assertEqual(picked, {2: 10, 1: 5})
+        manufactured = dict(ManufacturingListItem.objects.values_list('manufacturing_list_id__order_id', 'amount'))
+        self.assertEqual(manufactured, {1: 5, 3: 10})
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.amount_needed, 15)
+        self.assertEqual(InventoryPicklist.objects.count(), 3)
+        self.assertEqual(Orders.objects.filter(status='In Progress', start_timestamp__isnull=False).count(), 3)
+
+    # test_batch_generate_reports_missing_and_generated_orders(): Unknown orders are reported and started orders are not allocated twice
+    def test_batch_generate_reports_missing_and_generated_orders(self):
+        self.create_order(1, date(2030, 1, 1))
+        self.client.post(self.url, {'orderIDs': [1]}, format='json')
+
+        response = self.client.post(self.url, {'orderIDs': [1, 999]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['not_found'], [999])
+        self.assertEqual(response.data['already_started'], [1])
+        self.assertEqual(response.data['orders'], [])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.amount_needed, 10)
+
+    # test_batch_generate_does_what_a_save_does(): The orders started by the bulk update get their milestones, drop the cached responses and publish order_started
+    @override_settings(LIVE_EVENTS_URL="redis://redis:6379/2")
+    def test_batch_generate_does_what_a_save_does(self):
+        # Arrange: order 1 is already in progress, order 2 is not started
+        self.create_order(1, date(2030, 1, 1))
+        Orders.objects.filter(order_id=1).update(status='In Progress')
+        self.create_order(2, date(2030, 1, 1), qty=1)
+        OrderMilestones.objects.all().delete()
+
+        # Act
+        with patch('backend.live_events._publish') as publish, patch('kpi_dashboard.signals.invalidate_responses') as invalidate, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'orderIDs': [1, 2]}, format='json')
+
+        # Assert: only order 2 is started and generated
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([x['order_id'] for x in response.data['orders']], [2])
+        self.assertEqual(response.data['already_started'], [1])
+        self.assertEqual(list(InventoryPicklist.objects.values_list('order_id', flat=True)), [2])
+        order = Orders.objects.get(order_id=2)
+        self.assertEqual(OrderMilestones.objects.get(order_id=2).start_timestamp, order.start_timestamp)
+        self.assertFalse(OrderMilestones.objects.filter(order_id=1).exists())
+        self.assertIn(call(*LIVE_VIEWS[Orders]), invalidate.call_args_list)
+        self.assertEqual([json.loads(x.args[0]) for x in publish.call_args_list], [{"type": "order_started", "order_id": 2}])
+
+    # test_batch_generate_constant_query_count(): The number of queries does not grow with the number of orders
+    def test_batch_generate_constant_query_count(self):
+        def run(order_ids):
+            for order_id in order_ids:
+                self.create_order(order_id, date(2030, 1, 1), qty=1)
+            # one order is left short so that both picklist and manufacturing list items are written
+            Inventory.objects.filter(pk=self.inventory.pk).update(qty=len(order_ids) - 1, amount_needed=0)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'orderIDs': order_ids}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.assertEqual(run([1, 2]), run(list(range(100, 130))))
+
+    # test_batch_generate_invalid_input(): orderIDs must be a list
+    def test_batch_generate_invalid_input(self):
+        response = self.client.post(self.url, {'orderIDs': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # test_batch_generate_non_integer_ids(): orderIDs must be integers, given as numbers or strings
+    def test_batch_generate_non_integer_ids(self):
+        response = self.client.post(self.url, {'orderIDs': [1, 'abc']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.create_order(1, date(2030, 1, 1))
+        response = self.client.post(self.url, {'orderIDs': ['1']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['not_found'], [])
+        self.assertEqual(Orders.objects.get(order_id=1).status, 'In Progress')
+
+    # test_batch_generate_keeps_completed_orders(): Only the orders not started yet are started
+    def test_batch_generate_keeps_completed_orders(self):
+        completed = self.create_order(1, date(2030, 1, 1))
+        completed.status = 'Completed'
+        completed.save()
+        self.create_order(2, date(2030, 1, 1))
+
+        response = self.client.post(self.url, {'orderIDs': [1, 2]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(dict(Orders.objects.values_list('order_id', 'status')), {1: 'Completed', 2: 'In Progress'})
+        self.assertIsNone(Orders.objects.get(order_id=1).start_timestamp)
+
+    # test_batch_generate_failure_leaves_orders_not_started(): The orders are started in the transaction generating their lists
+    def test_batch_generate_failure_leaves_orders_not_started(self):
+        self.create_order(1, date(2030, 1, 1))
+
+        with patch('orders.views.generate_lists_for_orders', side_effect=RuntimeError("boom")):
+            response = self.client.post(self.url, {'orderIDs': [1]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        order = Orders.objects.get(order_id=1)
+        self.assertEqual((order.status, order.start_timestamp), ('Not Started', None))
+
+    # test_batch_generate_unauthorized(): Only admins and managers can start orders
+    def test_batch_generate_unauthorized(self):
+        self.manager.role = 'staff'
+        self.manager.save()
+        response = self.client.post(self.url, {'orderIDs': [1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class ListGenerationJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.manager = users.objects.create_user(
+            first_name='Test',
+            last_name='Manager',
+            username="manager",
+            password="managerpassword",
+            email="manager@example.com",
+            date_of_hire='1990-01-01',
+            department='Testing',
+            role='manager',
+            is_staff=False
+        )
+        self.client.force_authenticate(user=self.manager)
+        self.part = Part.objects.create(sku_color="SKU001-RED", sku="SKU001")
+        Inventory.objects.create(sku_color=self.part, location="A1", qty=4, warehouse_number="499", amount_needed=0)
+        for order_id in (1, 2):
+            order = Orders.objects.create(order_id=order_id, due_date=date(2030, 1, order_id))
+            OrderPart.objects.create(order_id=order, sku_color=self.part, qty=3)
+
+    @patch('orders.tasks.generate_lists_task.delay')
+    # test_async_generation_reports_progress(): The job is queued right away and reports its counts once the task has run
+    def test_async_generation_reports_progress(self, mock_delay):
+        response = self.client.post(reverse('generateListsBatch'), {'orderIDs': [2, 1], 'async': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        mock_delay.assert_called_once_with(str(job_id))
+        self.assertFalse(InventoryPicklistItem.objects.exists())
+
+        job_url = reverse('generateListsJob', args=[job_id])
+        self.assertEqual(self.client.get(job_url).data['status'], 'queued')
+
+        # Run the task the way the worker would
+        generate_lists_task(str(job_id))
+
+        response = self.client.get(job_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['progress'], 100)
+        self.assertEqual(response.data['picklist_items'], 2)
+        self.assertEqual(response.data['manufacturing_list_items'], 1)
+        self.assertEqual([x['order_id'] for x in response.data['results']], [1, 2])
+        self.assertEqual(response.data['errors'], [])
+
+    @patch('orders.tasks.generate_lists_task.delay')
+    # test_async_single_order(): The single order endpoint can also queue its generation
+    def test_async_single_order(self, mock_delay):
+        response = self.client.post(reverse('generateLists'), {'orderID': 1, 'async': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(ListGenerationJob.objects.get(job_id=response.data['job_id']).order_ids, [1])
+
+    @patch('orders.tasks.generate_lists_task.delay')
+    # test_async_generation_broker_down(): The job is marked as failed when it cannot be queued
+    def test_async_generation_broker_down(self, mock_delay):
+        mock_delay.side_effect = ConnectionError("broker unreachable")
+
+        response = self.client.post(reverse('generateLists'), {'orderID': 1, 'async': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(ListGenerationJob.objects.get().status, 'failed')
+
+    # test_job_not_found(): Polling an unknown job returns a 404
+    def test_job_not_found(self):
+        response = self.client.get(reverse('generateListsJob', args=['00000000-0000-0000-0000-000000000000']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class AvailableToPromiseViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('available_to_promise')
+        self.manager = users.objects.create_user(
+            first_name='Test',
+            last_name='Manager',
+            username="manager",
+            password="managerpassword",
+            email="manager@example.com",
+            date_of_hire='1990-01-01',
+            department='Testing',
+            role='manager',
+            is_staff=False
+        )
+        self.client.force_authenticate(user=self.manager)
+        self.red = Part.objects.create(sku_color="SKU001-RED", sku="SKU001")
+        self.blue = Part.objects.create(sku_color="SKU002-BLUE", sku="SKU002")
+        self.inventory = Inventory.objects.create(sku_color=self.red, location="A1", qty=10, warehouse_number="499", amount_needed=2)
+
+    def create_order(self, order_id, due_date, lines, status="Not Started"):
+        order = Orders.objects.create(order_id=order_id, due_date=due_date, status=status)
+        for part, qty in lines:
+            OrderPart.objects.create(order_id=order, sku_color=part, qty=qty)
+        return order
+
+    # test_available_to_promise(): Open orders share the free inventory by due date and nothing is written
+    def test_available_to_promise(self):
+        self.create_order(1, date(2030, 2, 1), [(self.red, 5), (self.blue, 5)])
+        self.create_order(2, date(2030, 1, 1), [(self.red, 4), (self.red, 2)])
+        self.create_order(3, None, [(self.red, 1)])
+        self.create_order(4, date(2029, 1, 1), [(self.red, 100)], status="Completed")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_order = {x['order_id']: x for x in response.data}
+        self.assertEqual([x['order_id'] for x in response.data], [2, 1, 3])
+        # 8 units are free: order 2 takes 6, order 1 takes the 2 left
+        self.assertEqual((by_order[2]['fillable_qty'], by_order[2]['fill_rate']), (6, 1.0))
+        self.assertEqual((by_order[1]['ordered_qty'], by_order[1]['fillable_qty'], by_order[1]['fill_rate']), (10, 2, 0.2))
+        self.assertEqual(by_order[1]['manufacturing_skus'], [{"sku_color": "SKU001-RED", "qty": 3}, {"sku_color": "SKU002-BLUE", "qty": 5}])
+        self.assertEqual(by_order[3]['fillable_qty'], 0)
+
+        # read only
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.amount_needed, 2)
+        self.assertFalse(InventoryPicklist.objects.exists())
+        self.assertFalse(any(query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) for query in queries.captured_queries))
+
+    # test_available_to_promise_generated_orders(): Orders that already have lists keep their reservations
+    def test_available_to_promise_generated_orders(self):
+        started = self.create_order(1, date(2030, 2, 1), [(self.red, 5)], status="In Progress")
+        generate_lists_for_orders([started])
+        self.create_order(2, date(2030, 1, 1), [(self.red, 5)])
+
+        response = self.client.get(self.url)
+
+        by_order = {x['order_id']: x for x in response.data}
+        self.assertTrue(by_order[1]['generated'])
+        self.assertEqual(by_order[1]['fillable_qty'], 5)
+        self.assertEqual(by_order[2]['fillable_qty'], 3)
+
+    # test_available_to_promise_no_orders(): No open orders gives an empty list
+    def test_available_to_promise_no_orders(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    # test_available_to_promise_unauthorized(): Only admins and managers can see the available to promise
+    def test_available_to_promise_unauthorized(self):
+        self.manager.role = 'staff'
+        self.manager.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+# async_rows(): async iterator over `rows`, standing for the aiterator() of a mocked queryset
+async def async_rows(rows):
+    for row in rows:
+        yield row
+
+
 class InventoryPicklistItemsViewTests(TestCase):
     def setUp(self):
         # Create a client instance and setup url
@@ -355,8 +569,8 @@ class InventoryPicklistItemsViewTests(TestCase):
         self.mock_picklist.picklist_id = 456
         self.mock_picklist.order_id = self.order_id
 
-    @patch('orders.models.Orders.objects.get')
-    @patch('inventory.models.InventoryPicklist.objects.get')
+    @patch('orders.models.Orders.objects.aget', new_callable=AsyncMock)
+    @patch('inventory.models.InventoryPicklist.objects.aget', new_callable=AsyncMock)
     @patch('inventory.models.InventoryPicklistItem.objects.filter')
     # test_get_inventory_picklist_items_success(): Test successful retrieval of picklist items
     def test_get_inventory_picklist_items_success(self, mock_item_filter, mock_picklist_get, mock_order_get):
@@ -366,7 +580,7 @@ class InventoryPicklistItemsViewTests(TestCase):
         mock_picklist_get.return_value = self.mock_picklist
         
         test_time = datetime.now()
-        mock_item_filter.return_value.order_by.return_value.values.return_value = [
+        mock_item_filter.return_value.order_by.return_value.values.return_value.aiterator.return_value = async_rows([
             {
                 'picklist_item_id': 1,
                 'location__location': 'A1',
@@ -385,7 +599,7 @@ class InventoryPicklistItemsViewTests(TestCase):
                 'repick_reason': None,
                 'actual_picked_quantity': 5
             }
-        ]
+        ])
 
         self.client.force_authenticate(self.user)
 
@@ -412,7 +626,7 @@ class InventoryPicklistItemsViewTests(TestCase):
         self.assertEqual(response.data[0]['repick_reason'], None)
         self.assertEqual(response.data[0]['actual_picked_quantity'], 5)
     
-    @patch('orders.models.Orders.objects.get')
+    @patch('orders.models.Orders.objects.aget', new_callable=AsyncMock)
     # test_get_inventory_picklist_order_not_found(): Handle test case when order doesn't exist
     def test_get_inventory_picklist_items_order_not_found(self, mock_order_get):
         # Arrange: Mocking order instance to throw an exception and authenticate user
@@ -427,8 +641,8 @@ class InventoryPicklistItemsViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['error'], 'Order not found')
 
-    @patch('orders.models.Orders.objects.get')
-    @patch('inventory.models.InventoryPicklist.objects.get')
+    @patch('orders.models.Orders.objects.aget', new_callable=AsyncMock)
+    @patch('inventory.models.InventoryPicklist.objects.aget', new_callable=AsyncMock)
     # test_get_inventory_picklist_items_picklist_not_found(): Handle test case when picklist doesn't exist
     def test_get_inventory_picklist_items_picklist_not_found(self, mock_picklist_get, mock_order_get):
         # Arrange: Mocking order and picklist instances to throw an exception and authenticate user
@@ -444,8 +658,8 @@ class InventoryPicklistItemsViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['error'], 'No picklist found for the given order')
     
-    @patch('orders.models.Orders.objects.get')
-    @patch('inventory.models.InventoryPicklist.objects.get')
+    @patch('orders.models.Orders.objects.aget', new_callable=AsyncMock)
+    @patch('inventory.models.InventoryPicklist.objects.aget', new_callable=AsyncMock)
     @patch('inventory.models.InventoryPicklistItem.objects.filter')
     # test_get_inventory_picklist_items_empty_picklist(): Handle test case when picklist is empty
     def test_get_inventory_picklist_items_empty_picklist(self, mock_item_filter, mock_picklist_get, mock_order_get):
@@ -456,7 +670,7 @@ class InventoryPicklistItemsViewTests(TestCase):
         self.mock_picklist.save()
         mock_picklist_get.return_value = self.mock_picklist
         
-        mock_item_filter.return_value.order_by.return_value.values.return_value = []
+        mock_item_filter.return_value.order_by.return_value.values.return_value.aiterator.return_value = async_rows([])
 
         self.client.force_authenticate(self.user)
 
@@ -467,7 +681,7 @@ class InventoryPicklistItemsViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
     
-    @patch('orders.models.Orders.objects.get')
+    @patch('orders.models.Orders.objects.aget', new_callable=AsyncMock)
     # test_get_inventory_picklist_items_database_exception(): Handle test case where database retrieval throws an exception
     def test_get_inventory_picklist_items_database_exception(self, mock_order_get):
         # Arrange: Mocking order instance to throw exception and authenticate user
@@ -492,6 +706,28 @@ class InventoryPicklistItemsViewTests(TestCase):
         self.assertEqual(response.data['detail'], "Authentication credentials were not provided.")
 
 class InventoryPicklistViewTests(TestCase):
+    # test_get_inventory_picklists_not_modified(): Test that picking an item invalidates the ETag of the picklists
+    def test_get_inventory_picklists_not_modified(self):
+        # Arrange: Create a started order with a picklist and authenticate user
+        order = Orders.objects.create(order_id=self.order_id, status='In Progress', due_date='2025-01-01')
+        part = Part.objects.create(sku_color='SKU-1')
+        picklist = InventoryPicklist.objects.create(order_id=order, status=False)
+        item = InventoryPicklistItem.objects.create(picklist_id=picklist, sku_color=part, amount=1, status=False)
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        # Act & Assert: Unchanged refresh returns 304
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Act: Pick the item
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            InventoryPicklistItem.objects.filter(pk=item.pk).update(status=True)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        # Assert: Check that the picklist is now reported as filled
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data[0]['already_filled'])
+
     def setUp(self):
         # Create a client instance and setup url
         self.client = APIClient()
@@ -512,51 +748,78 @@ class InventoryPicklistViewTests(TestCase):
             theme_preference='light'
         )        
 
-    @patch('orders.models.Orders.objects.filter')
-    @patch('inventory.models.InventoryPicklistItem.objects.filter')
-    @patch('inventory.models.InventoryPicklist.objects.filter')
-    # test_get_inventory_picklists_success(): Test successful retrieval of picklists
-    def test_get_inventory_picklists_success(self, mock_picklist_filter, mock_item_filter, mock_order_filter):
-        # Arrange: Mocking database queries and authenticate user
-        test_date = datetime.now() + timedelta(days=7)
-        mock_order_filter.return_value.values.return_value = [
-            {'order_id': 1, 'due_date': test_date},
-            {'order_id': 2, 'due_date': test_date}
-        ]
-        
-        mock_item_filter.side_effect = [
-            MagicMock(exists=MagicMock(return_value=False)),
-            MagicMock(exists=MagicMock(return_value=True))
-        ]
-        
-        mock_picklist_filter.return_value.values_list.return_value.first.side_effect = [
-            'employee1',
-            None      
-        ]
+    # create_started_orders(): creates `count` orders in progress with a picklist, every other one assigned and filled
+    def create_started_orders(self, count, first_id=1):
+        part = Part.objects.get_or_create(sku_color='SKU-PL')[0]
+        for order_id in range(first_id, first_id + count):
+            order = Orders.objects.create(order_id=order_id, status='In Progress', due_date=date(2025, 1, 1) + timedelta(days=order_id % 3))
+            picklist = InventoryPicklist.objects.create(order_id=order, status=False, assigned_employee_id=self.user if order_id % 2 else None)
+            InventoryPicklistItem.objects.create(picklist_id=picklist, sku_color=part, amount=1, status=True)
+            InventoryPicklistItem.objects.create(picklist_id=picklist, sku_color=part, amount=1, status=bool(order_id % 2))
 
+    # test_get_inventory_picklists_success(): Test successful retrieval of picklists
+    def test_get_inventory_picklists_success(self):
+        # Arrange: Create started orders, an order without picklist and an order not started, and authenticate user
+        self.create_started_orders(2)
+        Orders.objects.create(order_id=3, status='In Progress', due_date=None)
+        Orders.objects.create(order_id=4, status='Not Started', due_date='2025-01-01')
         self.client.force_authenticate(self.user)
 
         # Act: Make a GET request to InventoryPicklistView
         response = self.client.get(self.url)
 
-        # Assert: Check response status and data, and verify data from orders
+        # Assert: Check response status and data, sorted by due date then order id
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        
-        self.assertEqual(response.data[0]['order_id'], 1)
+        self.assertEqual([x['order_id'] for x in response.data], [1, 2, 3])
+
         self.assertTrue(response.data[0]['already_filled'])
-        self.assertEqual(response.data[0]['assigned_to'], 'employee1')
-        
-        self.assertEqual(response.data[1]['order_id'], 2)
+        self.assertEqual(response.data[0]['assigned_to'], 'admin')
+
         self.assertFalse(response.data[1]['already_filled'])
         self.assertIsNone(response.data[1]['assigned_to'])
 
-    @patch('orders.models.Orders.objects.filter')
-    # test_get_inventory_picklists_empty(): Test when no orders are in progress
-    def test_get_inventory_picklists_empty(self, mock_order_filter):
-        # Arrange: Mocking database queries to return no orders and authenticate user
-        mock_order_filter.return_value.values.return_value = []
+        self.assertTrue(response.data[2]['already_filled'])
+        self.assertIsNone(response.data[2]['assigned_to'])
 
+    # test_get_inventory_picklists_constant_queries(): Test that the number of queries does not depend on the number of orders
+    def test_get_inventory_picklists_constant_queries(self):
+        # Arrange: Create a few started orders and authenticate user
+        self.create_started_orders(3)
+        self.client.force_authenticate(self.user)
+
+        # Act: Count the queries for 3 orders then for 30 orders
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        self.create_started_orders(27, first_id=4)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+
+        # Assert: Check that the query count is the same
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(len(few), len(many))
+
+    # test_get_inventory_picklists_pagination(): Test the keyset pagination of the picklists
+    def test_get_inventory_picklists_pagination(self):
+        # Arrange: Create started orders and authenticate user
+        self.create_started_orders(5)
+        self.client.force_authenticate(self.user)
+        expected = [x['order_id'] for x in self.client.get(self.url).data]
+
+        # Act: Fetch the pages two orders at a time
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {'limit': 2, **({'cursor': cursor} if cursor else {})})
+            seen += [x['order_id'] for x in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        # Assert: Check that the pages cover every order once, in order
+        self.assertEqual(seen, expected)
+
+    # test_get_inventory_picklists_empty(): Test when no orders are in progress
+    def test_get_inventory_picklists_empty(self):
+        # Arrange: authenticate user
         self.client.force_authenticate(self.user)
 
         # Act: Make a GET request to InventoryPicklistView
@@ -567,11 +830,11 @@ class InventoryPicklistViewTests(TestCase):
         self.assertEqual(len(response.data), 0)
         self.assertEqual(response.data, [])
     
-    @patch('orders.models.Orders.objects.filter')
+    @patch('orders.views.keyset_paginate')
     # test_get_inventory_picklists_exception(): Test exception handling 
-    def test_get_inventory_picklists_exception(self, mock_order_filter):
-        # Arrange: Mocking orders instance to raise an exception and authenticate user
-        mock_order_filter.side_effect = Exception("Database error")
+    def test_get_inventory_picklists_exception(self, mock_paginate):
+        # Arrange: Mocking the query to raise an exception and authenticate user
+        mock_paginate.side_effect = Exception("Database error")
 
         self.client.force_authenticate(self.user)
 
@@ -633,35 +896,32 @@ class CycleTimePerOrderViewTests(APITestCase):
         # Backend URL for the InventoryPickingLogging endpoint
         self.url = reverse('cycle_time_per_order') 
 
-    @patch('orders.models.Orders.objects.all')
-    @patch('inventory.models.InventoryPicklist.objects.all')
-    @patch('inventory.models.InventoryPicklistItem.objects.all')
+    # create_order(): creates an order with the given timestamps (days ago) and a picklist whose items were picked at the given days ago
+    def create_order(self, order_id, start, end=None, ship=None, complete=None, picked=(), with_picklist=True):
+        now = timezone.now()
+        order = Orders.objects.create(
+            order_id=order_id,
+            start_timestamp=now - timedelta(days=start) if start is not None else None,
+            end_timestamp=now - timedelta(days=end) if end is not None else None,
+            ship_date=(now - timedelta(days=ship)).date() if ship is not None else None,
+        )
+        if with_picklist:
+            part = Part.objects.get_or_create(sku_color='CT-PART')[0]
+            picklist = InventoryPicklist.objects.create(
+                order_id=order, status=False,
+                picklist_complete_timestamp=now - timedelta(days=complete) if complete is not None else None,
+            )
+            for days in picked:
+                InventoryPicklistItem.objects.create(
+                    picklist_id=picklist, sku_color=part, amount=1, status=days is not None,
+                    picked_at=now - timedelta(days=days) if days is not None else None,
+                )
+        return order
+
     # test_get_fully_completed_order(): Test the successful retrieval of cycle time data for a fully completed order
-    def test_get_fully_completed_order(self, mock_picklist_item, mock_picklist, mock_orders):
-        # Arrange: Mocking Orders, InventoryPicklist, and InventoryPicklistItem models
-        mock_orders.return_value.values.return_value.filter.return_value = [
-            {
-                'order_id': 1,
-                'start_timestamp': timezone.now() - timedelta(days=5),
-                'end_timestamp': timezone.now() - timedelta(days=3),
-                'ship_date': (timezone.now() - timedelta(days=1)).date()
-            }
-        ]
-        mock_picklist.return_value.values.return_value.filter.return_value.first.return_value = {
-            'picklist_complete_timestamp': timezone.now() - timedelta(days=4),
-            'picklist_id': 1,
-            'order_id': 1
-        }
-        mock_picklist_item.return_value.values.return_value.filter.return_value.order_by.return_value = [
-            {
-                'picked_at': timezone.now() - timedelta(days=4, hours=2), 
-                'picklist_id': 1
-            },
-            {
-                'picked_at': timezone.now() - timedelta(days=6, hours=2), 
-                'picklist_id': 1
-            }
-        ]
+    def test_get_fully_completed_order(self):
+        # Arrange: Create a picked, packed and shipped order
+        self.create_order(1, start=5, end=3, ship=1, complete=4, picked=[4.1, 6.1])
 
         # Act: Make a GET request to CycleTimePerOrderView        
         response = self.client.get(self.url)
@@ -676,20 +936,10 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.data[0]['cycle_time'], 4)  
         self.assertEqual(response.data[0]['status'], 'Shipped')
 
-    @patch('orders.models.Orders.objects.all')
-    @patch('inventory.models.InventoryPicklist.objects')
     # test_get_order_with_no_picklist(): Test the case when there are no picklists available for an order
-    def test_get_order_with_no_picklist(self, mock_picklist, mock_orders):        
-        # Arrange: Mocking Orders and InventoryPicklist models to simulate no picklist
-        mock_orders.return_value.values.return_value.filter.return_value = [
-            {
-                'order_id': 1,
-                'start_timestamp': timezone.now() - timedelta(days=5),
-                'end_timestamp': timezone.now() - timedelta(days=3),
-                'ship_date': (timezone.now() - timedelta(days=1)).date()
-            }
-        ]
-        mock_picklist.all.return_value.values.return_value.filter.return_value.first.side_effect = InventoryPicklist.DoesNotExist
+    def test_get_order_with_no_picklist(self):        
+        # Arrange: Create a shipped order without picklist
+        self.create_order(1, start=5, end=3, ship=1, with_picklist=False)
         
         # Act: Make a GET request to CycleTimePerOrderView
         response = self.client.get(self.url)
@@ -698,33 +948,10 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
-    @patch('orders.models.Orders.objects')
-    @patch('inventory.models.InventoryPicklist.objects')
-    @patch('inventory.models.InventoryPicklistItem.objects')
     # test_get_order_not_fully_picked(): Test the case when an order is not fully picked
-    def test_get_order_not_fully_picked(self, mock_picklist_item, mock_picklist, mock_orders):
-        # Arrange: Mocking Orders, InventoryPicklist, and InventoryPicklistItem models where not all items are picked
-        mock_orders.all.return_value.values.return_value.filter.return_value = [
-            {
-                'order_id': 1,
-                'start_timestamp': timezone.now() - timedelta(days=5)
-            }
-        ]
-        mock_picklist.all.return_value.values.return_value.filter.return_value.first.return_value = {
-            'picklist_complete_timestamp': None,
-            'picklist_id': 1,
-            'order_id': 1
-        }
-        mock_picklist_item.all.return_value.values.return_value.filter.return_value.order_by.return_value = [
-            {
-                'picked_at': timezone.now() - timedelta(days=4), 
-                'picklist_id': 1
-            },
-            {
-                'picked_at': None, 
-                'picklist_id': 1
-            }
-        ]
+    def test_get_order_not_fully_picked(self):
+        # Arrange: Create an order with an item left to pick
+        self.create_order(1, start=5, picked=[4, None])
         
         # Act: Make a GET request to CycleTimePerOrderView
         response = self.client.get(self.url)
@@ -733,31 +960,10 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
-    @patch('orders.models.Orders.objects')
-    @patch('inventory.models.InventoryPicklist.objects')
-    @patch('inventory.models.InventoryPicklistItem.objects')
     # test_get_order_picked_but_not_packed(): Test the case when an order is picked but not packed
-    def test_get_order_picked_but_not_packed(self, mock_picklist_item, mock_picklist, mock_orders):        
-        # Arrange: Mocking Orders, InventoryPicklist, and InventoryPicklistItem models where order is picked but not packed
-        mock_orders.all.return_value.values.return_value.filter.return_value = [
-            {
-                'order_id': 1,
-                'start_timestamp': timezone.now() - timedelta(days=5),
-                'end_timestamp': None,
-                'ship_date': None
-            }
-        ]
-        mock_picklist.all.return_value.values.return_value.filter.return_value.first.return_value = {
-            'picklist_complete_timestamp': timezone.now() - timedelta(days=4),
-            'picklist_id': 1,
-            'order_id': 1,
-        }
-        mock_picklist_item.all.return_value.values.return_value.filter.return_value.order_by.return_value = [
-            {
-                'picked_at': timezone.now() - timedelta(days=4), 
-                'picklist_id': 1
-            },
-        ]
+    def test_get_order_picked_but_not_packed(self):        
+        # Arrange: Create a picked order
+        self.create_order(1, start=5, complete=4, picked=[4])
         
         # Act: Make a GET request to CycleTimePerOrderView
         response = self.client.get(self.url)
@@ -772,31 +978,10 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.data[0]['cycle_time'], 1)
         self.assertEqual(response.data[0]['status'], 'Picked')
 
-    @patch('orders.models.Orders.objects')
-    @patch('inventory.models.InventoryPicklist.objects')
-    @patch('inventory.models.InventoryPicklistItem.objects')
     # test_get_order_packed_but_not_shipped(): Test the case when an order is picked and packed but not shipped
-    def test_get_order_packed_but_not_shipped(self, mock_picklist_item, mock_picklist, mock_orders):
-        # Arrange: Mocking Orders, InventoryPicklist, and InventoryPicklistItem models where order is not shipped
-        mock_orders.all.return_value.values.return_value.filter.return_value = [
-            {
-                'order_id': 1,
-                'start_timestamp': timezone.now() - timedelta(days=5),
-                'end_timestamp': timezone.now() - timedelta(days=3),
-                'ship_date': None
-            }
-        ]
-        mock_picklist.all.return_value.values.return_value.filter.return_value.first.return_value = {
-            'picklist_complete_timestamp': timezone.now() - timedelta(days=4),
-            'picklist_id': 1,
-            'order_id': 1
-        }
-        mock_picklist_item.all.return_value.values.return_value.filter.return_value.order_by.return_value = [
-            {
-                'picked_at': timezone.now() - timedelta(days=4), 
-                'picklist_id': 1
-            }
-        ]
+    def test_get_order_packed_but_not_shipped(self):
+        # Arrange: Create a picked and packed order
+        self.create_order(1, start=5, end=3, complete=4, picked=[4])
         
         # Act: Make a GET request to CycleTimePerOrderView
         response = self.client.get(self.url)
@@ -811,34 +996,10 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.data[0]['cycle_time'], 2)
         self.assertEqual(response.data[0]['status'], 'Packed')
 
-    @patch('orders.models.Orders.objects')
-    @patch('inventory.models.InventoryPicklist.objects')
-    @patch('inventory.models.InventoryPicklistItem.objects')
     # test_get_order_with_no_picklist_timestamp__fully_picked(): Test the case when an order's picklist completion timestamp not set but all items are picked
-    def test_get_order_with_no_picklist_timestamp__fully_picked(self, mock_picklist_item, mock_picklist, mock_orders):   
-        # Arrange: Mocking Orders, InventoryPicklist, and InventoryPicklistItem models where picklist timestamp is None but all items are picked
-        mock_orders.all.return_value.values.return_value.filter.return_value = [
-            {
-                'order_id': 1,
-                'start_timestamp': timezone.now() - timedelta(days=5),
-                'end_timestamp': timezone.now() - timedelta(days=3),
-                'ship_date': (timezone.now() - timedelta(days=1)).date()
-            }
-        ]
-        mock_picklist.all.return_value.values.return_value.filter.return_value.first.return_value = {
-            'picklist_complete_timestamp': None,
-            'picklist_id': 1,
-            'order_id': 1
-
-        }
-        mock_picklist_item.all.return_value.values.return_value.filter.return_value.order_by.return_value = [
-            {
-                'picked_at': timezone.now() - timedelta(days=4, hours=2)
-            },
-            {
-                'picked_at': timezone.now() - timedelta(days=4, hours=1)
-            }
-        ]
+    def test_get_order_with_no_picklist_timestamp__fully_picked(self):   
+        # Arrange: Create a shipped order whose picklist has no completion timestamp but all its items picked
+        self.create_order(1, start=5, end=3, ship=1, picked=[4.1, 4.05])
         
         # Act: Make a GET request to CycleTimePerOrderView
         response = self.client.get(self.url)
@@ -849,22 +1010,10 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.data[0]['order_id'], 1)
         self.assertEqual(response.data[0]['status'], 'Shipped')
 
-    @patch('orders.models.Orders.objects')
-    @patch('inventory.models.InventoryPicklist.objects')
     # test_get_order_past_month(): Test the case when an order is older than the past month
-    def test_get_order_past_month(self, mock_picklist, mock_orders):
-        # Arrange: Mocking Orders, InventoryPicklist, and InventoryPicklistItem models where order is older the past month       
-        mock_orders.all.return_value.values.return_value.filter.return_value = [
-            {
-                'order_id': 1,
-                'start_timestamp': timezone.now() - timedelta(days=35)
-            }
-        ]
-        mock_picklist.all.return_value.values.return_value.filter.return_value.first.return_value = {
-            'picklist_complete_timestamp': timezone.now() - timedelta(days=32),
-            'picklist_id': 1,
-            'order_id': 1
-        }
+    def test_get_order_past_month(self):
+        # Arrange: Create an order picked more than a month ago
+        self.create_order(1, start=35, complete=32)
         
         # Act: Make a GET request to CycleTimePerOrderView
         response = self.client.get(self.url)
@@ -873,12 +1022,8 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
-    @patch('orders.models.Orders.objects')
     # test_no_orders_found(): Test the case when no orders are found
-    def test_no_orders_found(self, mock_orders):
-        # Arrange: Mocking Orders to return an empty list
-        mock_orders.all.return_value.values.return_value.filter.return_value = []
-        
+    def test_no_orders_found(self):
         # Act: Make a GET request to CycleTimePerOrderView
         response = self.client.get(self.url)
         
@@ -886,6 +1031,202 @@ class CycleTimePerOrderViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
+    # test_milestones_follow_picking_and_shipping(): Test that picking the last item, packing and shipping update the milestones
+    def test_milestones_follow_picking_and_shipping(self):
+        # Arrange: Create an order with an item left to pick
+        order = self.create_order(1, start=3, picked=[2, None])
+        self.assertEqual(len(self.client.get(self.url).data), 0)
+
+        # Act: Pick the last item, then pack and ship the order
+        item = InventoryPicklistItem.objects.get(picked_at__isnull=True)
+        item.status = True
+        item.picked_at = timezone.now() - timedelta(days=1)
+        item.save()
+        picked = self.client.get(self.url).data
+        order.end_timestamp = timezone.now()
+        order.ship_date = timezone.now().date()
+        order.save(update_fields=['end_timestamp', 'ship_date'])
+        shipped = self.client.get(self.url).data
+
+        # Assert: Check the milestones after each step
+        self.assertEqual([(x['status'], x['pick_time']) for x in picked], [('Picked', 2)])
+        self.assertEqual([(x['status'], x['pack_time'], x['cycle_time']) for x in shipped], [('Shipped', 1, 3)])
+
+    # test_get_constant_queries(): Test that the endpoint issues the same queries whatever the number of orders
+    def test_get_constant_queries(self):
+        # Arrange: Create one fully picked order
+        self.create_order(1, start=5, complete=4)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+
+        # Act: Add 20 orders and query again
+        for order_id in range(2, 22):
+            self.create_order(order_id, start=5, complete=4)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+
+        # Assert: Check the number of queries and of orders
+        self.assertEqual(len(response.data), 21)
+        self.assertEqual(len(few), len(many))
+
+    # test_backfill_order_milestones(): Test that the management command rebuilds milestones changed in bulk
+    def test_backfill_order_milestones(self):
+        # Arrange: Create a fully picked order and mark it packed with a bulk update (no signal)
+        self.create_order(1, start=5, complete=4)
+        Orders.objects.filter(order_id=1).update(end_timestamp=timezone.now())
+        OrderMilestones.objects.all().delete()
+
+        # Act: Run the backfill command
+        out = StringIO()
+        call_command('backfill_order_milestones', batch_size=1, stdout=out)
+        response = self.client.get(self.url)
+
+        # Assert: Check that the milestones are rebuilt
+        self.assertIn("Backfilled the milestones of 1 orders", out.getvalue())
+        self.assertEqual(response.data[0]['status'], 'Packed')
+        self.assertEqual(response.data[0]['pack_time'], 4)
+
+class OrderMilestonesMigrationTests(TransactionTestCase):
+    # test_migration_backfills_existing_orders(): Test that migrating a database with picked orders gives them cycle times
+    def test_migration_backfills_existing_orders(self):
+        # Arrange: Go back to the schema before the backfill and create picked orders with the models of that time
+        before = [('orders', '0013_ordermilestones'), ('inventory', '0019_pick_counters')]
+        after = [('orders', '0014_backfill_ordermilestones')]
+        executor = MigrationExecutor(connection)
+        executor.migrate(before)
+        apps = executor.loader.project_state(before).apps
+        HistoricalOrders = apps.get_model('orders', 'Orders')
+        HistoricalPicklist = apps.get_model('inventory', 'InventoryPicklist')
+        now = timezone.now()
+        for order_id in (1, 2):
+            order = HistoricalOrders.objects.create(order_id=order_id, status='In Progress', start_timestamp=now - timedelta(days=5), end_timestamp=now)
+            HistoricalPicklist.objects.create(order_id=order, status=True, picklist_complete_timestamp=now - timedelta(days=4))
+        HistoricalOrders.objects.create(order_id=3, status='Not Started')
+        self.assertEqual(apps.get_model('orders', 'OrderMilestones').objects.count(), 0)
+
+        # Act: Apply the migration
+        executor = MigrationExecutor(connection)
+        executor.migrate(after)
+
+        # Assert: Check that every order has its milestones, with cycle times for the picked ones
+        cycle_times = dict(OrderMilestones.objects.values_list('order_id', 'cycle_time'))
+        self.assertEqual(cycle_times, {1: 5, 2: 5, 3: None})
+
+class CycleTimePerOrderPreviewTests(APITestCase):
+    # setUp(): used to set up values shared between tests.
+    def setUp(self):
+        # Create a test user with test values
+        self.user = users.objects.create_user(
+            first_name='Test',
+            last_name='Admin',
+            username="admin",
+            password="adminpassword",
+            email="admin@example.com",
+            date_of_hire='1990-01-01',
+            department='Testing',
+            role='admin',
+            is_staff=False,
+            theme_preference='light'
+        )
+
+        # Create an API client instance
+        self.client = APIClient()
+
+        # Authenticate the user
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        # Backend URL for the CycleTimePerOrderPreview endpoint
+        self.url = reverse('ctpo_preview')
+        self.today = timezone.now().date()
+
+        # Create orders started 10 days ago and one that was never started
+        self.started = timezone.now() - timedelta(days=10)
+        for order_id in range(1, 4):
+            Orders.objects.create(order_id=order_id, start_timestamp=self.started)
+        Orders.objects.create(order_id=4)
+
+    # day(): returns the entry of the given day of the preview
+    def day(self, data, days_ago):
+        return next(x for x in data if x['day'] == self.today - timedelta(days=days_ago))
+
+    # test_preview_counts_per_day(): Test that the picked, packed and shipped orders are counted on the right days
+    def test_preview_counts_per_day(self):
+        # Arrange: A shipped, a packed and a picked order
+        cycle_times = [
+            {"order_id": 1, "pick_time": 2, "pack_time": 3, "ship_time": 1, "status": "Shipped"},
+            {"order_id": 2, "pick_time": 2, "pack_time": 1, "ship_time": 0, "status": "Packed"},
+            {"order_id": 3, "pick_time": 4, "pack_time": 0, "ship_time": 0, "status": "Picked"},
+        ]
+
+        # Act: Post the cycle times to CycleTimePerOrderPreview
+        response = self.client.post(self.url, cycle_times, format='json')
+
+        # Assert: Check the default 30 day window and the counts
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 31)
+        self.assertEqual(response.data[0]['day'], self.today - timedelta(days=30))
+        self.assertEqual(response.data[-1]['day'], self.today)
+        self.assertEqual(self.day(response.data, 8), {"day": self.today - timedelta(days=8), "picked": 2, "packed": 0, "shipped": 0})
+        self.assertEqual(self.day(response.data, 6)['picked'], 1)
+        self.assertEqual(self.day(response.data, 7)['packed'], 1)
+        self.assertEqual(self.day(response.data, 5)['packed'], 1)
+        self.assertEqual(self.day(response.data, 4)['shipped'], 1)
+        self.assertEqual(sum(x['picked'] + x['packed'] + x['shipped'] for x in response.data), 6)
+
+    # test_preview_window(): Test that the window can be moved and resized with the days and end parameters
+    def test_preview_window(self):
+        # Arrange: An order picked 8 days ago
+        cycle_times = [{"order_id": 1, "pick_time": 2, "status": "Picked"}]
+        end = self.today - timedelta(days=7)
+
+        # Act: Preview the 3 days up to a week ago, and the 5 last days
+        before = self.client.post(f"{self.url}?days=3&end={end.isoformat()}", cycle_times, format='json')
+        after = self.client.post(f"{self.url}?days=5", cycle_times, format='json')
+
+        # Assert: Check that the pick is only counted inside the window
+        self.assertEqual([x['day'] for x in before.data], [end - timedelta(days=3 - x) for x in range(4)])
+        self.assertEqual(sum(x['picked'] for x in before.data), 1)
+        self.assertEqual(len(after.data), 6)
+        self.assertEqual(sum(x['picked'] for x in after.data), 0)
+
+    # test_preview_skips_unknown_orders(): Test that unknown and not started orders are ignored
+    def test_preview_skips_unknown_orders(self):
+        # Act: Post the cycle time of a missing and of a not started order
+        response = self.client.post(self.url, [
+            {"order_id": 999, "pick_time": 1, "status": "Picked"},
+            {"order_id": 4, "pick_time": 1, "status": "Picked"},
+        ], format='json')
+
+        # Assert: Check that nothing is counted
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(x['picked'] for x in response.data), 0)
+
+    # test_preview_invalid_input(): Test that an invalid body or window is rejected
+    def test_preview_invalid_input(self):
+        # Act: Post an object, then a list with an invalid window
+        not_a_list = self.client.post(self.url, {"order_id": 1}, format='json')
+        bad_days = self.client.post(f"{self.url}?days=0", [], format='json')
+        bad_end = self.client.post(f"{self.url}?end=yesterday", [], format='json')
+
+        # Assert: Check that the requests are rejected
+        self.assertEqual(not_a_list.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(bad_days.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(bad_end.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # test_preview_constant_queries(): Test that the start dates of all the orders are loaded in one query
+    def test_preview_constant_queries(self):
+        # Arrange: The cycle times of 3 orders
+        cycle_times = [{"order_id": x, "pick_time": 1, "status": "Picked"} for x in range(1, 4)]
+
+        # Act: Post them to CycleTimePerOrderPreview
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, cycle_times, format='json')
+
+        # Assert: Check the number of queries on the orders
+        self.assertEqual(sum(x['picked'] for x in response.data), 3)
+        self.assertEqual(len([x for x in queries if 'FROM "orders_orders"' in x['sql']]), 1)
+
 class OrdersViewTests(TestCase):
     def setUp(self):
         # Create a client instance and setup url
@@ -907,33 +1248,26 @@ class OrdersViewTests(TestCase):
         )
         
         # Sample test data
-        self.test_data = [
-            (1, 120, 'Pending', '2023-12-31', None),
-            (2, 60, 'In Progress', '2023-12-15', '2023-12-01 10:00:00')
-        ]
-        
-    @patch('django.db.connection.cursor')
-    # test_get_orders_success(): Test the successful retrieval of orders
-    def test_get_orders_success(self, mock_cursor_func):
-        # Arrange: Mocking database cursor and connection, and authenticate user
-        mock_cursor = MagicMock()
-        mock_cursor.execute.return_value = None
-        mock_cursor.fetchall.return_value = self.test_data
-        
-        mock_cursor_func.return_value.__enter__.return_value = mock_cursor
-        
+        Orders.objects.create(order_id=1, estimated_duration=120, status='Not Started', due_date='2023-12-31', customer_name='Acme Corp', project_type='SDR')
+        Orders.objects.create(order_id=2, estimated_duration=60, status='In Progress', due_date='2023-12-15',
+                              start_timestamp=timezone.make_aware(datetime(2023, 12, 1, 10, 0)), customer_name='Globex', project_type='WW')
+        Orders.objects.create(order_id=3, estimated_duration=90, status='In Progress', due_date='2023-12-15', customer_name='Acme Inc', project_type='sdr')
+        Orders.objects.create(order_id=4, estimated_duration=30, status='Completed', due_date=None, customer_name='Initech', project_type='WR')
+
+    # test_get_orders_success(): Test the successful retrieval of orders, sorted by due date then order id
+    def test_get_orders_success(self):
+        # Arrange: authenticate user
         self.client.force_authenticate(user=self.user)
-        
+
         # Act: Make a GET request to OrdersView
         response = self.client.get(self.url)
-        
-        # Assert: Check response status and data
+
+        # Assert: Check response status and data (orders without due date come last)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data[0]['order_id'], 1)
-        self.assertEqual(response.data[1]['status'], 'In Progress')
-        mock_cursor.execute.assert_called_once()
-    
+        self.assertEqual([x['order_id'] for x in response.data], [2, 3, 1, 4])
+        self.assertEqual(response.data[0]['status'], 'In Progress')
+        self.assertEqual(response.data[0]['customer_name'], 'Globex')
+
     # test_get_orders_unauthenticated(): Test the case when user is not authenticated
     def test_get_orders_unauthenticated(self):
         # Act: Make a GET request to OrdersView without authentication
@@ -958,14 +1292,11 @@ class OrdersViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(response.data['detail'], "You do not have permission to perform this action.")
     
-    @patch('django.db.connection.cursor')
+    @patch('orders.views.keyset_paginate')
     # test_get_orders_database_error(): Test the case when there is a database error
-    def test_get_orders_database_error(self, mock_cursor_func):
+    def test_get_orders_database_error(self, mock_paginate):
         # Arrange: Mock database to raise an exception and authenticate user
-        mock_cursor = MagicMock()
-        mock_cursor.execute.side_effect = Exception("Database error")
-        mock_cursor_func.return_value.__enter__.return_value = mock_cursor
-        
+        mock_paginate.side_effect = Exception("Database error")
         self.client.force_authenticate(user=self.user)
 
         # Act: Make a GET request to OrdersView
@@ -975,16 +1306,10 @@ class OrdersViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertEqual(response.data['error'], "Database error")
     
-    @patch('django.db.connection.cursor')
-    # test_empty_result_set(): Test handling of empty result set from database
-    def test_get_orders_empty_result_set(self, mock_cursor_func):
-        # Arrange: Mock empty database result and authenticate user
-        mock_cursor = MagicMock()
-        mock_cursor.execute.return_value = None
-        mock_cursor.fetchall.return_value = []
-        
-        mock_cursor_func.return_value.__enter__.return_value = mock_cursor
-        
+    # test_get_orders_empty_result_set(): Test handling of empty result set from database
+    def test_get_orders_empty_result_set(self):
+        # Arrange: Remove all orders and authenticate user
+        Orders.objects.all().delete()
         self.client.force_authenticate(user=self.user)
         
         # Act: Make a GET request to OrdersView
@@ -994,26 +1319,212 @@ class OrdersViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
 
-    @patch('django.db.connection.cursor')
-    # test_get_orders_null_start_timestamp_handling(): Test proper handling of NULL start_timestamp values
-    def test_null_start_timestamp_handling(self, mock_cursor_func):
-        # Arrange: Mock database to return NULL start_timestamp and authenticate user
-        test_data = [(3, 90, 'Pending', '2023-12-20', None)]
-        
-        mock_cursor = MagicMock()
-        mock_cursor.execute.return_value = None
-        mock_cursor.fetchall.return_value = test_data
-        
-        mock_cursor_func.return_value.__enter__.return_value = mock_cursor
-        
+    # test_null_start_timestamp_handling(): Test proper handling of NULL start_timestamp values
+    def test_null_start_timestamp_handling(self):
+        # Arrange: authenticate user
         self.client.force_authenticate(user=self.user)
 
         # Act: Make a GET request to OrdersView
-        response = self.client.get(self.url)
+        response = self.client.get(self.url, {'sort': 'order_id'})
         
         # Assert: Check response status and data
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsNone(response.data[0]['start_timestamp'])
+        self.assertIsNotNone(response.data[1]['start_timestamp'])
+
+    # test_get_orders_filters(): Test the status, due date range, customer name and project type filters
+    def test_get_orders_filters(self):
+        # Arrange: authenticate user
+        self.client.force_authenticate(user=self.user)
+
+        # Act: Make GET requests with every filter
+        by_status = self.client.get(self.url, {'status': 'Not Started,Completed'})
+        by_due_date = self.client.get(self.url, {'due_after': '2023-12-16', 'due_before': '2023-12-31'})
+        by_customer = self.client.get(self.url, {'customer_name': 'acme'})
+        by_project = self.client.get(self.url, {'project_type': 'SDR', 'status': 'In Progress'})
+
+        # Assert: Check that only the matching orders are returned
+        self.assertEqual([x['order_id'] for x in by_status.data], [1, 4])
+        self.assertEqual([x['order_id'] for x in by_due_date.data], [1])
+        self.assertEqual([x['order_id'] for x in by_customer.data], [3, 1])
+        self.assertEqual([x['order_id'] for x in by_project.data], [3])
+
+    # test_get_orders_sort(): Test the selectable sort orders
+    def test_get_orders_sort(self):
+        # Arrange: authenticate user
+        self.client.force_authenticate(user=self.user)
+
+        # Act: Make GET requests with the descending sorts
+        by_due_date = self.client.get(self.url, {'sort': '-due_date'})
+        by_order_id = self.client.get(self.url, {'sort': '-order_id'})
+
+        # Assert: Check the order of the results
+        self.assertEqual([x['order_id'] for x in by_due_date.data], [4, 1, 3, 2])
+        self.assertEqual([x['order_id'] for x in by_order_id.data], [4, 3, 2, 1])
+
+    # test_get_orders_keyset_pagination(): Test that following next_cursor walks every order exactly once, in both directions
+    def test_get_orders_keyset_pagination(self):
+        # Arrange: authenticate user
+        self.client.force_authenticate(user=self.user)
+
+        for sort, expected in [('due_date', [2, 3, 1, 4]), ('-due_date', [4, 1, 3, 2])]:
+            # Act: Fetch the pages two orders at a time
+            seen, cursor, pages = [], None, 0
+            while True:
+                query = {'sort': sort, 'limit': 2}
+                if cursor:
+                    query['cursor'] = cursor
+                response = self.client.get(self.url, query)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                seen += [x['order_id'] for x in response.data['results']]
+                cursor = response.data['next_cursor']
+                pages += 1
+                if cursor is None:
+                    break
+
+            # Assert: Check that the pages cover the sorted orders without gap or duplicate
+            self.assertEqual(seen, expected)
+            self.assertEqual(pages, 2)
+
+    # test_get_orders_pagination_without_due_date(): Test the pages whose cursor is an order without due date
+    def test_get_orders_pagination_without_due_date(self):
+        # Arrange: authenticate user and add a second order without due date
+        self.client.force_authenticate(user=self.user)
+        Orders.objects.create(order_id=5, status='Not Started', due_date=None)
+
+        for sort, expected in [('due_date', [2, 3, 1, 4, 5]), ('-due_date', [5, 4, 1, 3, 2])]:
+            # Act: Fetch the pages one order at a time
+            seen, cursor = [], None
+            while True:
+                response = self.client.get(self.url, {'sort': sort, 'limit': 1, **({'cursor': cursor} if cursor else {})})
+                seen += [x['order_id'] for x in response.data['results']]
+                cursor = response.data['next_cursor']
+                if cursor is None:
+                    break
+
+            # Assert: Check that the orders without due date are served last ascending and first descending
+            self.assertEqual(seen, expected)
+
+    # test_get_orders_page_query_count():Test that a page is fetched in one query whatever the cursor position
+    def test_get_orders_page_query_count(self):
+        # Arrange: authenticate user and get the cursor of the second page
+        self.client.force_authenticate(user=self.user)
+        cursor = self.client.get(self.url, {'limit': 1}).data['next_cursor']
+
+        # Act: Fetch the second page while capturing the queries
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'limit': 1, 'cursor': cursor})
+
+        # Assert: Check the page content and that OFFSET is never used
+        self.assertEqual([x['order_id'] for x in response.data['results']], [3])
+        order_queries = [q['sql'] for q in queries if 'FROM "orders_orders"' in q['sql']]
+        self.assertEqual(len(order_queries), 1)
+        self.assertNotIn('OFFSET', order_queries[0])
+
+    # test_get_orders_page_query_plan(): Test that the page after a cursor is one index range scan on (due_date, order_id)
+    def test_get_orders_page_query_plan(self):
+        # Arrange: authenticate user and get the cursor of the second page
+        self.client.force_authenticate(user=self.user)
+        cursor = self.client.get(self.url, {'limit': 1}).data['next_cursor']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'limit': 1, 'cursor': cursor})
+        sql = next(q['sql'] for q in queries if 'FROM "orders_orders"' in q['sql'])
+
+        # Act: Explain the page query (the test table is too small for the planner to prefer the index by itself)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+
+        # Assert: Check that the cursor is the condition of the index scan, without an OR to filter
+        self.assertRegex(plan, r"Index Cond: .*ROW\(due_date, order_id\) > ROW\(")
+        self.assertNotIn(' OR ', plan)
+        self.assertNotIn('Sort', plan)
+
+    # test_get_orders_stream(): Test that the streaming mode returns the same filtered and sorted array
+    def test_get_orders_stream(self):
+        # Arrange: authenticate user
+        self.client.force_authenticate(user=self.user)
+        query = {'sort': '-due_date', 'status': 'In Progress,Completed'}
+        expected = self.client.get(self.url, query).json()
+
+        # Act: Make a streaming GET request
+        response = self.client.get(self.url, {**query, 'stream': 'true'})
+
+        # Assert: Check that the streamed JSON matches the regular response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), expected)
+        self.assertEqual([x['order_id'] for x in expected], [4, 3, 2])
+
+    # test_get_orders_not_modified(): Test that an unchanged refresh returns 304 after one lookup, and a bulk update invalidates it
+    def test_get_orders_not_modified(self):
+        # Arrange: authenticate user and get the current ETag
+        self.client.force_authenticate(user=self.user)
+        first = self.client.get(self.url)
+        etag = first['ETag']
+
+        # Act: Refresh with If-None-Match while capturing the queries
+        with CaptureQueriesContext(connection) as queries:
+            refresh = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        # Assert: Check the 304 and that only the version was read (from the cache)
+        self.assertEqual(refresh.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        # Act: Change the orders with a bulk update (no signals), rolled back first then committed, and refresh again
+        with transaction.atomic():
+            Orders.objects.filter(order_id=1).update(status='Completed')
+            transaction.set_rollback(True)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            Orders.objects.filter(order_id=1).update(status='In Progress')
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        # Assert: Check that the new data is returned with a new ETag
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertIn('Last-Modified', changed)
+        self.assertEqual([x['status'] for x in changed.data if x['order_id'] == 1], ['In Progress'])
+
+        # Assert: Check that the ETag depends on the filters
+        filtered = self.client.get(self.url, {'status': 'Completed'}, HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(filtered.status_code, status.HTTP_200_OK)
+
+    # test_get_orders_invalid_parameters(): Test that invalid sort, dates, limit and cursor are rejected
+    def test_get_orders_invalid_parameters(self):
+        # Arrange: authenticate user
+        self.client.force_authenticate(user=self.user)
+
+        # Act & Assert: Check that every invalid parameter returns 400
+        for query in [{'sort': 'customer_name'}, {'due_after': '31-12-2023'}, {'limit': 0}, {'limit': 'ten'}, {'cursor': 'not-a-cursor'}]:
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+            self.assertIn('error', response.data)
+
+class TableVersionTests(TransactionTestCase):
+    # test_concurrent_writes_do_not_wait(): Test that two transactions writing the same versioned table do not wait on each other
+    def test_concurrent_writes_do_not_wait(self):
+        # Arrange: Create two orders and open a second session, standing for another request
+        Orders.objects.create(order_id=1, status='Not Started')
+        Orders.objects.create(order_id=2, status='Not Started')
+        other = connections.create_connection('default')
+        self.addCleanup(other.close)
+        etag = table_versions(RequestFactory().get('/'), ['orders_orders'])[0]
+
+        # Act: Update an order in a transaction left open by the other session, then another order here
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute("UPDATE orders_orders SET status = 'In Progress' WHERE order_id = 1")
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = '1s'")
+            Orders.objects.filter(order_id=2).update(status='In Progress')
+
+        # Assert: Check that the update did not wait for the other transaction and bumped the version on commit
+        self.assertNotEqual(table_versions(RequestFactory().get('/'), ['orders_orders'])[0], etag)
+        other.rollback()
 
 class StartOrderViewTests(TestCase):
     def setUp(self):
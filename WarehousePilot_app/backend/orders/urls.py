@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import GenerateInventoryAndManufacturingListsView
+from .views import GenerateInventoryAndManufacturingListsView, BatchGenerateInventoryAndManufacturingListsView, ListGenerationJobView, AvailableToPromiseView
 
 from . import views
 from .views import OrdersView, StartOrderView, InventoryPicklistView, InventoryPicklistItemsView, CycleTimePerOrderView, DelayedOrders, CycleTimePerOrderPreview
@@ -7,6 +7,9 @@ from .views import OrdersView, StartOrderView, InventoryPicklistView, InventoryP
 
 urlpatterns = [
     path('generateLists/', GenerateInventoryAndManufacturingListsView.as_view(), name="generateLists"),
+    path('generateLists/batch/', BatchGenerateInventoryAndManufacturingListsView.as_view(), name="generateListsBatch"),
+    path('generateLists/jobs/<uuid:job_id>/', ListGenerationJobView.as_view(), name="generateListsJob"),
+    path('available_to_promise/', AvailableToPromiseView.as_view(), name="available_to_promise"),
     path("ordersview/", OrdersView.as_view(), name="ordersview"),
     path('start_order/<int:order_id>/', StartOrderView.as_view(), name='start_order'),
     path('inventory_picklist/', InventoryPicklistView.as_view(), name='inventory_picklist'),
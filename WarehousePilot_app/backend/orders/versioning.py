@@ -0,0 +1,148 @@
+# This file defines the conditional GET support of the list endpoints, based on the change-version of the tables they read.
+
+# bump_table_version: Increments the version of a table and records when it changed.
+# track_table_writes: Database execute wrapper bumping the version of the table a statement writes, once its transaction commits.
+# install_table_write_tracking: connection_created receiver adding track_table_writes to every database connection.
+# table_versions: Returns the ETag and the Last-Modified date of a set of tables in one cache lookup.
+# conditional_on_tables: View decorator answering 304 Not Modified when none of the tables changed since the client's copy.
+
+# The versions are counters in the "table_versions" cache (Redis, shared by every worker), so an unchanged refresh
+# costs one cache lookup instead of the full query and serialization. Every INSERT, UPDATE, DELETE or TRUNCATE run
+# through Django on a versioned table is seen by track_table_writes, so bulk_create, queryset update/delete and raw
+# SQL writes are all accounted for, and the version is bumped after the commit: a write never waits on a version row
+# locked by another transaction, and a client never gets the new version with the data from before the change.
+# Writes made outside Django (psql) are not seen.
+
+import hashlib
+import logging
+import re
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+logger = logging.getLogger('WarehousePilot_app')
+
+# tables whose changes are tracked
+VERSIONED_TABLES = {
+    "orders_orders",
+    "inventory_inventory",
+    "inventory_inventorypicklist",
+    "inventory_inventorypicklistitem",
+    "auth_app_users",
+}
+VERSION_KEY = "table_version:{table}"
+CHANGED_AT_KEY = "table_version:{table}:changed_at"
+
+# table written by a statement, as Django (and the raw SQL of the views) writes them
+_WRITE_STATEMENT = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+def _cache():
+    return caches["table_versions"]
+
+
+def bump_table_version(table):
+    key = VERSION_KEY.format(table=table)
+    try:
+        cache = _cache()
+        try:
+            cache.incr(key)
+        except ValueError:
+            # first change of the table, or the key was evicted: start from the clock so no earlier version comes back
+            if not cache.add(key, time.time_ns(), None):
+                cache.incr(key)
+        cache.set(CHANGED_AT_KEY.format(table=table), time.time(), None)
+    except Exception:
+        logger.exception("Failed to bump the version of %s", table)
+
+
+class _BumpOnCommit:
+    # on_commit callback of a table, so that a transaction writing the table many times bumps it once
+    def __init__(self, table):
+        self.table = table
+
+    def __call__(self):
+        bump_table_version(self.table)
+
+
+def track_table_writes(execute, sql, params, many, context):
+    result = execute(sql, params, many, context)
+    match = _WRITE_STATEMENT.match(sql)
+    if match and match.group(1) in VERSIONED_TABLES:
+        connection = context["connection"]
+        table = match.group(1)
+        # once per table and savepoint (atomic block) of the transaction
+        savepoints = set(connection.savepoint_ids)
+        pending = any(
+            isinstance(func, _BumpOnCommit) and func.table == table and sids == savepoints
+            for sids, func, _ in connection.run_on_commit
+        )
+        if not pending:
+            # runs at once outside a transaction, after the commit inside one, and never if it rolls back
+            transaction.on_commit(_BumpOnCommit(table), using=connection.alias)
+    return result
+
+
+def install_table_write_tracking(sender, connection, **kwargs):
+    if track_table_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_table_writes)
+
+
+def table_versions(request, tables):
+    """
+    Return (etag, last_modified) for the given tables and the requested URL.
+    The result is kept on the request, the etag and last modified functions of condition() share one lookup.
+    If the cache cannot be reached both are None and the view answers normally.
+    """
+    cached = getattr(request, "_table_versions", None)
+    if cached is None:
+        try:
+            values = _cache().get_many([VERSION_KEY.format(table=table) for table in tables] + [CHANGED_AT_KEY.format(table=table) for table in tables])
+            versions = {}
+            for table in tables:
+                key = VERSION_KEY.format(table=table)
+                if key not in values:
+                    # never changed since the cache was emptied
+                    _cache().add(key, time.time_ns(), None)
+                    values[key] = _cache().get(key)
+                versions[table] = values[key]
+            changed_at = [values[CHANGED_AT_KEY.format(table=table)] for table in tables if CHANGED_AT_KEY.format(table=table) in values]
+            key = request.get_full_path() + "|" + ",".join(f"{table}:{versions[table]}" for table in tables)
+            cached = (
+                hashlib.md5(key.encode()).hexdigest(),
+                datetime.fromtimestamp(max(changed_at), dt_timezone.utc) if changed_at else None,
+            )
+        except Exception:
+            logger.exception("Failed to read the versions of %s", ", ".join(tables))
+            cached = (None, None)
+        request._table_versions = cached
+    return cached
+
+
+def conditional_on_tables(*tables):
+    """
+    Decorator for the GET handlers reading `tables`: sets the ETag and Last-Modified headers
+    and returns 304 Not Modified when the client's If-None-Match / If-Modified-Since are still valid.
+    Use method_decorator() on APIView methods.
+    """
+    def etag(request, *args, **kwargs):
+        return table_versions(request, tables)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return table_versions(request, tables)[1]
+
+    def decorator(func):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(func)
+
+        @wraps(func)
+        def inner(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            # always revalidate, the browser must not reuse its copy without asking (heuristic freshness from Last-Modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
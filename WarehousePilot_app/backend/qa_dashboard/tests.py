@@ -10,6 +10,7 @@ This test suite verifies the following endpoints:
 - QAErrorListView: Ensures only authorized users (QA or Manager) can view error reports.
 - ResolveQAErrorView: Checks that managers can resolve error reports, while unauthorized users are prevented.
 - SendToPickAndPackView: Verifies that tasks in progress are correctly marked as “pick and pack” and that errors are returned when orders are missing or task status is invalid.
+- TaskStageEvent: Checks that the QA views end and start the stage events of the tasks.
 """
 
 from datetime import date
@@ -18,7 +19,7 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 
 from auth_app.models import users
-from manufacturingLists.models import ManufacturingTask, QAErrorReport
+from manufacturingLists.models import ManufacturingTask, QAErrorReport, TaskStageEvent
 from orders.models import Orders
 from inventory.models import InventoryPicklist
 from parts.models import Part  # Import the Part model
@@ -338,6 +339,23 @@ class QADashboardViewsTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("No Order available", response.data.get("error", ""))
 
-
-
-
+    # TaskStageEvent tests.
+    def test_qa_views_record_stage_events(self):
+        self.client.force_authenticate(user=self.qa_user)
+        task_id = self.task_in_progress.manufacturing_task_id
+        self.client.post(reverse('report_qa_error'), {"manufacturing_task_id": task_id, "subject": "Scratch"}, format='json')
+        self.client.post(reverse('update_qa_status'), {"manufacturing_task_id": task_id, "status": "in progress"}, format='json')
+        self.client.post(reverse('send_to_pick_and_pack'), {"manufacturing_task_id": task_id}, format='json')
+
+        events = list(TaskStageEvent.objects.filter(task_id=task_id).order_by("id"))
+        # the final QA started before the events were recorded, its event is created when it ends
+        self.assertEqual([x.stage for x in events], ["final_qa", "error", "final_qa"])
+        self.assertTrue(all(x.ended_at is not None and x.employee_id == self.qa_user.user_id for x in events))
+        self.assertIsNone(events[0].started_at)
+        self.assertEqual(events[1].started_at, events[0].ended_at)
+
+    def test_update_qa_task_without_status_change_records_nothing(self):
+        self.client.force_authenticate(user=self.qa_user)
+        data = {"manufacturing_task_id": self.task_in_progress.manufacturing_task_id, "prod_qa": "completed"}
+        self.client.post(reverse('update_qa_task'), data, format='json')
+        self.assertFalse(TaskStageEvent.objects.exists())
@@ -5,12 +5,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework import status
 from django.db.models import Q
+from django.db import transaction
 import logging
 
 
 from manufacturingLists.models import ManufacturingTask, QAErrorReport
+from manufacturingLists.stage_events import record_status_change
 from inventory.models import InventoryPicklist
 from orders.models import Orders
+from backend.live_events import publish_event
+from backend.async_views import AsyncAPIView, api_response
 
 logger = logging.getLogger('WarehousePilot_app')
 
@@ -24,21 +28,19 @@ class QADashboardView(APIView):
         return Response({"message": "Hello QA Dashboard! This is a placeholder."})
 
 
-class QAManufacturingTasksView(APIView):
+class QAManufacturingTasksView(AsyncAPIView):
     """
     Returns the list of manufacturing tasks assigned to the QA user.
-    
+    Async (QA's hot path), served by the ASGI application.
     """
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         try:
             user = request.user
             # Check if the user is QA
             if not hasattr(user, "role") or getattr(user, "role", "").lower() != "qa":
                 logger.error("Unauthorized access - User is not a QA employee")
-                return Response({"error": "Unauthorized: User is not a QA staff member."},
+                return api_response({"error": "Unauthorized: User is not a QA staff member."},
                                 status=status.HTTP_403_FORBIDDEN)
             # Get tasks where the user is assigned as production QA or paint QA
             tasks = ManufacturingTask.objects.filter(
@@ -46,7 +48,7 @@ class QAManufacturingTasksView(APIView):
                 Q(paint_qa_employee_id=user.user_id)
             )
             response_data = []
-            for task in tasks:
+            async for task in tasks.aiterator():
                 task_status = task.status.strip().lower() if task.status else ""
                 final_qa = "pending" if task_status == "in progress" else ("completed" if task_status == "pick and pack" else "n/a")
                 response_data.append({
@@ -60,10 +62,10 @@ class QAManufacturingTasksView(APIView):
                     "final_qa": final_qa,
                 })
             logger.info("Successfully retrieved QA tasks for user %s", user.user_id)
-            return Response(response_data, status=status.HTTP_200_OK)
+            return api_response(response_data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error("Error retrieving QA tasks for user %s: %s", user.user_id, str(e))
-            return Response({"error": "An unexpected error occurred."},
+            return api_response({"error": "An unexpected error occurred."},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -82,6 +84,7 @@ class UpdateQATaskView(APIView):
             prod_qa = request.data.get("prod_qa")  # Expected: "completed" or "pending"
             paint_qa = request.data.get("paint_qa")  # Expected: "completed" or "pending"
             task = ManufacturingTask.objects.get(manufacturing_task_id=task_id)
+            previous_status = task.status
             if prod_qa in ["completed", "pending"]:
                 task.prod_qa = (prod_qa == "completed")
             if paint_qa in ["completed", "pending"]:
@@ -91,7 +94,10 @@ class UpdateQATaskView(APIView):
                 task.status = "in progress"
             else:
                 task.status = "in progress"  
-            task.save()
+            with transaction.atomic():
+                task.save()
+                record_status_change(task, previous_status, request.user)
+            publish_event("task_stage_changed", task_id=task.manufacturing_task_id, status=task.status)
             logger.info("QA task %s updated successfully", task_id)
             return Response({"message": "QA task updated successfully."}, status=status.HTTP_200_OK)
         except ManufacturingTask.DoesNotExist:
@@ -115,15 +121,19 @@ class ReportQAErrorView(APIView):
             subject = request.data.get("subject")
             comment = request.data.get("comment")
             task = ManufacturingTask.objects.get(manufacturing_task_id=task_id)
+            previous_status = task.status
             # Mark the task as 'Error'
             task.status = "error"
-            task.save()
-            QAErrorReport.objects.create(
+            with transaction.atomic():
+                task.save()
+                record_status_change(task, previous_status, request.user)
+            report = QAErrorReport.objects.create(
                 manufacturing_task=task,
                 subject=subject,
                 comment=comment,
                 reported_by=request.user
             )
+            publish_event("qa_error_raised", task_id=task.manufacturing_task_id, error_id=report.id, subject=subject)
             logger.info("QA error reported for task %s", task_id)
             return Response({"message": "QA error reported."}, status=status.HTTP_200_OK)
         except ManufacturingTask.DoesNotExist:
@@ -149,11 +159,15 @@ class UpdateQAStatusView(APIView):
                 logger.error("Missing task_id or status")
                 return Response({"error": "Missing task_id or status"}, status=status.HTTP_400_BAD_REQUEST)
             task = ManufacturingTask.objects.get(manufacturing_task_id=task_id)
+            previous_status = task.status
             if task.status.strip().lower() != "error":
                 logger.error("Task %s status is not 'error'", task_id)
                 return Response({"error": "Task status must be 'error' to update."}, status=status.HTTP_400_BAD_REQUEST)
             task.status = new_status
-            task.save()
+            with transaction.atomic():
+                task.save()
+                record_status_change(task, previous_status, request.user)
+            publish_event("task_stage_changed", task_id=task.manufacturing_task_id, status=task.status)
             logger.info("Task %s status updated to %s", task_id, new_status)
             return Response({"message": f"Task status updated to '{new_status}'."}, status=status.HTTP_200_OK)
         except ManufacturingTask.DoesNotExist:
@@ -244,11 +258,15 @@ class SendToPickAndPackView(APIView):
             if not task_id:
                 return Response({"error": "manufacturing_task_id is required."}, status=status.HTTP_400_BAD_REQUEST)
             task = ManufacturingTask.objects.get(manufacturing_task_id=task_id)
+            previous_status = task.status
             if task.status.strip().lower() != "in progress":
                 return Response({"error": "Task QA is not in progress."}, status=status.HTTP_400_BAD_REQUEST)
             # Update final QA: mark task as "pick and pack"
             task.status = "pick and pack"
-            task.save()
+            with transaction.atomic():
+                task.save()
+                record_status_change(task, previous_status, request.user)
+            publish_event("task_stage_changed", task_id=task.manufacturing_task_id, status=task.status)
             # Dummy order lookup: use the first available Order.(for now will be fixed later)
             order = Orders.objects.first()
             if not order:
@@ -3,9 +3,12 @@ Unit tests for the StaffManufacturingTasksView API endpoint.
 
 This file contains tests to validate the functionality of the
 StaffManufacturingTasksView, ensuring:
-- Staff users can retrieve tasks they are assigned to.
+- Staff users can retrieve tasks they are assigned to, read from the stage events, and the tasks still before
+  their step, read from the task columns.
+- An assignment changed on a task (admin) is copied to its stage events.
 - Non-staff users are denied access.
 - Unauthenticated users are denied access.
+- Completing a task stage ends its TaskStageEvent and starts the next one.
 
 
 """
@@ -14,7 +17,10 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from inventory.models import users, Part
-from manufacturingLists.models import ManufacturingTask
+from manufacturingLists.models import ManufacturingTask, TaskStageEvent
+from manufacturingLists.stage_events import start_first_stage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from parts.models import Part
 from auth_app.models import users
 from django.utils import timezone
@@ -75,6 +81,8 @@ class StaffManufacturingTasksViewTest(APITestCase):
             cutting_employee=self.staff_user,
             cutting_end_time=timezone.now() + timedelta(days=2)
         )
+        # the events of the current stage, started with the tasks like the task generation does
+        start_first_stage([self.task1, self.task2])
 
     def test_staff_user_can_access_tasks(self):
         # Authenticate as staff user
@@ -101,6 +109,59 @@ class StaffManufacturingTasksViewTest(APITestCase):
         self.assertEqual(task2["status"], "cutting")
 
 
+    def test_staff_tasks_read_the_stage_events(self):
+        self.client.force_authenticate(user=self.staff_user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('staff_manufacturing_tasks/'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the events, then the tasks for the steps not reached yet
+        self.assertEqual(len(queries), 2)
+        where = queries[0]["sql"].split(" WHERE ")[1]
+        self.assertTrue(where.startswith('("manufacturingLists_taskstageevent"."employee_id" ='), where)
+        self.assertNotIn('nesting_employee_id', where)
+        # a step listed from its event is not listed again from the columns
+        self.assertEqual([(x["manufacturing_id"], x["status"]) for x in response.data], [(self.task1.manufacturing_task_id, "nesting"), (self.task2.manufacturing_task_id, "cutting")])
+
+    def test_staff_tasks_list_steps_not_reached_yet(self):
+        # Arrange: a welder assigned to a task still at nesting (no welding event yet)
+        welder = users.objects.create_user(
+            username="welder", password="password", email="welder@example.com", role="staff",
+            date_of_hire="1990-01-01", first_name="Wel", last_name="Der", department="Manufacturing"
+        )
+        self.task1.welding_employee = welder
+        self.task1.save()
+        self.assertFalse(TaskStageEvent.objects.filter(task=self.task1, stage="welding").exists())
+
+        # Act
+        self.client.force_authenticate(user=welder)
+        response = self.client.get(reverse('staff_manufacturing_tasks/'))
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["manufacturing_id"], self.task1.manufacturing_task_id)
+        self.assertEqual(response.data[0]["qty"], 100)
+        self.assertEqual(response.data[0]["status"], "welding")
+        self.assertIsNone(response.data[0]["end_time"])
+
+    def test_assignment_is_copied_to_the_events(self):
+        other = users.objects.create_user(
+            username="otherstaff", password="password", email="otherstaff@example.com", role="staff",
+            date_of_hire="1990-01-01", first_name="Other", last_name="Staff", department="Manufacturing"
+        )
+        # reassigned in the admin
+        self.task1.nesting_employee = other
+        self.task1.save()
+
+        self.assertEqual(TaskStageEvent.objects.get(task=self.task1).employee, other)
+        self.assertEqual(TaskStageEvent.objects.get(task=self.task2).employee, self.staff_user)
+        self.client.force_authenticate(user=other)
+        self.assertEqual([x["manufacturing_id"] for x in self.client.get(reverse('staff_manufacturing_tasks/')).data], [self.task1.manufacturing_task_id])
+        self.client.force_authenticate(user=self.staff_user)
+        self.assertEqual([x["manufacturing_id"] for x in self.client.get(reverse('staff_manufacturing_tasks/')).data], [self.task2.manufacturing_task_id])
+
     def test_non_staff_user_cannot_access_tasks(self):
         # Authenticate as non-staff user
         self.client.force_authenticate(user=self.non_staff_user)
@@ -194,6 +255,19 @@ class CompleteManufacturingTaskTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()["message"], "Task status updated to cutting")
 
+    def test_complete_manufacturing_task_records_stage_events(self):
+        """Test the nesting event ends (done by the user completing it) and the bending event starts."""
+        url = reverse("complete_task", args=[self.manufacturing_task.manufacturing_task_id])
+        self.client.post(url)
+        self.client.post(url)
+
+        events = list(TaskStageEvent.objects.filter(task=self.manufacturing_task).order_by("id"))
+        self.assertEqual([(x.stage, x.employee_id) for x in events], [("nesting", self.staff_user.user_id), ("bending", self.staff_user.user_id), ("cutting", None)])
+        self.manufacturing_task.refresh_from_db()
+        self.assertEqual(events[0].ended_at, self.manufacturing_task.nesting_end_time)
+        self.assertEqual(events[1].started_at, events[0].ended_at)
+        self.assertIsNone(events[2].ended_at)
+
     def test_task_already_at_production_qa(self):
         """Test task is already at 'production_qa' and cannot move further."""
         self.manufacturing_task.status = "production_qa"
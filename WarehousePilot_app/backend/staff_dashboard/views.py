@@ -1,6 +1,10 @@
 # This file defines views for handling manufacturing tasks.
 
-# StaffManufacturingTasksView: Retrieves manufacturing tasks assigned to the logged-in staff member, categorized by process step (e.g., nesting, cutting, welding).
+# StaffManufacturingTasksView: Retrieves manufacturing tasks assigned to the logged-in staff member, categorized by process step (e.g., nesting, cutting, welding) (async).
+
+# The steps of a staff member are read from the stage events (TaskStageEvent, indexed by employee, stage and start
+# time): a task is listed once it reached a step assigned to the staff member, with the end of the step. The steps a
+# task has not reached yet have no events, they are read from the employee columns of the task (second query).
 
 
 
@@ -12,9 +16,13 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework import status
-from django.db.models import Q
+from django.db.models import F, Q
 from django.utils import timezone 
-from manufacturingLists.models import ManufacturingTask
+from django.db import transaction
+from manufacturingLists.models import ManufacturingTask, TaskStageEvent
+from manufacturingLists.stage_events import record_status_change
+from backend.live_events import publish_event
+from backend.async_views import AsyncAPIView, api_response
 import logging
 
 logger = logging.getLogger('WarehousePilot_app')
@@ -25,82 +33,84 @@ def index(request):
 
 
 import traceback
-
-class StaffManufacturingTasksView(APIView):
-    authentication_classes = [JWTAuthentication]
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request):
+from functools import reduce
+from operator import or_
+
+# the process steps (stages) a staff member can be assigned to, in the order they are listed for a task
+PROCESS_STEPS = ["nesting", "cutting", "bending", "welding", "painting"]
+# (employee field, end time field) of ManufacturingTask of each process step
+STEP_FIELDS = {
+    "nesting": ("nesting_employee_id", "nesting_end_time"),
+    "cutting": ("cutting_employee_id", "cutting_end_time"),
+    "bending": ("bending_employee_id", "bending_end_time"),
+    "welding": ("welding_employee_id", "welding_end_time"),
+    "painting": ("paint_employee_id", "paint_end_time"),
+}
+
+class StaffManufacturingTasksView(AsyncAPIView):
+    # async (staff's hot path), served by the ASGI application
+    async def get(self, request):
         try:
             user = request.user  # Logged-in user
             logger.debug(f"Logged-in user: {user}, User ID: {user.user_id}")  # Debug
 
             if getattr(user, 'role', None) != 'staff':
                 logger.error("Unauthorized access - User is not a staff member")
-                return Response(
+                return api_response(
                     {"error": "Unauthorized: User is not a staff member."},
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-            # Filter tasks where the user is assigned to any process
+            # The last pass of the user through each step of a task, with the task and its part in the same query
+            events = TaskStageEvent.objects.filter(employee=user, stage__in=PROCESS_STEPS).select_related(
+                'task__sku_color'
+            ).only(
+                'stage', 'ended_at', 'task__qty', 'task__sku_color__sku_color'
+            ).order_by('task_id', 'stage', F('started_at').desc(nulls_last=True)).distinct('task_id', 'stage')
+
+            # The tasks the user is assigned to on the task, for the steps they have not reached yet (no events)
             tasks = ManufacturingTask.objects.filter(
-                Q(nesting_employee=user) |
-                Q(bending_employee=user) |
-                Q(cutting_employee=user) |
-                Q(welding_employee=user) |
-                Q(paint_employee=user)
+                reduce(or_, [Q(**{employee_field: user.user_id}) for employee_field, _ in STEP_FIELDS.values()])
+            ).select_related('sku_color').only(
+                'qty', 'sku_color__sku_color', *[field for fields in STEP_FIELDS.values() for field in fields]
             )
-            logger.debug(f"Retrieved tasks: {tasks}")  # Debug
 
             response_data = []
+            reached = set()
 
-            for task in tasks:
+            async for event in events.aiterator():
+                task = event.task
                 logger.debug(f"Processing task {task.manufacturing_task_id}")  # Debug
-                base_task_info = {
+                reached.add((task.manufacturing_task_id, event.stage))
+                response_data.append({
                     "manufacturing_id": task.manufacturing_task_id,
                     "qty": task.qty,
                     "sku_color": task.sku_color.sku_color,  # Use `sku_color` from the `Part` model
-                }
-
-                # Add rows for each process step assigned to the user
-                if task.nesting_employee == user:
-                    response_data.append({
-                        **base_task_info,
-                        "status": "nesting",
-                        "end_time": task.nesting_end_time
-                    })
-                if task.cutting_employee == user:
-                    response_data.append({
-                        **base_task_info,
-                        "status": "cutting",
-                        "end_time": task.cutting_end_time
-                    })
-                if task.bending_employee == user:
-                    response_data.append({
-                        **base_task_info,
-                        "status": "bending",
-                        "end_time": task.bending_end_time
-                    })
-                if task.welding_employee == user:
-                    response_data.append({
-                        **base_task_info,
-                        "status": "welding",
-                        "end_time": task.welding_end_time
-                    })
-                if task.paint_employee == user:
-                    response_data.append({
-                        **base_task_info,
-                        "status": "painting",
-                        "end_time": task.paint_end_time
-                    })
+                    "status": event.stage,
+                    "end_time": event.ended_at
+                })
+
+            async for task in tasks.aiterator():
+                # Add rows for the steps assigned to the user without an event (compared by id, without loading the employees)
+                for step, (employee_field, end_time_field) in STEP_FIELDS.items():
+                    if getattr(task, employee_field) == user.user_id and (task.manufacturing_task_id, step) not in reached:
+                        response_data.append({
+                            "manufacturing_id": task.manufacturing_task_id,
+                            "qty": task.qty,
+                            "sku_color": task.sku_color.sku_color,
+                            "status": step,
+                            "end_time": getattr(task, end_time_field)
+                        })
+            # the steps of a task in the order of the process
+            response_data.sort(key=lambda x: (x["manufacturing_id"], PROCESS_STEPS.index(x["status"])))
 
             logger.debug(f"Final response data: {response_data}")  # Debug
             logger.info("Successfully retrieved all manufacturing tasks assigned to user %s", user.user_id)
-            return Response(response_data, status=status.HTTP_200_OK)
+            return api_response(response_data, status=status.HTTP_200_OK)
 
         except Exception as e:
             logger.error(f"Error: {traceback.format_exc()}")  # Full traceback
-            return Response(
+            return api_response(
                 {"error": "An unexpected error occurred."}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -110,27 +120,32 @@ class CompleteManufacturingTask(APIView):
         try:
             # Retrieve the manufacturing task by ID
             task = get_object_or_404(ManufacturingTask, manufacturing_task_id=task_id)
+            previous_status = task.status
+            now = timezone.now()
 
             # Determine the current stage and update the status accordingly
             if task.status == "nesting":
                 task.status = "bending"
-                task.nesting_end_time = timezone.now()  # Set the timestamp for nesting
+                task.nesting_end_time = now  # Set the timestamp for nesting
             elif task.status == "bending":
                 task.status = "cutting"
-                task.bending_end_time = timezone.now()  # Set the timestamp for bending
+                task.bending_end_time = now  # Set the timestamp for bending
             elif task.status == "cutting":
                 task.status = "welding"  # Default to welding
-                task.cutting_end_time = timezone.now()  # Set the timestamp for cutting
+                task.cutting_end_time = now  # Set the timestamp for cutting
             elif task.status == "welding":
                 task.status = "production_qa"
-                task.welding_end_time = timezone.now()  # Set the timestamp for welding
+                task.welding_end_time = now  # Set the timestamp for welding
                 task.prod_qa = True  # Ensure the 'prod_qa' field is updated
             elif task.status == "production_qa":
                 logger.warning("Task %s is already at the Production QA stage (CompleteManufacturingTask)", task_id)
                 return JsonResponse({"message": "Task is already at the Production QA stage!"}, status=400)
 
-            # Save the updated task status and the relevant end time
-            task.save()
+            # Save the updated task status and the relevant end time, with the stage events
+            with transaction.atomic():
+                task.save()
+                record_status_change(task, previous_status, request.user, at=now)
+            publish_event("task_stage_changed", task_id=task.manufacturing_task_id, status=task.status)
             
             logger.info("The status of task %s was successfully updated to %s", task_id, task.status)
             return JsonResponse({"message": f"Task status updated to {task.status}"}, status=200)
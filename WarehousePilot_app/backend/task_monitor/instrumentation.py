@@ -0,0 +1,180 @@
+# This file defines the instrumentation of every celery task: how long it ran, its CPU time, its SQL queries and its queue wait.
+
+# QueryStats: Database execute wrapper counting the queries of a task and their time.
+# stamp_sent_time: before_task_publish receiver adding the time a task was sent to its message headers.
+# start_measure: task_prerun receiver starting the measure of a task.
+# mark_failure: task_failure receiver marking the run of a task as failed.
+# finish_measure: task_postrun receiver adding the measures of a task to its histograms (and to TaskMetric).
+# read_histograms: Returns the histograms of every task, read by TaskMetricsView.
+
+# The workers run in separate processes (and machines), so the histograms are kept in Redis (TASK_METRICS_URL):
+# one hash per task holding the count of every bucket, the sum and the count of each measure. Every run is also
+# written to TaskMetric when TASK_METRICS_TABLE is set. The queue wait compares the clocks of the sender and the
+# worker, it is only as precise as their synchronization.
+
+import logging
+import time
+from datetime import datetime
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
+from django.conf import settings
+from django.db import connection
+import redis
+
+# a child of the app logger: this module is imported (by backend.celery) before the logging is configured
+logger = logging.getLogger('WarehousePilot_app.task_monitor')
+
+# upper bounds of the buckets of every measure, +Inf is implied
+BUCKETS = {
+    "wall_time_seconds": [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900],
+    "cpu_time_seconds": [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900],
+    "query_count": [1, 5, 10, 50, 100, 500, 1000, 5000, 10000],
+    "query_time_seconds": [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300],
+    "queue_wait_seconds": [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900],
+}
+TASKS_KEY = "task_metrics:tasks"
+SENT_AT_HEADER = "sent_at"
+
+# task id -> measures of the runs in progress in this process
+_running = {}
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.TASK_METRICS_URL)
+    return _client
+
+
+def _task_key(task_name):
+    return f"task_metrics:{task_name}"
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - started
+
+
+@before_task_publish.connect
+def stamp_sent_time(sender=None, headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(SENT_AT_HEADER, time.time())
+
+
+def _queue_wait(request, now):
+    sent_at = getattr(request, SENT_AT_HEADER, None)
+    if sent_at is None:
+        return None
+    # a task sent with a countdown or an eta waits in the queue on purpose until then
+    if request.eta:
+        eta = request.eta if isinstance(request.eta, datetime) else datetime.fromisoformat(request.eta)
+        sent_at = max(sent_at, eta.timestamp())
+    return max(now - sent_at, 0.0)
+
+
+@task_prerun.connect
+def start_measure(task_id=None, task=None, **kwargs):
+    now = time.time()
+    queries = QueryStats()
+    connection.execute_wrappers.append(queries)
+    _running[task_id] = {
+        "started_at": now,
+        "wall": time.perf_counter(),
+        "cpu": time.process_time(),
+        "queries": queries,
+        "queue_wait": _queue_wait(task.request, now),
+        "failed": False,
+    }
+
+
+@task_failure.connect
+def mark_failure(task_id=None, **kwargs):
+    if task_id in _running:
+        _running[task_id]["failed"] = True
+
+
+def _observe(pipe, key, name, value):
+    bucket = next((str(bound) for bound in BUCKETS[name] if value <= bound), "+Inf")
+    pipe.hincrby(key, f"{name}:{bucket}", 1)
+    pipe.hincrbyfloat(key, f"{name}:sum", value)
+    pipe.hincrby(key, f"{name}:count", 1)
+
+
+@task_postrun.connect
+def finish_measure(task_id=None, task=None, state=None, **kwargs):
+    run = _running.pop(task_id, None)
+    if run is None:
+        return
+    if run["queries"] in connection.execute_wrappers:
+        connection.execute_wrappers.remove(run["queries"])
+    measures = {
+        "wall_time_seconds": time.perf_counter() - run["wall"],
+        "cpu_time_seconds": time.process_time() - run["cpu"],
+        "query_count": run["queries"].count,
+        "query_time_seconds": run["queries"].time,
+        "queue_wait_seconds": run["queue_wait"],
+    }
+    failed = run["failed"] or state == "FAILURE"
+
+    if settings.TASK_METRICS_URL:
+        try:
+            key = _task_key(task.name)
+            pipe = _redis().pipeline(transaction=False)
+            pipe.sadd(TASKS_KEY, task.name)
+            for name, value in measures.items():
+                if value is not None:
+                    _observe(pipe, key, name, value)
+            pipe.hincrby(key, "failures", int(failed))
+            pipe.execute()
+        except Exception:
+            # the task itself is not affected
+            logger.exception("Failed to record the metrics of %s", task.name)
+
+    if settings.TASK_METRICS_TABLE:
+        from .models import TaskMetric
+        try:
+            TaskMetric.objects.create(
+                task_name=task.name,
+                task_id=task_id,
+                state=state or "",
+                started_at=datetime.fromtimestamp(run["started_at"]).astimezone(),
+                **{name.removesuffix("_seconds"): value for name, value in measures.items()},
+            )
+        except Exception:
+            logger.exception("Failed to write the metrics of %s", task.name)
+
+
+def read_histograms():
+    """
+    Return {task name: {"failures": n, measure: {"buckets": [(upper bound, cumulative count)], "sum", "count"}}},
+    the last upper bound being "+Inf".
+    """
+    client = _redis()
+    names = sorted(x.decode() if isinstance(x, bytes) else x for x in client.smembers(TASKS_KEY))
+    pipe = client.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(_task_key(name))
+    histograms = {}
+    for name, fields in zip(names, pipe.execute()):
+        fields = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in fields.items()}
+        histograms[name] = {"failures": int(fields.get("failures", 0))}
+        for measure, bounds in BUCKETS.items():
+            cumulative, buckets = 0, []
+            for bound in [str(x) for x in bounds] + ["+Inf"]:
+                cumulative += int(fields.get(f"{measure}:{bound}", 0))
+                buckets.append((bound, cumulative))
+            histograms[name][measure] = {
+                "buckets": buckets,
+                "sum": fields.get(f"{measure}:sum", 0.0),
+                "count": int(fields.get(f"{measure}:count", 0)),
+            }
+    return histograms
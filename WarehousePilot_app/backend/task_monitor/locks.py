@@ -0,0 +1,95 @@
+# This file defines the single-flight lock of the periodic celery tasks, so that a task never runs twice at the same time.
+
+# advisory_lock_key: The Postgres advisory lock key of a task name.
+# single_flight: Decorator of a bound celery task running it under its lock and recording the run (TaskRun).
+
+# The lock is a session-level Postgres advisory lock taken on the connection of the worker running the task.
+# Postgres releases it when that connection closes, so a worker killed in the middle of a run never leaves the lock
+# behind and no lease has to be renewed: a run that lost its connection also lost the database it was writing to.
+# Every worker (and `celery -A backend worker -B` replicas) shares the database, so the lock holds across machines.
+
+import hashlib
+import logging
+import time
+import traceback
+from functools import wraps
+from django.db import connection
+from django.utils import timezone
+
+# a child of the app logger: this module is imported (by backend.celery) before the logging is configured, which
+# disables the loggers existing by then in the tests
+logger = logging.getLogger('WarehousePilot_app.task_monitor')
+
+# seconds before a run refused with on_busy="requeue" is tried again
+REQUEUE_DELAY = 60
+
+
+def advisory_lock_key(name):
+    # pg_try_advisory_lock takes a signed 64 bits key
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def _record(task, outcome, started_at, started, error=""):
+    # imported here: backend.celery imports this module while the settings are loaded, before the apps
+    from .models import TaskRun
+    try:
+        TaskRun.objects.create(
+            task_name=task.name,
+            task_id=task.request.id,
+            worker=task.request.hostname,
+            outcome=outcome,
+            started_at=started_at,
+            duration=time.perf_counter() - started,
+            error=error,
+        )
+    except Exception:
+        # the run itself is not affected
+        logger.exception("Failed to record a run of %s", task.name)
+
+
+def _unlock(task, key):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+    except Exception:
+        # the connection is broken, the lock goes away with it (celery closes it after the task)
+        logger.exception("Failed to release the lock of %s", task.name)
+
+
+def single_flight(on_busy="skip", requeue_delay=REQUEUE_DELAY):
+    """
+    Run the decorated task (placed below @app.task(bind=True)) only if no other run of it holds its lock, and record
+    every run in TaskRun. A run finding the lock taken returns None with on_busy="skip", or is queued again
+    `requeue_delay` seconds later with on_busy="requeue".
+    """
+    if on_busy not in ("skip", "requeue"):
+        raise ValueError(f'on_busy must be "skip" or "requeue", not {on_busy!r}')
+
+    def decorator(run):
+        @wraps(run)
+        def wrapper(self, *args, **kwargs):
+            started_at, started = timezone.now(), time.perf_counter()
+            key = advisory_lock_key(self.name)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+                locked = cursor.fetchone()[0]
+
+            if not locked:
+                logger.info("%s is already running, %s this run", self.name, "skipped" if on_busy == "skip" else "requeued")
+                _record(self, "skipped" if on_busy == "skip" else "requeued", started_at, started)
+                if on_busy == "requeue":
+                    # raises Retry, the worker acknowledges this run and queues the next one
+                    self.retry(countdown=requeue_delay, max_retries=None)
+                return None
+
+            try:
+                result = run(self, *args, **kwargs)
+            except Exception:
+                _record(self, "failed", started_at, started, traceback.format_exc())
+                raise
+            finally:
+                _unlock(self, key)
+            _record(self, "succeeded", started_at, started)
+            return result
+        return wrapper
+    return decorator
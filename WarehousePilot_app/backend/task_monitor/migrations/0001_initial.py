@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(max_length=255)),
+                ('task_id', models.CharField(max_length=255, null=True)),
+                ('worker', models.CharField(max_length=255, null=True)),
+                ('outcome', models.CharField(choices=[('succeeded', 'succeeded'), ('failed', 'failed'), ('skipped', 'skipped'), ('requeued', 'requeued')], max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('duration', models.FloatField()),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task_name', 'started_at'], name='task_monito_task_na_85a8ad_idx')],
+            },
+        ),
+    ]
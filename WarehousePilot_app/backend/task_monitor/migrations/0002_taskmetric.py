@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_monitor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(max_length=255)),
+                ('task_id', models.CharField(max_length=255)),
+                ('state', models.CharField(max_length=20)),
+                ('started_at', models.DateTimeField()),
+                ('wall_time', models.FloatField()),
+                ('cpu_time', models.FloatField()),
+                ('query_count', models.IntegerField()),
+                ('query_time', models.FloatField()),
+                ('queue_wait', models.FloatField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task_name', 'started_at'], name='task_monito_task_na_bf5d82_idx')],
+            },
+        ),
+    ]
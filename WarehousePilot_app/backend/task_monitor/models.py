@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class TaskRun(models.Model):
+    '''
+    One run of a celery task decorated with task_monitor.locks.single_flight: when it started, how long it took and
+    how it ended ("skipped" and "requeued" when another run of the task held the lock).
+    '''
+    OUTCOMES = {
+        "succeeded": "succeeded",
+        "failed": "failed",
+        "skipped": "skipped",
+        "requeued": "requeued",
+    }
+    task_name = models.CharField(max_length=255)
+    task_id = models.CharField(max_length=255, null=True) # celery task id, null when the task was called directly
+    worker = models.CharField(max_length=255, null=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOMES)
+    started_at = models.DateTimeField()
+    duration = models.FloatField() # seconds
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        # the last runs of a task
+        indexes = [models.Index(fields=["task_name", "started_at"])]
+
+
+class TaskMetric(models.Model):
+    '''
+    Measures of one run of a celery task (task_monitor.instrumentation), written when TASK_METRICS_TABLE is set.
+    '''
+    task_name = models.CharField(max_length=255)
+    task_id = models.CharField(max_length=255)
+    state = models.CharField(max_length=20) # celery state: SUCCESS, FAILURE, RETRY...
+    started_at = models.DateTimeField()
+    wall_time = models.FloatField() # seconds
+    cpu_time = models.FloatField() # seconds of CPU of the worker process
+    query_count = models.IntegerField()
+    query_time = models.FloatField() # seconds
+    queue_wait = models.FloatField(null=True) # seconds from the sending of the task to its start, null when unknown
+
+    class Meta:
+        # the slowest runs of a task over a period
+        indexes = [models.Index(fields=["task_name", "started_at"])]
@@ -0,0 +1,232 @@
+# This file tests the single-flight lock of the periodic celery tasks (task_monitor.locks) and the runs it records,
+# and the measures of the celery tasks (task_monitor.instrumentation) exposed by TaskMetricsView
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.test import TestCase, override_settings
+from django.db import connections
+from django.utils import timezone
+from celery.exceptions import Retry
+from celery.app.task import Context
+from unittest.mock import patch
+from rest_framework.test import APIClient
+from auth_app.models import users
+from backend.celery import app, create_manuTasks
+from .instrumentation import SENT_AT_HEADER, read_histograms, stamp_sent_time, _queue_wait
+from .locks import advisory_lock_key, single_flight
+from .models import TaskMetric, TaskRun
+
+calls = []
+
+
+@app.task(bind=True, name="task_monitor.tests.locked_task")
+@single_flight()
+def locked_task(self, value):
+    calls.append(value)
+    return value * 2
+
+
+@app.task(bind=True, name="task_monitor.tests.requeued_task")
+@single_flight(on_busy="requeue", requeue_delay=5)
+def requeued_task(self):
+    calls.append("requeued_task")
+
+
+@app.task(bind=True, name="task_monitor.tests.failing_task")
+@single_flight()
+def failing_task(self):
+    raise ValueError("boom")
+
+
+class SingleFlightTests(TestCase):
+    # setUp(): opens a second database session, standing for another worker
+    def setUp(self):
+        calls.clear()
+        self.other = connections.create_connection("default")
+
+    def tearDown(self):
+        self.other.close()
+
+    def hold_lock(self, task):
+        with self.other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [advisory_lock_key(task.name)])
+
+    def lock_is_free(self, task):
+        with self.other.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [advisory_lock_key(task.name)])
+            free = cursor.fetchone()[0]
+            if free:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [advisory_lock_key(task.name)])
+        return free
+
+    # test_run_is_recorded(): Test that a run returns the result of the task, is recorded and releases the lock
+    def test_run_is_recorded(self):
+        self.assertEqual(locked_task(21), 42)
+
+        run = TaskRun.objects.get()
+        self.assertEqual((run.task_name, run.outcome, run.error), ("task_monitor.tests.locked_task", "succeeded", ""))
+        self.assertGreaterEqual(run.duration, 0)
+        self.assertTrue(self.lock_is_free(locked_task))
+
+    # test_overlapping_run_is_skipped(): Test that a run is skipped while another session holds the lock
+    def test_overlapping_run_is_skipped(self):
+        self.hold_lock(locked_task)
+
+        self.assertIsNone(locked_task(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(TaskRun.objects.get().outcome, "skipped")
+
+    # test_overlapping_run_is_requeued(): Test that on_busy="requeue" retries the run later instead
+    def test_overlapping_run_is_requeued(self):
+        self.hold_lock(requeued_task)
+
+        with self.assertRaises(Retry):
+            requeued_task()
+        self.assertEqual(calls, [])
+        self.assertEqual(TaskRun.objects.get().outcome, "requeued")
+
+    # test_failed_run_is_recorded(): Test that a failure is raised again, recorded with its traceback and releases the lock
+    def test_failed_run_is_recorded(self):
+        with self.assertRaises(ValueError):
+            failing_task()
+
+        run = TaskRun.objects.get()
+        self.assertEqual(run.outcome, "failed")
+        self.assertIn("ValueError: boom", run.error)
+        self.assertTrue(self.lock_is_free(failing_task))
+
+    # test_manufacturing_tasks_job_is_single_flight(): Test that the beat job creating the manufacturing tasks takes its lock
+    def test_manufacturing_tasks_job_is_single_flight(self):
+        self.hold_lock(create_manuTasks)
+
+        self.assertIsNone(create_manuTasks())
+        self.assertEqual(list(TaskRun.objects.values_list("task_name", "outcome")), [("backend.celery.create_manuTasks", "skipped")])
+
+    # test_invalid_on_busy(): Test that an unknown on_busy value is refused
+    def test_invalid_on_busy(self):
+        with self.assertRaises(ValueError):
+            single_flight(on_busy="wait")
+
+
+class FakeRedis:
+    # the hashes and sets of Redis used by the instrumentation, in memory
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.sets = defaultdict(set)
+
+    def sadd(self, key, value):
+        self.sets[key].add(value)
+
+    def smembers(self, key):
+        return {x.encode() for x in self.sets[key]}
+
+    def hincrby(self, key, field, amount):
+        self.hashes[key][field] = self.hashes[key].get(field, 0) + amount
+
+    hincrbyfloat = hincrby
+
+    def hgetall(self, key):
+        return {k.encode(): str(v).encode() for k, v in self.hashes[key].items()}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+@override_settings(TASK_METRICS_URL="redis://metrics")
+class TaskInstrumentationTests(TestCase):
+    # setUp(): replaces Redis by FakeRedis and creates an admin and a staff user
+    def setUp(self):
+        calls.clear()
+        self.redis = FakeRedis()
+        patcher = patch("task_monitor.instrumentation._redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.admin = users.objects.create_user(
+            username="metrics_admin", password="password", email="metrics_admin@example.com", first_name="Metrics",
+            last_name="Admin", role="admin", department="Testing", date_of_hire="2020-01-01",
+        )
+        self.staff = users.objects.create_user(
+            username="metrics_staff", password="password", email="metrics_staff@example.com", first_name="Metrics",
+            last_name="Staff", role="staff", department="Testing", date_of_hire="2020-01-01",
+        )
+
+    # test_run_is_measured(): Test that a run adds its duration, CPU time and queries to the histograms of its task
+    def test_run_is_measured(self):
+        locked_task.apply(args=(1,))
+        locked_task.apply(args=(2,))
+
+        histograms = read_histograms()["task_monitor.tests.locked_task"]
+        self.assertEqual(histograms["failures"], 0)
+        self.assertEqual(histograms["wall_time_seconds"]["count"], 2)
+        self.assertEqual(histograms["wall_time_seconds"]["buckets"][-1], ("+Inf", 2))
+        self.assertEqual(histograms["cpu_time_seconds"]["count"], 2)
+        # the lock, the unlock and the run record of each run
+        self.assertEqual(histograms["query_count"]["sum"], 6)
+        self.assertEqual(histograms["query_count"]["buckets"][:2], [("1", 0), ("5", 2)])
+        # eager runs are not sent through the queue
+        self.assertEqual(histograms["queue_wait_seconds"]["count"], 0)
+
+    # test_failure_is_counted(): Test that a failed run is measured and counted as a failure
+    def test_failure_is_counted(self):
+        failing_task.apply()
+
+        histograms = read_histograms()["task_monitor.tests.failing_task"]
+        self.assertEqual(histograms["failures"], 1)
+        self.assertEqual(histograms["wall_time_seconds"]["count"], 1)
+
+    # test_queue_wait(): Test that the wait is measured from the time the task was sent, or from its eta
+    def test_queue_wait(self):
+        headers = {}
+        stamp_sent_time(headers=headers)
+        self.assertAlmostEqual(headers[SENT_AT_HEADER], time.time(), delta=1)
+
+        now = time.time()
+        self.assertAlmostEqual(_queue_wait(Context({SENT_AT_HEADER: now - 5, "eta": None}), now), 5)
+        eta = datetime.fromtimestamp(now - 2).astimezone().isoformat()
+        self.assertAlmostEqual(_queue_wait(Context({SENT_AT_HEADER: now - 60, "eta": eta}), now), 2, places=3)
+        self.assertIsNone(_queue_wait(Context({"eta": None}), now))
+
+    # test_metrics_table(): Test that every run is written to TaskMetric when TASK_METRICS_TABLE is set
+    def test_metrics_table(self):
+        with override_settings(TASK_METRICS_TABLE=True):
+            locked_task.apply(args=(1,))
+        locked_task.apply(args=(1,))
+
+        metric = TaskMetric.objects.get()
+        self.assertEqual((metric.task_name, metric.state, metric.query_count), ("task_monitor.tests.locked_task", "SUCCESS", 3))
+        self.assertIsNone(metric.queue_wait)
+        self.assertAlmostEqual(metric.started_at, timezone.now(), delta=timedelta(minutes=1))
+
+    # test_metrics_endpoint(): Test that the histograms are exposed in the Prometheus text format to the admins
+    def test_metrics_endpoint(self):
+        locked_task.apply(args=(1,))
+        client = APIClient()
+
+        client.force_authenticate(user=self.staff)
+        self.assertEqual(client.get("/task_monitor/metrics/").status_code, 403)
+
+        client.force_authenticate(user=self.admin)
+        response = client.get("/task_monitor/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn("# TYPE celery_task_wall_time_seconds histogram", body)
+        self.assertIn('celery_task_query_count_bucket{task="task_monitor.tests.locked_task",le="+Inf"} 1', body)
+        self.assertIn('celery_task_failures_total{task="task_monitor.tests.locked_task"} 0', body)
+
+        with override_settings(TASK_METRICS_URL=None):
+            self.assertEqual(client.get("/task_monitor/metrics/").status_code, 503)
+
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import TaskMetricsView
+
+urlpatterns = [
+    path('metrics/', TaskMetricsView.as_view(), name='task_metrics'),
+]
@@ -0,0 +1,59 @@
+# This file defines the endpoint exposing the measures of the celery tasks (task_monitor.instrumentation).
+
+# TaskMetricsView: Returns the histograms of every task in the Prometheus text format (GET /task_monitor/metrics/).
+
+# Prometheus scrapes it with the access token of an admin user (authorization: {credentials: <token>}).
+
+import logging
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from admin_dashboard.views import IsAdminUser
+from .instrumentation import read_histograms
+
+logger = logging.getLogger('WarehousePilot_app')
+
+HELP = {
+    "wall_time_seconds": "Duration of the celery task runs.",
+    "cpu_time_seconds": "CPU time of the worker process during the celery task runs.",
+    "query_count": "SQL queries per celery task run.",
+    "query_time_seconds": "Time spent in the SQL queries per celery task run.",
+    "queue_wait_seconds": "Time from the sending of a celery task to the start of its run.",
+}
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_metrics(histograms):
+    lines = []
+    for measure, help_text in HELP.items():
+        metric = f"celery_task_{measure}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for task, measures in histograms.items():
+            histogram = measures[measure]
+            for bound, count in histogram["buckets"]:
+                lines.append(f'{metric}_bucket{{task="{_label(task)}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_sum{{task="{_label(task)}"}} {histogram["sum"]}')
+            lines.append(f'{metric}_count{{task="{_label(task)}"}} {histogram["count"]}')
+    lines += ["# HELP celery_task_failures_total Failed celery task runs.", "# TYPE celery_task_failures_total counter"]
+    for task, measures in histograms.items():
+        lines.append(f'celery_task_failures_total{{task="{_label(task)}"}} {measures["failures"]}')
+    return "\n".join(lines) + "\n"
+
+
+class TaskMetricsView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        if not settings.TASK_METRICS_URL:
+            return JsonResponse({"error": "Task metrics are disabled"}, status=503)
+        try:
+            histograms = read_histograms()
+        except Exception as e:
+            logger.error("Could not read the task metrics: %s", str(e))
+            return JsonResponse({"error": "Could not read the task metrics"}, status=503)
+        return HttpResponse(render_metrics(histograms), content_type="text/plain; version=0.0.4; charset=utf-8")
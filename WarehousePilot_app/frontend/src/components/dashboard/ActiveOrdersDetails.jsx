@@ -58,10 +58,12 @@ const ActiveOrdersDetails = ({ userData }) => {
   useEffect(() => {
     const fetchOrders = async () => {
       try {
-        const response = await axios.get(
-          `${API_BASE_URL}/kpi_dashboard/active-orders-details/`
-        );
-        setOrders(response.data);
+        const token = localStorage.getItem("token");
+        const response = await axios.get(`${API_BASE_URL}/kpi_dashboard/bundle/`, {
+          params: { widgets: "active_orders_details" },
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        setOrders(response.data.active_orders_details);
       } catch (err) {
         setError(err.message || "Failed to load orders data.");
       } finally {
@@ -35,14 +35,17 @@ const KPIDashboard = ({ userData }) => {
     const fetchData = async () => {
       try {
         setLoading(true);
-        const [activeResponse, completedResponse] = await Promise.all([
-          axios.get(`${API_BASE_URL}/kpi_dashboard/active-orders/`),
-          axios.get(`${API_BASE_URL}/kpi_dashboard/completed-orders/`),
-        ]);
-        setActiveOrdersData(activeResponse.data);
-        setCompletedOrdersData(completedResponse.data);
-        const activeTotal = activeResponse.data.reduce((sum, entry) => sum + entry.active_orders, 0);
-        const completedTotal = completedResponse.data.reduce((sum, entry) => sum + entry.completed_orders, 0);
+        // both series in one request, computed from the same rollup rows
+        const token = localStorage.getItem("token");
+        const response = await axios.get(`${API_BASE_URL}/kpi_dashboard/bundle/`, {
+          params: { widgets: "active_orders,completed_orders" },
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        const { active_orders: activeOrders, completed_orders: completedOrders } = response.data;
+        setActiveOrdersData(activeOrders);
+        setCompletedOrdersData(completedOrders);
+        const activeTotal = activeOrders.reduce((sum, entry) => sum + entry.active_orders, 0);
+        const completedTotal = completedOrders.reduce((sum, entry) => sum + entry.completed_orders, 0);
         setTotalActiveOrders(activeTotal);
         setTotalCompletedOrders(completedTotal);
       } catch (err) {
@@ -63,66 +63,17 @@ const OrderPickingPage = () => {
     return () => observer.disconnect();
   }, []);
 
-  const fetchAccuracyData = async (token) => {
-    try {
-      setLoadingPie(true);
-      setErrorPie(null);
-      const resp = await axios.get(
-        `${API_BASE_URL}/kpi_dashboard/order-picking-accuracy/`,
-        { headers: { Authorization: `Bearer ${token}` } }
-      );
-      const result = resp.data;
-      const accurate = result.inaccurate_picks || 0;
-      const inaccurate = result.accurate_picks || 0;
-      const total = accurate + inaccurate;
-      setPieData([
-        { name: "Accurate Picks", value: accurate },
-        { name: "Inaccurate Picks", value: inaccurate },
-      ]);
-      const percentage = total > 0 ? ((accurate / total) * 100).toFixed(1) : 0;
-      setTotalPicks(total);
-      setAccuracyPercentage(percentage);
-      setLoadingPie(false);
-    } catch (err) {
-      console.error("Error fetching accuracy data:", err);
-      setErrorPie("Failed to fetch accuracy data.");
-      setLoadingPie(false);
-    }
-  };
-
-  const fetchDailyData = async (token) => {
-    try {
-      setLoadingDaily(true);
-      setErrorDaily(null);
-      const resp = await axios.get(
-        `${API_BASE_URL}/kpi_dashboard/order-picking-daily-stats/`,
-        { headers: { Authorization: `Bearer ${token}` } }
-      );
-      const sorted = resp.data.slice().sort((a, b) => a.day.localeCompare(b.day));
-      setDailyData(sorted);
-      setLoadingDaily(false);
-    } catch (err) {
-      console.error("Error fetching daily picks:", err);
-      setErrorDaily("Failed to fetch daily picks data.");
-      setLoadingDaily(false);
-    }
-  };
-
-  const fetchDetailedData = async (token) => {
-    try {
-      setLoadingDetails(true);
-      setErrorDetails(null);
-      const resp = await axios.get(
-        `${API_BASE_URL}/kpi_dashboard/order-picking-daily-details/`,
-        { headers: { Authorization: `Bearer ${token}` } }
-      );
-      setDetailedData(resp.data);
-      setLoadingDetails(false);
-    } catch (err) {
-      console.error("Error fetching daily detailed picks:", err);
-      setErrorDetails("Failed to fetch detailed picks data.");
-      setLoadingDetails(false);
-    }
+  const showAccuracyData = (result) => {
+    const accurate = result.inaccurate_picks || 0;
+    const inaccurate = result.accurate_picks || 0;
+    const total = accurate + inaccurate;
+    setPieData([
+      { name: "Accurate Picks", value: accurate },
+      { name: "Inaccurate Picks", value: inaccurate },
+    ]);
+    const percentage = total > 0 ? ((accurate / total) * 100).toFixed(1) : 0;
+    setTotalPicks(total);
+    setAccuracyPercentage(percentage);
   };
 
   const fetchAllData = async () => {
@@ -133,11 +84,36 @@ const OrderPickingPage = () => {
       setErrorDetails("No authorization token found.");
       return;
     }
-    await Promise.all([
-      fetchAccuracyData(token),
-      fetchDailyData(token),
-      fetchDetailedData(token)
-    ]);
+    setLoadingPie(true);
+    setLoadingDaily(true);
+    setLoadingDetails(true);
+    setErrorPie(null);
+    setErrorDaily(null);
+    setErrorDetails(null);
+    try {
+      // the three widgets in one request, the pick counters and daily picks are read once
+      const resp = await axios.get(`${API_BASE_URL}/kpi_dashboard/bundle/`, {
+        params: { widgets: "order_picking_accuracy,daily_picks_data,daily_picks_details" },
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      const {
+        order_picking_accuracy: accuracy,
+        daily_picks_data: daily,
+        daily_picks_details: details,
+      } = resp.data;
+      showAccuracyData(accuracy);
+      setDailyData(daily.slice().sort((a, b) => a.day.localeCompare(b.day)));
+      setDetailedData(details);
+    } catch (err) {
+      console.error("Error fetching order picking data:", err);
+      setErrorPie("Failed to fetch accuracy data.");
+      setErrorDaily("Failed to fetch daily picks data.");
+      setErrorDetails("Failed to fetch detailed picks data.");
+    } finally {
+      setLoadingPie(false);
+      setLoadingDaily(false);
+      setLoadingDetails(false);
+    }
   };
 
   useEffect(() => {
@@ -25,7 +25,8 @@ export default function ThroughputThresholdKpiPreview() {
                 return;
             }
 
-            const response = await axios.get(`${API_BASE_URL}/kpi_dashboard/throughput-threshold/`, {
+            const response = await axios.get(`${API_BASE_URL}/kpi_dashboard/bundle/`, {
+                params: { widgets: "throughput", "throughput.bucket": "day" },
                 headers: {
                     Authorization: `Bearer ${token}`,
                     "Content-Type": "application/json",
@@ -33,7 +34,7 @@ export default function ThroughputThresholdKpiPreview() {
             });
             // console.log("Throughput data:", response.data); // Log the response data
 
-            const formattedData = response.data.map((item) => ({
+            const formattedData = response.data.throughput.map((item) => ({
                 date: item.day,
                 picked: item.picked,
                 packed: item.packed,
@@ -31,8 +31,9 @@ const ThroughputThresholdDashboard = ({ userData }) => {
 
             // Backend API call to get throughput data
             const response = await axios.get(
-                `${API_BASE_URL}/kpi_dashboard/throughput-threshold/`, //TODO: Change this to throughput path
+                `${API_BASE_URL}/kpi_dashboard/bundle/`,
                 {
+                    params: { widgets: "throughput", "throughput.bucket": "day" },
                     headers: {
                         Authorization: `Bearer ${token}`,
                         "Content-Type": "application/json",
@@ -41,7 +42,7 @@ const ThroughputThresholdDashboard = ({ userData }) => {
             );
 
             // Format data for ThroughputBarGraph
-            const formattedData = response.data.map((item) => {
+            const formattedData = response.data.throughput.map((item) => {
                 return {
                     date: item.day,
                     picked: item.picked,